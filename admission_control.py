@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Admission Control - Límite global de búsquedas y de requests a Google
+
+Responsabilidad: Evitar que varias sesiones buscando a la vez multipliquen los
+QPS contra Google y terminen todas en OVER_QUERY_LIMIT. Tiene dos partes:
+
+- Tope de búsquedas simultáneas: los workers de job_queue no toman un job nuevo
+  si ya hay max_concurrent_searches() corriendo (contando todos los procesos
+  que comparten la base de jobs). El resto espera en la cola.
+- Presupuesto de requests compartido: todas las instancias de
+  GooglePlacesFetcher del proceso piden turno a un mismo FairRateLimiter. Los
+  turnos se reparten por ronda entre las búsquedas que están esperando, así una
+  búsqueda grande no deja sin cupo a las demás.
+
+Los límites salen de app_config (sección "limits" o las variables
+GOOGLE_API_QPS y MAX_CONCURRENT_SEARCHES).
+"""
+
+import threading
+import time
+import logging
+
+import app_config
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_GOOGLE_API_QPS = 5.0
+DEFAULT_MAX_CONCURRENT_SEARCHES = 2
+# Tiempo sin pedir turnos tras el cual se olvida a un cliente del limiter
+CLIENT_IDLE_SECONDS = 600
+
+def max_concurrent_searches():
+    """Búsquedas que pueden correr a la vez entre todas las sesiones"""
+    return int(app_config.get_setting('limits', 'max_concurrent_searches', DEFAULT_MAX_CONCURRENT_SEARCHES))
+
+class FairRateLimiter:
+    """
+    Reparte un presupuesto de requests por segundo entre clientes (una búsqueda = un cliente).
+    Cuando varios esperan, el turno es del que hace más tiempo que no recibe uno.
+    """
+
+    def __init__(self, requests_per_second):
+        self.interval = 1.0 / requests_per_second
+        self._cond = threading.Condition()
+        self._next_slot = 0.0
+        self._waiting = {}
+        self._last_served = {}
+        self.granted = 0
+        self.waited_seconds = 0.0
+
+    def _next_client(self):
+        waiting = [client for client, count in self._waiting.items() if count]
+        return min(waiting, key=lambda client: self._last_served.get(client, float('-inf')))
+
+    def acquire(self, client):
+        """Bloquea hasta que el cliente tenga turno para hacer un request"""
+        requested = time.monotonic()
+        with self._cond:
+            self._waiting[client] = self._waiting.get(client, 0) + 1
+            while True:
+                now = time.monotonic()
+                if now >= self._next_slot and self._next_client() == client:
+                    break
+                self._cond.wait(timeout=max(self._next_slot - now, self.interval))
+
+            self._waiting[client] -= 1
+            if not self._waiting[client]:
+                del self._waiting[client]
+            self._last_served[client] = now
+            self._next_slot = now + self.interval
+            self.granted += 1
+            self.waited_seconds += now - requested
+            if self.granted % 100 == 0:
+                self._forget_idle_clients(now)
+            self._cond.notify_all()
+
+    def _forget_idle_clients(self, now):
+        for client, served in list(self._last_served.items()):
+            if now - served > CLIENT_IDLE_SECONDS and client not in self._waiting:
+                del self._last_served[client]
+
+    def stats(self):
+        with self._cond:
+            return {
+                'granted': self.granted,
+                'waiting_clients': len(self._waiting),
+                'avg_wait_seconds': round(self.waited_seconds / self.granted, 3) if self.granted else 0.0,
+            }
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+def google_api_limiter():
+    """Limiter de requests a Google compartido por todo el proceso (todas las sesiones)"""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            qps = float(app_config.get_setting('limits', 'google_api_qps', DEFAULT_GOOGLE_API_QPS))
+            _shared_limiter = FairRateLimiter(qps)
+            logger.info(f"🚦 Presupuesto compartido de la API de Google: {qps:g} requests/s")
+        return _shared_limiter
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+API Cassette - Grabación y reproducción de las respuestas externas del flujo
+
+Responsabilidad: Guardar en un archivo JSON ("cassette") todas las respuestas
+que el flujo recibe de afuera (Geocoding, Text Search y Details de Google,
+las páginas que descarga el scraper y las llamadas a la API de Sheets) para
+volver a correr main_orchestrator sin red ni API key, con exactamente los
+mismos datos. Es la base de pipeline_benchmark.py.
+
+Se engancha en tres puntos, sin tocar el código del flujo:
+- requests.adapters.HTTPAdapter.send: por ahí pasan tanto requests.get (Places)
+  como la sesión del scraper (cada redirect es una respuesta aparte).
+- GoogleSheetsManager.connect: la hoja se reemplaza por una en memoria
+  (MemorySheetsService) que arranca con el contenido guardado en el cassette.
+- host_health.HostResolver.resolve: los dominios que no existían al grabar se
+  saltean igual al reproducir.
+
+Modos: 'record' (todo contra la red, se graba), 'replay' (solo el cassette; lo
+que falta se responde como error de conexión) y 'new' (reproduce lo grabado y
+graba lo nuevo). Las API keys se quitan de las URLs antes de guardarlas.
+Cada request HTTP se busca por su propia clave (método y URL), así que el orden
+entre requests distintos no importa; si la misma URL se pide varias veces las
+respuestas salen en el orden en que se grabaron (la última se repite cuando se
+agotan). Los requests que fallaron al grabar (conexión rechazada, timeout) se
+graban como error y vuelven a fallar igual al reproducir.
+
+Sheets no se graba llamada por llamada: la cantidad de lecturas y de lotes
+subidos depende de cómo se armen los lotes en cada corrida. Se guarda solo el
+contenido inicial de la hoja (vacía, o leída de la hoja real con
+real_sheets=True) y tanto al grabar como al reproducir las cargas van a la hoja
+en memoria, así que grabar no necesita credenciales ni escribe en la hoja real.
+"""
+
+import base64
+import builtins
+import contextlib
+import json
+import copy
+import os
+import re
+import threading
+from collections import Counter
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MODES = ('record', 'replay', 'new')
+# Versión 2: la sección sheets guarda el contenido inicial de cada hoja (no las llamadas)
+CASSETTE_VERSION = 2
+CASSETTES_DIR = os.path.join('fixtures', 'cassettes')
+# Parámetros que no se guardan ni forman parte de la clave de una llamada
+SECRET_PARAMS = ('key',)
+# Rango A1 de Sheets: 'Hoja'!A1:Z1, 'Hoja'!A:Z o 'Hoja'!A1
+SHEETS_RANGE_PATTERN = re.compile(r"^'?(?P<title>[^'!]+)'?!(?:[A-Z]+)(?P<first>\d*)(?::[A-Z]+(?P<last>\d*))?$")
+# Tipo de llamada según la ruta de la URL (funciona con la API real o un servidor que la imite)
+CALL_KINDS = (
+    ('/geocode/', 'google_geocode'),
+    ('/place/textsearch/', 'google_text_search'),
+    ('/place/details/', 'google_details'),
+)
+
+def sanitize_url(url):
+    """URL sin la API key y con los parámetros ordenados (clave estable entre corridas)"""
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in SECRET_PARAMS)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+
+def root_cause(exc, max_depth=6):
+    """Error de más abajo en la cadena (requests envuelve el de urllib3, que envuelve el del socket)"""
+    for _ in range(max_depth):
+        reason = getattr(exc, 'reason', None)
+        if reason is None and exc.args and isinstance(exc.args[0], BaseException):
+            reason = exc.args[0]
+        cause = reason if isinstance(reason, BaseException) else (exc.__cause__ or exc.__context__)
+        if cause is None:
+            break
+        exc = cause
+    return exc
+
+def call_kind(url):
+    path = urlsplit(url).path
+    return next((kind for marker, kind in CALL_KINDS if marker in path), 'pages')
+
+class Cassette:
+    """Respuestas grabadas de una corrida del flujo"""
+
+    def __init__(self, path, mode='replay', real_sheets=False):
+        if mode not in MODES:
+            raise ValueError(f"Modo de cassette desconocido: {mode} (usar {', '.join(MODES)})")
+        self.path = path
+        self.mode = mode
+        # Al grabar: leer el contenido inicial de la hoja real (si no, se arranca con la hoja vacía)
+        self.real_sheets = real_sheets
+        self.interactions = {'http': {}}
+        # Contenido inicial de cada hoja (título -> filas) con el que arranca la hoja en memoria
+        self.sheets = {}
+        # Resoluciones DNS del scraper (host -> IPs, o None si el dominio no existía)
+        self.dns = {}
+        # Datos de la corrida grabada (query, ubicación, fecha...) para poder repetirla
+        self.meta = {}
+        self.calls = Counter()
+        self.misses = Counter()
+        self._positions = Counter()
+        self._lock = threading.Lock()
+        if mode != 'record' and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            self.interactions = {'http': data.get('http', {})}
+            self.dns = data.get('dns', {})
+            self.meta = data.get('meta', {})
+            if data.get('version', 1) >= CASSETTE_VERSION:
+                self.sheets = data.get('sheets', {})
+            else:
+                logger.warning(f"⚠️ Cassette {path} de la versión {data.get('version', 1)}: "
+                               "Sheets arranca con la hoja vacía")
+        elif mode == 'replay':
+            raise FileNotFoundError(f"No existe el cassette {path}")
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CASSETTE_VERSION, 'meta': self.meta, 'dns': self.dns, 'sheets': self.sheets,
+                       **self.interactions}, f, ensure_ascii=False, indent=1, sort_keys=True)
+        total = sum(len(v) for section in self.interactions.values() for v in section.values())
+        logger.info(f"📼 Cassette guardado en {self.path} ({total} respuestas)")
+
+    def _next(self, section, key):
+        """Próxima respuesta grabada para la clave, o None si no hay"""
+        with self._lock:
+            responses = self.interactions[section].get(key)
+            if not responses:
+                return None
+            position = self._positions[(section, key)]
+            self._positions[(section, key)] += 1
+            return responses[min(position, len(responses) - 1)]
+
+    def _append(self, section, key, entry):
+        with self._lock:
+            self.interactions[section].setdefault(key, []).append(entry)
+
+    # --- HTTP (Places y scraper) ---
+
+    def _http_key(self, request):
+        return f"{request.method} {sanitize_url(request.url)}"
+
+    def send(self, adapter, original_send, request, **kwargs):
+        """Reemplazo de HTTPAdapter.send: reproduce o graba cada request"""
+        key = self._http_key(request)
+        with self._lock:
+            self.calls[call_kind(request.url)] += 1
+
+        if self.mode != 'record':
+            entry = self._next('http', key)
+            if entry is not None and 'error' in entry:
+                # Al grabar el request falló (dominio caído, timeout): falla igual
+                error_class = getattr(requests.exceptions, entry['error'], requests.exceptions.ConnectionError)
+                # La causa (p. ej. ConnectionRefusedError) decide si el scraper reintenta: se reproduce también
+                cause_class = getattr(builtins, entry.get('cause', ''), None)
+                cause = cause_class(entry.get('message', '')) if isinstance(cause_class, type) and \
+                    issubclass(cause_class, OSError) else None
+                raise error_class(entry.get('message', ''), request=request) from cause
+            if entry is not None:
+                return self._build_response(entry, request)
+            if self.mode == 'replay':
+                with self._lock:
+                    self.misses[call_kind(request.url)] += 1
+                raise requests.exceptions.ConnectionError(f"Request no grabado en el cassette: {key}", request=request)
+
+        try:
+            response = original_send(adapter, request, **kwargs)
+        except requests.exceptions.RequestException as e:
+            cause = root_cause(e)
+            entry = {'error': type(e).__name__, 'message': str(e)}
+            if type(cause).__name__ in vars(builtins):
+                entry['cause'] = type(cause).__name__
+            self._append('http', key, entry)
+            raise
+        self._append('http', key, self._http_entry(response))
+        return response
+
+    def _http_entry(self, response):
+        content = response.content
+        try:
+            body, encoding = content.decode('utf-8'), 'text'
+        except UnicodeDecodeError:
+            body, encoding = base64.b64encode(content).decode('ascii'), 'base64'
+        return {
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': dict(response.headers),
+            'body': body,
+            'body_encoding': encoding,
+        }
+
+    def _build_response(self, entry, request):
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.reason = entry.get('reason')
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        if entry.get('body_encoding') == 'base64':
+            response._content = base64.b64decode(entry['body'])
+        else:
+            response._content = entry['body'].encode('utf-8')
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        return response
+
+    # --- DNS ---
+
+    def resolve(self, resolver, original_resolve, host):
+        """Reemplazo de HostResolver.resolve: los dominios caídos al grabar se saltean igual"""
+        if self.mode != 'record' and host in self.dns:
+            addresses = self.dns[host]
+            # Mismo cache que llenaría la resolución real (is_dead lo consulta)
+            with resolver._lock:
+                resolver._cache[host] = addresses
+            return addresses
+        if self.mode == 'replay':
+            # Host no grabado: no se da por inexistente y el request fallará como no grabado
+            return []
+        addresses = original_resolve(resolver, host)
+        with self._lock:
+            self.dns[host] = addresses
+        return addresses
+
+    # --- Sheets ---
+
+    def count_sheets_call(self):
+        with self._lock:
+            self.calls['sheets'] += 1
+
+    def _read_real_sheet(self, manager):
+        """Contenido actual de la hoja real (solo al grabar con real_sheets=True)"""
+        result = manager.service.spreadsheets().values().get(
+            spreadsheetId=manager.spreadsheet_id, range=f"'{manager.sheet_name}'!A:Z").execute()
+        return result.get('values', [])
+
+    @contextlib.contextmanager
+    def install(self):
+        """Activa el cassette mientras dura el bloque (y lo guarda al salir si se grabó)"""
+        import google_sheets_manager
+        from host_health import HostResolver
+
+        cassette = self
+        # Una sola hoja en memoria por corrida: todos los managers ven las cargas de los anteriores
+        memory_sheets = []
+        original_send = HTTPAdapter.send
+        original_connect = google_sheets_manager.GoogleSheetsManager.connect
+        original_resolve = HostResolver.resolve
+
+        def send(adapter, request, **kwargs):
+            return cassette.send(adapter, original_send, request, **kwargs)
+
+        def resolve(resolver, host):
+            return cassette.resolve(resolver, original_resolve, host)
+
+        def connect(manager):
+            if cassette.mode == 'record' and cassette.real_sheets and manager.sheet_name not in cassette.sheets:
+                # Única lectura de la hoja real; las cargas de la grabación van a la hoja en memoria
+                original_connect(manager)
+                cassette.sheets[manager.sheet_name] = cassette._read_real_sheet(manager)
+            if not memory_sheets:
+                memory_sheets.append(MemorySheetsService(cassette.sheets))
+            manager.service = SheetsProxy(cassette, memory_sheets[0])
+            manager.ensure_sheet_exists()
+
+        HTTPAdapter.send = send
+        google_sheets_manager.GoogleSheetsManager.connect = connect
+        HostResolver.resolve = resolve
+        try:
+            yield self
+        finally:
+            HTTPAdapter.send = original_send
+            google_sheets_manager.GoogleSheetsManager.connect = original_connect
+            HostResolver.resolve = original_resolve
+            if self.mode != 'replay':
+                self.save()
+            if sum(self.misses.values()):
+                logger.warning(f"⚠️ Llamadas que no estaban en el cassette: {dict(self.misses)}")
+
+class SheetsRequest:
+    """Llamada pendiente de la hoja en memoria (se ejecuta con .execute(), como en el cliente de Google)"""
+
+    def __init__(self, function):
+        self._function = function
+
+    def execute(self):
+        return self._function()
+
+class MemorySheetsService:
+    """Hoja de cálculo en memoria con la parte de la API de Sheets que usa GoogleSheetsManager"""
+
+    def __init__(self, sheets=None):
+        # Copia: las cargas de una corrida no cambian el contenido inicial guardado en el cassette
+        self.sheets = copy.deepcopy(sheets or {})
+        self._lock = threading.Lock()
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def _parse_range(self, range):
+        match = SHEETS_RANGE_PATTERN.match(range)
+        if not match:
+            raise ValueError(f"Rango de Sheets no soportado: {range}")
+        first = int(match['first']) if match['first'] else 1
+        last = int(match['last']) if match['last'] else None
+        return match['title'], first, last
+
+    # --- spreadsheets() ---
+
+    def get(self, spreadsheetId, range=None, **kwargs):
+        if range is None:
+            with self._lock:
+                titles = list(self.sheets)
+            return SheetsRequest(lambda: {'sheets': [{'properties': {'title': title}} for title in titles]})
+        title, first, last = self._parse_range(range)
+
+        def read():
+            with self._lock:
+                rows = copy.deepcopy(self.sheets.get(title, [])[first - 1:last])
+            return {'range': range, 'values': rows} if rows else {'range': range}
+        return SheetsRequest(read)
+
+    def batchUpdate(self, spreadsheetId, body, **kwargs):
+        def apply():
+            with self._lock:
+                for request in body.get('requests', []):
+                    if 'addSheet' in request:
+                        self.sheets.setdefault(request['addSheet']['properties']['title'], [])
+            return {'spreadsheetId': spreadsheetId, 'replies': [{} for _ in body.get('requests', [])]}
+        return SheetsRequest(apply)
+
+    # --- spreadsheets().values() ---
+
+    def update(self, spreadsheetId, range, body, **kwargs):
+        title, first, _ = self._parse_range(range)
+
+        def write():
+            values = body.get('values', [])
+            with self._lock:
+                rows = self.sheets.setdefault(title, [])
+                # Filas vacías hasta la primera del rango (el parámetro range tapa al builtin)
+                rows.extend([[]] * max(0, first - 1 - len(rows)))
+                rows[first - 1:first - 1 + len(values)] = copy.deepcopy(values)
+            return {'updatedRange': range, 'updatedRows': len(values)}
+        return SheetsRequest(write)
+
+    def append(self, spreadsheetId, range, body, **kwargs):
+        title, _, _ = self._parse_range(range)
+
+        def write():
+            values = body.get('values', [])
+            with self._lock:
+                self.sheets.setdefault(title, []).extend(copy.deepcopy(values))
+            return {'updates': {'updatedRows': len(values)}}
+        return SheetsRequest(write)
+
+class SheetsProxy:
+    """Envuelve el servicio de Sheets contando cada .execute() (para las llamadas por etapa)"""
+
+    def __init__(self, cassette, target):
+        self._cassette = cassette
+        self._target = target
+
+    def __getattr__(self, name):
+        return SheetsProxy(self._cassette, getattr(self._target, name))
+
+    def __call__(self, *args, **kwargs):
+        return SheetsProxy(self._cassette, self._target(*args, **kwargs))
+
+    def execute(self, *args, **kwargs):
+        self._cassette.count_sheets_call()
+        return self._target.execute(*args, **kwargs)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+App Config - Configuración de claves e IDs sin depender de Streamlit
+
+Responsabilidad: Resolver la configuración (API key de Places, spreadsheet,
+credenciales de Google) tanto para la app de Streamlit como para procesos
+headless (CLI, cron, workers). El orden de búsqueda es:
+
+1. Valores explícitos (flags de la CLI) cargados con configure()
+2. Variables de entorno (también las del .env)
+3. Archivo de configuración (TOML con el mismo formato que .streamlit/secrets.toml, o JSON)
+4. st.secrets, solo si Streamlit ya está importado (la app corriendo)
+
+Este módulo nunca importa Streamlit: un proceso headless no paga su import ni
+necesita su configuración.
+"""
+
+import json
+import os
+import sys
+import logging
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Archivo de configuración por defecto (si existe); se puede cambiar con LEADS_CONFIG_FILE
+DEFAULT_CONFIG_FILE = os.path.join('.streamlit', 'secrets.toml')
+CONFIG_FILE_ENV = 'LEADS_CONFIG_FILE'
+
+# Variable de entorno de cada valor (sección, clave) de secrets.toml
+ENV_VARS = {
+    ('google', 'places_api_key'): 'GOOGLE_PLACES_API_KEY',
+    ('google', 'api_base_url'): 'GOOGLE_API_BASE_URL',
+    ('google_sheets', 'spreadsheet_id'): 'GOOGLE_SHEETS_SPREADSHEET_ID',
+    ('google_sheets', 'credentials_file'): 'GOOGLE_SHEETS_CREDENTIALS_FILE',
+    ('limits', 'google_api_qps'): 'GOOGLE_API_QPS',
+    ('limits', 'max_concurrent_searches'): 'MAX_CONCURRENT_SEARCHES',
+    ('limits', 'scrape_time_budget'): 'SCRAPE_TIME_BUDGET_SECONDS',
+    ('cache', 'search_ttl_hours'): 'SEARCH_CACHE_TTL_HOURS',
+}
+
+_overrides = {}
+_config_file = None
+_file_config = None
+
+def configure(config_file=None, **overrides):
+    """
+    Fija la configuración del proceso. Los overrides usan claves "seccion.clave"
+    con guión bajo en lugar del punto, ej. google_places_api_key=... (los None se ignoran).
+    """
+    global _config_file, _file_config
+    for name, value in overrides.items():
+        if value is None:
+            continue
+        key = next((k for k in ENV_VARS if '_'.join(k) == name), None)
+        if key is None:
+            raise ValueError(f"Clave de configuración desconocida: {name}")
+        _overrides[key] = value
+    if config_file:
+        _config_file = config_file
+        _file_config = None
+
+def _load_config_file():
+    global _file_config
+    if _file_config is not None:
+        return _file_config
+
+    path = _config_file or os.getenv(CONFIG_FILE_ENV) or DEFAULT_CONFIG_FILE
+    _file_config = {}
+    if not os.path.exists(path):
+        if path != DEFAULT_CONFIG_FILE:
+            logger.warning(f"⚠️ No se encontró el archivo de configuración {path}")
+        return _file_config
+
+    if path.endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            _file_config = json.load(f)
+    elif tomllib is not None:
+        with open(path, 'rb') as f:
+            _file_config = tomllib.load(f)
+    else:
+        logger.warning(f"⚠️ No se puede leer {path}: TOML requiere Python 3.11+ (usar JSON)")
+    return _file_config
+
+def _streamlit_secrets():
+    """st.secrets si la app de Streamlit está corriendo; None en procesos headless"""
+    st = sys.modules.get('streamlit')
+    if st is None:
+        return None
+    return getattr(st, 'secrets', None)
+
+def get_section(section):
+    """Sección completa (ej. google_service_account) como dict, o None si no está configurada"""
+    value = _load_config_file().get(section)
+    if value:
+        return dict(value)
+    secrets = _streamlit_secrets()
+    if secrets is not None:
+        try:
+            return dict(secrets[section])
+        except (KeyError, AttributeError, FileNotFoundError):
+            pass
+    return None
+
+def get_setting(section, key, default=None):
+    """Valor de configuración según el orden de búsqueda del módulo, o default si no está"""
+    if (section, key) in _overrides:
+        return _overrides[(section, key)]
+    env_var = ENV_VARS.get((section, key))
+    if env_var and os.getenv(env_var):
+        return os.getenv(env_var)
+    value = _load_config_file().get(section, {}).get(key)
+    if value:
+        return value
+    secrets = _streamlit_secrets()
+    if secrets is not None:
+        try:
+            return secrets[section][key]
+        except (KeyError, AttributeError, FileNotFoundError):
+            pass
+    return default
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Crawl Frontier - Cola de prioridades de páginas a descargar entre todos los sitios
+
+Responsabilidad: Decidir qué página conviene descargar a continuación en una
+corrida con deadline. Las homes van primero, luego las páginas con más chance de
+tener datos de contacto (rutas tipo /contacto y entradas del sitemap.xml), y los
+sitios que todavía no tienen email se priorizan sobre los que ya lo tienen, para
+maximizar emails encontrados por request. Aplica un presupuesto de páginas y de
+profundidad por sitio, y un presupuesto global de tiempo.
+"""
+
+import heapq
+import itertools
+import queue
+import threading
+import time
+import logging
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Prioridades base (mayor = antes)
+HOMEPAGE_PRIORITY = 1000
+SITEMAP_PRIORITY = 15
+# Bonus para páginas de sitios que todavía no tienen ningún email
+NO_EMAIL_BONUS = 50
+DEPTH_PENALTY = 5
+
+class SiteCrawlState:
+    """Estado de un sitio dentro del frontier"""
+
+    def __init__(self, key, url, name, payload=None):
+        self.key = key
+        self.url = url
+        self.name = name
+        # Datos del llamador que viajan con el sitio (ej. índices de filas del DataFrame)
+        self.payload = payload
+        self.emails = set()
+        self.social_media = {}
+        self.visited = set()
+        self.pages_fetched = 0
+        self.in_flight = 0
+        self.queued = 0
+        self.done = False
+        self.reported = False
+        self.error = None
+        self.started = time.time()
+
+    def add_results(self, emails, social_media):
+        self.emails.update(emails)
+        for link in social_media:
+            self.social_media.setdefault(link.split(':', 1)[0], link)
+
+    def to_result(self, deadline_reached=False):
+        """Resultado con la misma forma que WebsiteScraper.scrape_single_website"""
+        meta = {'pages_fetched': self.pages_fetched, 'elapsed': time.time() - self.started}
+        if self.error:
+            meta['error'] = self.error
+        if deadline_reached:
+            meta['deadline_reached'] = True
+        return {'emails': sorted(self.emails), 'social_media': list(self.social_media.values()), 'meta': meta}
+
+class CrawlFrontier:
+    """Cola de prioridades compartida por todos los workers de una corrida"""
+
+    def __init__(self, page_budget=3, max_depth=2, time_budget=None, url_key=None):
+        self.page_budget = page_budget
+        # Clave para detectar URLs ya vistas (ej. la URL canónica); por defecto la URL tal cual
+        self.url_key = url_key or (lambda url: url)
+        self.max_depth = max_depth
+        self.deadline = time.time() + time_budget if time_budget is not None else None
+        # Mientras haya sitios por llegar (corridas por lotes) los workers esperan en lugar de terminar
+        self.sites_open = False
+        self.sites = {}
+        self.completed = queue.Queue()
+        self._heap = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+    def deadline_reached(self):
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def add_site(self, key, url, name, payload=None):
+        site = SiteCrawlState(key, url, name, payload)
+        with self._cond:
+            self.sites[key] = site
+        self.push(site, url, HOMEPAGE_PRIORITY, depth=0)
+        return site
+
+    def close_sites(self):
+        """No llegan más sitios: los workers terminan cuando se vacía la cola"""
+        with self._cond:
+            self.sites_open = False
+            self._cond.notify_all()
+
+    def expire(self):
+        """Adelanta el deadline a ahora (cancelación): los workers dejan de tomar páginas"""
+        with self._cond:
+            self.deadline = time.time()
+            self._cond.notify_all()
+
+    def push(self, site, url, priority, depth, kind='page'):
+        """Encola una URL del sitio si no fue vista y entra en los presupuestos de profundidad/páginas"""
+        key = self.url_key(url)
+        with self._cond:
+            if site.done or key in site.visited or depth > self.max_depth:
+                return False
+            if site.pages_fetched + site.in_flight + site.queued >= self.page_budget:
+                return False
+            site.visited.add(key)
+            site.queued += 1
+            bonus = NO_EMAIL_BONUS if not site.emails and depth > 0 else 0
+            score = priority + bonus - depth * DEPTH_PENALTY
+            heapq.heappush(self._heap, (-score, next(self._seq), site.key, url, depth, kind, bonus))
+            self._cond.notify()
+            return True
+
+    def pop(self):
+        """
+        Devuelve la próxima (site, url, depth, kind) a descargar, esperando si hay páginas
+        en vuelo que puedan encolar más. Retorna None cuando no queda trabajo o venció el deadline.
+        """
+        with self._cond:
+            while True:
+                if self.deadline_reached():
+                    self._cond.notify_all()
+                    return None
+                if not self._heap:
+                    if self._in_flight == 0 and not self.sites_open:
+                        self._cond.notify_all()
+                        return None
+                    self._cond.wait(timeout=0.5)
+                    continue
+
+                neg_score, _, key, url, depth, kind, bonus = heapq.heappop(self._heap)
+                site = self.sites[key]
+                site.queued -= 1
+                if site.done:
+                    self._maybe_complete(site)
+                    continue
+                if bonus and site.emails:
+                    # El sitio ya consiguió email desde que se encoló: pierde el bonus y vuelve a la cola
+                    site.queued += 1
+                    heapq.heappush(self._heap, (neg_score + bonus, next(self._seq), key, url, depth, kind, 0))
+                    continue
+
+                site.in_flight += 1
+                self._in_flight += 1
+                return site, url, depth, kind
+
+    def record_results(self, site, emails, social_media):
+        """Suma al sitio los emails y redes de una página (los workers lo llaman en paralelo)"""
+        with self._cond:
+            site.add_results(emails, social_media)
+
+    def task_done(self, site, finished=False):
+        """Marca como terminada una descarga; finished=True da el sitio por completo"""
+        with self._cond:
+            site.in_flight -= 1
+            site.pages_fetched += 1
+            self._in_flight -= 1
+            if finished:
+                site.done = True
+            self._maybe_complete(site)
+            self._cond.notify_all()
+
+    def _maybe_complete(self, site):
+        if site.reported or site.in_flight:
+            return
+        if site.done or site.queued == 0:
+            site.done = True
+            site.reported = True
+            self.completed.put(site)
+
+    def drain_unfinished(self):
+        """Tras el deadline, reporta los sitios que quedaron con páginas pendientes"""
+        with self._cond:
+            leftovers = [s for s in self.sites.values() if not s.reported]
+            for site in leftovers:
+                site.done = True
+                site.reported = True
+        return leftovers
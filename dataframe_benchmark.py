@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+📏 DataFrame Benchmark - Mide las funciones de limpieza de datos del orquestador
+
+Genera DataFrames sintéticos con la forma de los datos reales (salida de Places
++ scraping) y compara la implementación actual de cada función contra la
+versión anterior fila por fila, que se conserva acá como referencia. Antes de
+medir verifica que ambas den exactamente el mismo resultado.
+
+Uso:
+    python dataframe_benchmark.py --sizes 10000,100000,1000000
+    python dataframe_benchmark.py --sizes 10000 --only phones
+"""
+
+import argparse
+import re
+import random
+import time
+import logging
+
+import numpy as np
+import pandas as pd
+
+from main_orchestrator import (classify_urls, clean_dataframe_for_sheets, reclassify_website_urls, separate_social_media_data,
+                               transform_places_data)
+from phone_normalizer import STRING_DTYPE, clean_phone_number, normalize_phone_numbers
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- Implementaciones de referencia (versiones anteriores, fila por fila) ---
+
+# clean_phone_number original (copia textual del baseline: ninguna regla nueva)
+def reference_clean_phone_number(phone):
+    """
+    Limpia y formatea un número de teléfono para WhatsApp Argentina (+54 9 código área número)
+    """
+    if not phone or pd.isna(phone):
+        return ""
+
+    # Convertir a string y limpiar
+    phone = str(phone).strip()
+
+    # Remover caracteres no numéricos excepto el +
+    phone_clean = re.sub(r'[^\d+]', '', phone)
+
+    # Si ya está en formato WhatsApp correcto (+54 9), mantenerlo
+    if phone_clean.startswith('+549'):
+        return phone_clean
+
+    # Si tiene +54 pero no el 9, agregarlo
+    if phone_clean.startswith('+54') and not phone_clean.startswith('+549'):
+        # Extraer el número después del +54
+        number_part = phone_clean[3:]
+        return f"+549{number_part}"
+
+    # Si empieza con 54 (sin +), agregar + y 9
+    if phone_clean.startswith('54') and not phone_clean.startswith('549'):
+        number_part = phone_clean[2:]
+        return f"+549{number_part}"
+
+    # Si empieza con 549, solo agregar +
+    if phone_clean.startswith('549'):
+        return f"+{phone_clean}"
+
+    # Números de Buenos Aires (011 o 11)
+    if phone_clean.startswith('011'):
+        number_part = phone_clean[3:]  # Remover 011
+        return f"+54911{number_part}"
+    elif phone_clean.startswith('11'):
+        number_part = phone_clean[2:]  # Remover 11
+        return f"+54911{number_part}"
+
+    # Otros códigos de área argentinos con 0 inicial (ej: 0341, 0351, etc.)
+    if phone_clean.startswith('0') and len(phone_clean) >= 11:
+        # Remover el 0 inicial y agregar +549
+        number_part = phone_clean[1:]
+        return f"+549{number_part}"
+
+    # Para otros números argentinos (códigos de área), asumir que necesitan +54 9
+    # Si el número tiene 10 dígitos o más, probablemente ya incluye código de área
+    if len(phone_clean) >= 10:
+        return f"+549{phone_clean}"
+
+    # Para números más cortos, asumir Buenos Aires
+    return f"+54911{phone_clean}"
+
+def reference_clean_dataframe_for_sheets(df, search_query="", search_location=""):
+    df_clean = df.fillna('')
+    if search_query:
+        df_clean['search_query'] = search_query
+    if search_location:
+        df_clean['search_location'] = search_location
+    if 'nationalPhoneNumber' in df_clean.columns:
+        df_clean['nationalPhoneNumber'] = df_clean['nationalPhoneNumber'].apply(reference_clean_phone_number)
+
+    facebook_urls = []
+    instagram_urls = []
+    if 'social_media_links' in df_clean.columns:
+        social_media_split = df_clean['social_media_links'].apply(separate_social_media_data)
+        scraped_facebook = [x[0] for x in social_media_split]
+        scraped_instagram = [x[1] for x in social_media_split]
+    else:
+        scraped_facebook = [''] * len(df_clean)
+        scraped_instagram = [''] * len(df_clean)
+    places_facebook = df_clean.get('places_facebook_url', [''] * len(df_clean))
+    places_instagram = df_clean.get('places_instagram_url', [''] * len(df_clean))
+    for i in range(len(df_clean)):
+        fb_final = scraped_facebook[i] if scraped_facebook[i] else str(places_facebook.iloc[i] if hasattr(places_facebook, 'iloc') else places_facebook[i] if i < len(places_facebook) else '')
+        facebook_urls.append(fb_final)
+        ig_final = scraped_instagram[i] if scraped_instagram[i] else str(places_instagram.iloc[i] if hasattr(places_instagram, 'iloc') else places_instagram[i] if i < len(places_instagram) else '')
+        instagram_urls.append(ig_final)
+    df_clean['facebook_url'] = facebook_urls
+    df_clean['instagram_url'] = instagram_urls
+    if 'places_facebook_url' in df_clean.columns:
+        df_clean = df_clean.drop(['places_facebook_url', 'places_instagram_url'], axis=1)
+
+    for col in df_clean.columns:
+        if df_clean[col].dtype == 'object':
+            df_clean[col] = df_clean[col].astype(str)
+            df_clean[col] = df_clean[col].str.replace(r"^\['|'\]$", "", regex=True)
+            df_clean[col] = df_clean[col].str.replace(r"', '", "; ", regex=True)
+    df_clean = df_clean.replace('None', '')
+    df_clean = df_clean.replace('nan', '')
+    df_clean = df_clean.replace('NaN', '')
+    return df_clean
+
+def reference_classify_url(url):
+    """
+    Clasifica una URL como sitio web real o red social
+    Retorna: ('website', url) o ('facebook', url) o ('instagram', url) o ('other_social', url)
+    """
+    if not url or pd.isna(url):
+        return 'empty', ''
+
+    url_str = str(url).lower().strip()
+
+    # Verificar redes sociales específicas
+    if 'facebook.com' in url_str or 'fb.com' in url_str:
+        return 'facebook', url
+    elif 'instagram.com' in url_str or 'instagr.am' in url_str:
+        return 'instagram', url
+    elif any(domain in url_str for domain in ['twitter.com', 'linkedin.com', 'youtube.com', 'tiktok.com']):
+        return 'other_social', url
+    else:
+        # Es un sitio web real
+        return 'website', url
+
+def reference_transform_places_data(places_results):
+    """
+    Transforma la estructura de datos de GooglePlacesFetcher al formato esperado por el sistema
+    """
+    transformed_data = []
+    for place in places_results:
+        # Clasificar la URL del sitio web
+        website_url = place.get('website', '')
+        url_type, clean_url = reference_classify_url(website_url)
+
+        # Inicializar campos
+        final_website = ''
+        places_facebook = ''
+        places_instagram = ''
+
+        # Asignar según el tipo de URL
+        if url_type == 'website':
+            final_website = clean_url
+        elif url_type == 'facebook':
+            places_facebook = clean_url
+        elif url_type == 'instagram':
+            places_instagram = clean_url
+        # Si es 'other_social' o 'empty', no asignamos nada
+
+        transformed_place = {
+            'place_id': place.get('place_id', ''),
+            'displayName.text': place.get('name', ''),
+            'formattedAddress': place.get('address', ''),
+            'rating': place.get('rating', ''),
+            'userRatingCount': place.get('user_ratings_total', ''),
+            'websiteUri': final_website,  # Solo sitios web reales
+            'nationalPhoneNumber': place.get('phone', ''),
+            'latitude': place.get('latitude', ''),
+            'longitude': place.get('longitude', ''),
+            'types': str(place.get('types', [])),  # Convertir lista a string
+            # Campos temporales para redes sociales de Google Places
+            'places_facebook_url': places_facebook,
+            'places_instagram_url': places_instagram
+        }
+        transformed_data.append(transformed_place)
+
+    return transformed_data
+
+def reference_reclassify_website_urls(existing_data):
+    websites_moved = 0
+    facebooks_added = 0
+    instagrams_added = 0
+    for idx, row in existing_data.iterrows():
+        website_url = row.get('websiteUri', '')
+        current_facebook = row.get('facebook_url', '')
+        current_instagram = row.get('instagram_url', '')
+        if website_url and str(website_url) != 'nan':
+            url_type, clean_url = reference_classify_url(website_url)
+            if url_type in ['facebook', 'instagram']:
+                existing_data.at[idx, 'websiteUri'] = ''
+                websites_moved += 1
+                if url_type == 'facebook' and not current_facebook:
+                    existing_data.at[idx, 'facebook_url'] = clean_url
+                    facebooks_added += 1
+                elif url_type == 'instagram' and not current_instagram:
+                    existing_data.at[idx, 'instagram_url'] = clean_url
+                    instagrams_added += 1
+    return {'websites_moved': websites_moved, 'facebooks_added': facebooks_added, 'instagrams_added': instagrams_added}
+
+# --- Datos sintéticos ---
+
+PHONE_SAMPLES = [
+    '011 4567-8901', '11 4567 8901', '+54 11 4567-8901', '+54 9 11 4567-8901', '5491145678901',
+    '541145678901', '0341 456-7890', '0351 15 456-7890', '(0221) 423-4567', '4567-8901', '+1 212 555 0100',
+    '0800 222 3333', '', None, np.nan,
+]
+SOCIAL_SAMPLES = [
+    '', 'facebook:https://facebook.com/negocio', 'instagram:https://instagram.com/negocio',
+    'facebook:https://facebook.com/a; instagram:https://instagram.com/b',
+    'instagram:https://instagram.com/x; facebook:https://facebook.com/y; facebook:https://facebook.com/z',
+    'twitter:https://twitter.com/t', ' facebook: https://facebook.com/esp ;instagram:https://instagram.com/i ',
+    None,
+]
+# Casos donde comparar contra el host cambia el resultado de classify_url original
+# (que buscaba los dominios en cualquier parte de la URL)
+HOST_MATCHING_CASES = {
+    'https://www.cotillon.com.ar/?ref=facebook.com': 'website',
+    'https://mifb.com': 'website',
+    'https://www.tienda.com/instagram.com-promo': 'website',
+    'https://m.facebook.com/negocio': 'facebook',
+    'HTTPS://WWW.INSTAGRAM.COM/negocio/': 'instagram',
+    'facebook.com/negocio': 'facebook',
+    'https://usuario@instagr.am/negocio': 'instagram',
+    'https://ar.linkedin.com/company/x': 'other_social',
+    'https://facebook.com.ar/negocio': 'facebook',
+    'www.instagram.com.ar/x': 'instagram',
+    'https://www.facebook.com.ar.': 'facebook',
+    'https://www.facebook.com.tienda.ar/': 'website',
+    '': 'empty',
+}
+# Códigos de área de los teléfonos sintéticos (3 y 4 dígitos, sin el 0)
+SYNTHETIC_AREA_CODES = ['220', '221', '223', '230', '236', '237', '249', '260', '261', '263', '2965', '3541', '2202']
+PHONE_PREFIXES = ['', '+54', '54', '+549', '549', '+54 9 ', '0', '011', '11', '15', '+1 ', '(0', '0800 ']
+WEBSITE_SAMPLES = [
+    'https://www.negocio.com.ar', 'http://cotillon.com', '', None, 'https://tienda.mitiendanube.com/',
+]
+
+def synthetic_frame(rows, seed=0):
+    """DataFrame con las columnas que produce el pipeline (Places transformado + scraping)"""
+    rng = random.Random(seed)
+    pick = lambda samples: [rng.choice(samples) for _ in range(rows)]
+    return pd.DataFrame({
+        'place_id': [f'ChIJ{i:08d}' for i in range(rows)],
+        'displayName.text': [f"Cotillón {i}" if i % 50 else None for i in range(rows)],
+        'formattedAddress': [f"Av. Corrientes {i}, CABA" for i in range(rows)],
+        'rating': [rng.choice([4.5, 3.9, np.nan, 5.0]) for _ in range(rows)],
+        'userRatingCount': [rng.choice([10, 250, np.nan]) for _ in range(rows)],
+        'websiteUri': pick(WEBSITE_SAMPLES),
+        'nationalPhoneNumber': pick(PHONE_SAMPLES),
+        'latitude': [-34.6 + rng.random() / 100 for _ in range(rows)],
+        'longitude': [-58.4 + rng.random() / 100 for _ in range(rows)],
+        'types': pick(["['store', 'point_of_interest']", "['party_store']", "[]", "['a', 'b', 'c']"]),
+        'places_facebook_url': pick(['', '', 'https://facebook.com/places', None]),
+        'places_instagram_url': pick(['', 'https://instagram.com/places', None]),
+        'scraped_emails': pick(['', 'ventas@negocio.com.ar', 'a@b.com; c@d.com.ar', None]),
+        'social_media_links': pick(SOCIAL_SAMPLES),
+    })
+
+def synthetic_phones(rows, seed=0):
+    """Teléfonos aleatorios con prefijos, códigos de área y separadores variados"""
+    rng = random.Random(seed)
+    area_codes = ['11', *SYNTHETIC_AREA_CODES]
+    phones = []
+    for _ in range(rows):
+        roll = rng.random()
+        if roll < 0.03:
+            phones.append(rng.choice(['', None, np.nan, 'sin teléfono', 1145678901.0, 'Teléfono: 0351 15 456-7890', '٣٥١ ٤٥٦ ٧٨٩٠']))
+            continue
+        number = rng.choice(area_codes) + ('15' if roll < 0.25 else '')
+        number += ''.join(rng.choice('0123456789') for _ in range(rng.randint(5, 9)))
+        separator = rng.choice(['', ' ', '-', ' - '])
+        cut = rng.randint(1, len(number) - 1)
+        phones.append(f"{rng.choice(PHONE_PREFIXES)}{number[:cut]}{separator}{number[cut:]}")
+    return pd.Series(phones, dtype=object)
+
+def synthetic_places(rows, seed=0):
+    """Registros con la forma que devuelve GooglePlacesFetcher (lista de diccionarios)"""
+    rng = random.Random(seed)
+    websites = [*WEBSITE_SAMPLES, 'https://www.facebook.com/cotillon', 'http://instagram.com/fiesta',
+                'https://twitter.com/x', 'https://www.youtube.com/@canal', 'https://es-la.facebook.com/p']
+    return [{
+        'place_id': f'ChIJ{i:08d}',
+        'name': f"Cotillón {i}",
+        'address': f"Av. Corrientes {i}, CABA",
+        'phone': rng.choice(PHONE_SAMPLES[:-1]),
+        'website': rng.choice(websites),
+        'latitude': -34.6 + rng.random() / 100,
+        'longitude': -58.4 + rng.random() / 100,
+        'rating': rng.choice([4.5, 3.9, None]),
+        'user_ratings_total': rng.choice([10, 250, None]),
+        'types': rng.choice([['store', 'point_of_interest'], ['party_store'], None]),
+    } for i in range(rows)]
+
+def synthetic_sheet(rows, seed=0):
+    """Datos históricos como los devuelve GoogleSheetsManager.get_existing_data (todo strings)"""
+    rng = random.Random(seed)
+    websites = ['https://www.negocio.com.ar', '', 'https://www.facebook.com/cotillon', 'http://instagram.com/fiesta',
+                'https://twitter.com/x', 'nan', 'https://m.facebook.com/p']
+    return pd.DataFrame({
+        'place_id': [f'ChIJ{i:08d}' for i in range(rows)],
+        'websiteUri': [rng.choice(websites) for _ in range(rows)],
+        'facebook_url': [rng.choice(['', '', 'https://facebook.com/ya']) for _ in range(rows)],
+        'instagram_url': [rng.choice(['', 'https://instagram.com/ya']) for _ in range(rows)],
+    }, dtype=object)
+
+# --- Ejecución ---
+
+def _timed(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+def bench_clean(rows):
+    df = synthetic_frame(rows)
+    logging.disable(logging.INFO)
+    try:
+        expected, reference_seconds = _timed(reference_clean_dataframe_for_sheets, df.copy(), "cotillones", "Once")
+        result, seconds = _timed(clean_dataframe_for_sheets, df.copy(), search_query="cotillones", search_location="Once")
+    finally:
+        logging.disable(logging.NOTSET)
+    pd.testing.assert_frame_equal(result, expected)
+    return reference_seconds, seconds
+
+def bench_phones(rows):
+    phones = synthetic_phones(rows)
+    expected, reference_seconds = _timed(phones.apply, reference_clean_phone_number)
+    result, seconds = _timed(normalize_phone_numbers, phones)
+    pd.testing.assert_series_equal(result, expected.astype(object))
+    # El camino escalar (un teléfono, sin pandas) también tiene que dar lo mismo que el original
+    assert [clean_phone_number(phone) for phone in phones] == expected.tolist()
+    return reference_seconds, seconds
+
+def bench_transform(rows):
+    places = synthetic_places(rows)
+    logging.disable(logging.INFO)
+    try:
+        expected, reference_seconds = _timed(lambda: pd.DataFrame(reference_transform_places_data(places)))
+        result, seconds = _timed(transform_places_data, places)
+    finally:
+        logging.disable(logging.NOTSET)
+    pd.testing.assert_frame_equal(result, expected)
+
+    cases = pd.Series(list(HOST_MATCHING_CASES))
+    assert classify_urls(cases).tolist() == list(HOST_MATCHING_CASES.values())
+    return reference_seconds, seconds
+
+def bench_cleanup(rows):
+    sheet = synthetic_sheet(rows)
+    expected_frame = sheet.copy()
+    expected, reference_seconds = _timed(reference_reclassify_website_urls, expected_frame)
+    result_frame = sheet.copy()
+    result, seconds = _timed(reclassify_website_urls, result_frame)
+    assert result == expected, (result, expected)
+    pd.testing.assert_frame_equal(result_frame, expected_frame)
+    return reference_seconds, seconds
+
+BENCHMARKS = {
+    'clean': ('clean_dataframe_for_sheets', bench_clean),
+    'phones': ('normalize_phone_numbers', bench_phones),
+    'transform': ('transform_places_data', bench_transform),
+    'cleanup': ('cleanup_historical_urls', bench_cleanup),
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de las funciones de limpieza de DataFrames")
+    parser.add_argument('--sizes', default='10000,100000,1000000', help="Cantidad de filas separadas por coma")
+    parser.add_argument('--only', choices=sorted(BENCHMARKS), help="Correr un solo benchmark")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    selected = [args.only] if args.only else list(BENCHMARKS)
+    logger.info(f"🧵 Motor de strings: {'pyarrow' if STRING_DTYPE is not object else 'python (sin pyarrow)'}")
+    for key in selected:
+        label, bench = BENCHMARKS[key]
+        for rows in sizes:
+            reference_seconds, seconds = bench(rows)
+            logger.info(
+                f"📊 {label} | {rows:>9,} filas | anterior {reference_seconds:8.2f}s | actual {seconds:8.2f}s | "
+                f"{reference_seconds / max(seconds, 1e-9):5.1f}x | resultados idénticos ✅"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+🏙️ Fake Places API - Servidor local que imita Geocoding, Text Search y Details
+
+Responsabilidad: Responder como la Places API Web Service de Google a partir de
+una ciudad sintética de N negocios, para probar el fetcher a escala sin gastar
+cuota ni depender de la red. Imita lo que condiciona la estrategia de búsqueda:
+
+- Text Search devuelve páginas de 20 resultados y un máximo de 60 por búsqueda,
+  ordenados por cercanía al punto pedido y limitados al radio.
+- El next_page_token recién sirve unos segundos después de emitido; antes
+  responde INVALID_REQUEST, como Google.
+- Por encima del límite de QPS responde OVER_QUERY_LIMIT (HTTP 200, como Google).
+- Details devuelve los campos que usa el fetcher; Geocode devuelve el viewport
+  de la ciudad para cualquier dirección.
+
+Los negocios se reparten en el espacio según una distribución: 'uniform'
+(pareja en todo el círculo de la ciudad), 'center' (concentrada en el centro)
+o 'clustered' (zonas comerciales densas, como Once o Flores, sobre un fondo
+disperso). La misma semilla genera siempre la misma ciudad.
+
+Uso:
+    python fake_places_api.py --businesses 5000 --distribution clustered --port 8800
+    # En otra terminal, cualquier proceso del proyecto puede apuntar al servidor:
+    GOOGLE_API_BASE_URL=http://127.0.0.1:8800/maps/api python leads_cli.py search --query cotillones ...
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+import logging
+
+from search_cache import normalize_text
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DISTRIBUTIONS = ('uniform', 'center', 'clustered')
+DEFAULT_CATEGORIES = ('cotillón', 'librería', 'ferretería', 'kiosco')
+# Obelisco, Buenos Aires
+DEFAULT_CENTER = (-34.6037, -58.3816)
+DEFAULT_RADIUS_METERS = 8000
+# Límites de Text Search de la API real
+PAGE_SIZE = 20
+MAX_RESULTS_PER_SEARCH = 60
+MAX_SEARCH_RADIUS = 50000
+DEFAULT_PAGE_TOKEN_DELAY = 2.0
+# Los tokens sin usar se descartan pasado este tiempo
+PAGE_TOKEN_TTL = 300
+DEFAULT_QPS = 50
+METERS_PER_DEGREE = 111000
+# Proporciones de la ciudad sintética
+CLUSTER_COUNT = 6
+CLUSTER_BACKGROUND_SHARE = 0.2
+WEBSITE_SHARE = 0.6
+BASE_PATH = '/maps/api'
+
+def distance_meters(lat1, lng1, lat2, lng2):
+    """Distancia aproximada (proyección equirectangular, suficiente a escala de ciudad)"""
+    dx = (lng2 - lng1) * METERS_PER_DEGREE * math.cos(math.radians((lat1 + lat2) / 2))
+    dy = (lat2 - lat1) * METERS_PER_DEGREE
+    return math.hypot(dx, dy)
+
+class SyntheticCity:
+    """Negocios sintéticos con posición, categoría y los datos que devuelve Details"""
+
+    def __init__(self, num_businesses=2000, distribution='clustered', categories=DEFAULT_CATEGORIES,
+                 center=DEFAULT_CENTER, radius_meters=DEFAULT_RADIUS_METERS, seed=42):
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Distribución desconocida: {distribution} (usar {', '.join(DISTRIBUTIONS)})")
+        self.center = center
+        self.radius_meters = radius_meters
+        self.distribution = distribution
+        self.categories = list(categories)
+        rng = random.Random(seed)
+        clusters = [self._uniform_point(rng) for _ in range(CLUSTER_COUNT)]
+
+        self.businesses = []
+        for i in range(num_businesses):
+            lat, lng = self._place(rng, clusters)
+            category = self.categories[i % len(self.categories)]
+            has_website = rng.random() < WEBSITE_SHARE
+            self.businesses.append({
+                'place_id': f"fake_{i:06d}",
+                'name': f"{category.capitalize()} {i}",
+                'category': category,
+                'lat': lat,
+                'lng': lng,
+                'formatted_address': f"Calle Falsa {100 + i}, Buenos Aires",
+                'international_phone_number': f"+54 11 4{i % 1000:03d}-{rng.randint(0, 9999):04d}",
+                'website': f"https://negocio{i}.example.com/" if has_website else None,
+                'rating': round(rng.uniform(3.0, 5.0), 1),
+                'user_ratings_total': rng.randint(0, 500),
+            })
+        self._by_id = {b['place_id']: b for b in self.businesses}
+        self._normalized_categories = {category: normalize_text(category) for category in self.categories}
+        logger.info(f"🏙️ Ciudad sintética: {num_businesses} negocios ({distribution}) en {len(self.categories)} rubros")
+
+    def _uniform_point(self, rng):
+        # Raíz cuadrada del radio para repartir parejo en el área del círculo
+        return self._offset(rng.uniform(0, 2 * math.pi), self.radius_meters * math.sqrt(rng.random()))
+
+    def _offset(self, angle, meters, origin=None):
+        lat0, lng0 = origin or self.center
+        lat = lat0 + meters * math.sin(angle) / METERS_PER_DEGREE
+        lng = lng0 + meters * math.cos(angle) / (METERS_PER_DEGREE * math.cos(math.radians(lat0)))
+        return lat, lng
+
+    def _place(self, rng, clusters):
+        if self.distribution == 'uniform':
+            return self._uniform_point(rng)
+        if self.distribution == 'center':
+            return self._offset(rng.uniform(0, 2 * math.pi), abs(rng.gauss(0, self.radius_meters / 3)))
+        if rng.random() < CLUSTER_BACKGROUND_SHARE:
+            return self._uniform_point(rng)
+        origin = rng.choice(clusters)
+        return self._offset(rng.uniform(0, 2 * math.pi), abs(rng.gauss(0, self.radius_meters / 15)), origin)
+
+    def get(self, place_id):
+        return self._by_id.get(place_id)
+
+    def matching(self, query):
+        """Negocios cuyo rubro coincide con la búsqueda ("cotillones" encuentra "cotillón")"""
+        words = [w for w in normalize_text(query).split() if len(w) >= 3]
+        categories = {category for category, normalized in self._normalized_categories.items()
+                      if any(w.startswith(normalized) or normalized.startswith(w) for w in words)}
+        return [b for b in self.businesses if b['category'] in categories]
+
+    def search(self, query, lat, lng, radius):
+        """Negocios de la búsqueda dentro del radio, del más cercano al más lejano"""
+        found = []
+        for b in self.matching(query):
+            distance = distance_meters(lat, lng, b['lat'], b['lng'])
+            if distance <= radius:
+                found.append((distance, b))
+        found.sort(key=lambda item: item[0])
+        return [b for _, b in found]
+
+    def viewport(self):
+        lat, lng = self.center
+        dlat = self.radius_meters / METERS_PER_DEGREE
+        dlng = self.radius_meters / (METERS_PER_DEGREE * math.cos(math.radians(lat)))
+        return {
+            'northeast': {'lat': lat + dlat, 'lng': lng + dlng},
+            'southwest': {'lat': lat - dlat, 'lng': lng - dlng},
+        }
+
+class FakePlacesServer:
+    """Servidor HTTP local con los endpoints de Places y Geocoding respaldados por una SyntheticCity"""
+
+    def __init__(self, city, host='127.0.0.1', port=0, qps=DEFAULT_QPS, page_token_delay=DEFAULT_PAGE_TOKEN_DELAY):
+        self.city = city
+        self.host = host
+        self.port = port
+        self.qps = qps
+        self.page_token_delay = page_token_delay
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._recent = deque()
+        self._page_tokens = {}
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """Base para GooglePlacesFetcher(base_url=...) o GOOGLE_API_BASE_URL"""
+        return f"http://{self.host}:{self.port}{BASE_PATH}"
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                params = dict(parse_qsl(parts.query, keep_blank_values=True))
+                body = json.dumps(server.handle(parts.path, params), ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"🧪 Fake Places API en {self.base_url} (límite {self.qps:g} QPS)")
+        return self
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats.clear()
+
+    # --- Lógica de la API (independiente de HTTP) ---
+
+    def handle(self, path, params):
+        """Respuesta JSON para una ruta de la API y sus parámetros"""
+        endpoint = path[len(BASE_PATH):] if path.startswith(BASE_PATH) else path
+        handlers = {
+            '/geocode/json': self._geocode,
+            '/place/textsearch/json': self._text_search,
+            '/place/details/json': self._details,
+        }
+        handler = handlers.get(endpoint)
+        if handler is None:
+            return self._error('NOT_FOUND', f"Endpoint desconocido: {path}")
+        with self._lock:
+            self.stats[endpoint] += 1
+        if not params.get('key'):
+            return self._error('REQUEST_DENIED', "You must use an API key to authenticate each request.")
+        if not self._admit():
+            return self._error('OVER_QUERY_LIMIT', "You have exceeded your rate-limit for this API.")
+        return handler(params)
+
+    def _admit(self):
+        """Ventana deslizante de un segundo: los requests rechazados no cuentan"""
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and now - self._recent[0] >= 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.qps:
+                return False
+            self._recent.append(now)
+            return True
+
+    def _error(self, status, message):
+        with self._lock:
+            self.stats[status] += 1
+        return {'status': status, 'error_message': message, 'results': []}
+
+    def _geocode(self, params):
+        if not params.get('address', '').strip():
+            return self._error('INVALID_REQUEST', "Invalid request. Missing the 'address' parameter.")
+        lat, lng = self.city.center
+        return {'status': 'OK', 'results': [{
+            'formatted_address': params['address'],
+            'geometry': {'location': {'lat': lat, 'lng': lng}, 'viewport': self.city.viewport()},
+        }]}
+
+    def _text_search(self, params):
+        token = params.get('pagetoken')
+        if token:
+            with self._lock:
+                entry = self._page_tokens.get(token)
+            if entry is None or time.monotonic() < entry['ready_at']:
+                # Token inexistente o todavía no activado
+                return self._error('INVALID_REQUEST', "Invalid request.")
+            results, offset = entry['results'], entry['offset']
+        else:
+            if not params.get('query'):
+                return self._error('INVALID_REQUEST', "Invalid request. Missing the 'query' parameter.")
+            try:
+                lat, lng = (float(v) for v in params.get('location', '').split(','))
+                radius = min(float(params.get('radius', MAX_SEARCH_RADIUS)), MAX_SEARCH_RADIUS)
+            except ValueError:
+                lat, lng = self.city.center
+                radius = MAX_SEARCH_RADIUS
+            results = self.city.search(params['query'], lat, lng, radius)[:MAX_RESULTS_PER_SEARCH]
+            offset = 0
+
+        page = results[offset:offset + PAGE_SIZE]
+        if not page:
+            return {'status': 'ZERO_RESULTS', 'results': []}
+        response = {'status': 'OK', 'results': [self._search_result(b) for b in page]}
+        if offset + PAGE_SIZE < len(results):
+            next_token = uuid.uuid4().hex
+            now = time.monotonic()
+            with self._lock:
+                for expired in [t for t, e in self._page_tokens.items() if now - e['ready_at'] > PAGE_TOKEN_TTL]:
+                    del self._page_tokens[expired]
+                self._page_tokens[next_token] = {
+                    'results': results,
+                    'offset': offset + PAGE_SIZE,
+                    'ready_at': now + self.page_token_delay,
+                }
+            response['next_page_token'] = next_token
+        return response
+
+    def _search_result(self, business):
+        return {
+            'place_id': business['place_id'],
+            'name': business['name'],
+            'formatted_address': business['formatted_address'],
+            'geometry': {'location': {'lat': business['lat'], 'lng': business['lng']}},
+            'rating': business['rating'],
+            'user_ratings_total': business['user_ratings_total'],
+            'types': ['store', 'point_of_interest', 'establishment'],
+        }
+
+    def _details(self, params):
+        business = self.city.get(params.get('place_id', ''))
+        if business is None:
+            return self._error('NOT_FOUND', "The place ID was not found.")
+        result = self._search_result(business)
+        result['international_phone_number'] = business['international_phone_number']
+        if business['website']:
+            result['website'] = business['website']
+        return {'status': 'OK', 'result': result}
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que imita las APIs de Places y Geocoding")
+    parser.add_argument('--businesses', type=int, default=2000, help="Negocios de la ciudad sintética")
+    parser.add_argument('--distribution', default='clustered', choices=DISTRIBUTIONS, help="Reparto espacial")
+    parser.add_argument('--categories', default=','.join(DEFAULT_CATEGORIES), help="Rubros separados por coma")
+    parser.add_argument('--radius', type=int, default=DEFAULT_RADIUS_METERS, help="Radio de la ciudad en metros")
+    parser.add_argument('--seed', type=int, default=42, help="Semilla de la ciudad")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--qps', type=float, default=DEFAULT_QPS, help="Requests por segundo antes de OVER_QUERY_LIMIT")
+    parser.add_argument('--page-token-delay', type=float, default=DEFAULT_PAGE_TOKEN_DELAY,
+                        help="Segundos hasta que un next_page_token es válido")
+    args = parser.parse_args()
+
+    categories = [c.strip() for c in args.categories.split(',') if c.strip()]
+    city = SyntheticCity(args.businesses, args.distribution, categories, radius_meters=args.radius, seed=args.seed)
+    server = FakePlacesServer(city, args.host, args.port, args.qps, args.page_token_delay).start()
+    logger.info(f"👉 Usar GOOGLE_API_BASE_URL={server.base_url} (Ctrl+C para terminar)")
+    try:
+        while True:
+            time.sleep(60)
+            logger.info(f"📊 Requests: {dict(server.stats)}")
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
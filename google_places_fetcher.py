@@ -13,8 +13,10 @@ import time
 import logging
 import requests
 import pandas as pd
-from typing import List, Dict, Optional, Set, Tuple
+from typing import List, Dict, Iterator, Optional, Set, Tuple
 from dotenv import load_dotenv
+import app_config
+from admission_control import google_api_limiter
 
 # --- Configuración de Logging ---
 logging.basicConfig(
@@ -27,24 +29,39 @@ logger = logging.getLogger(__name__)
 # --- Carga de variables de entorno ---
 load_dotenv()
 
-class GooglePlacesFetcher:
-    TEXT_SEARCH_URL = "https://maps.googleapis.com/maps/api/place/textsearch/json"
-    DETAILS_URL     = "https://maps.googleapis.com/maps/api/place/details/json"
+# Pausa por defecto entre requests de una búsqueda (los Details esperan la mitad)
+DEFAULT_REQUEST_DELAY = 1.0
+# Google tarda unos segundos en activar el next_page_token de Text Search
+PAGE_TOKEN_DELAY = 2
+# Base de la API real; se puede apuntar a un servidor local (ver fake_places_api.py)
+DEFAULT_API_BASE_URL = "https://maps.googleapis.com/maps/api"
 
-    def __init__(self, api_key: str, delay: float = 1.0, progress_callback=None):
+class GooglePlacesFetcher:
+    def __init__(self, api_key: str, delay: Optional[float] = None, progress_callback=None, rate_limiter=None,
+                 base_url: Optional[str] = None):
         if not api_key:
             raise ValueError("La clave de API de Google Places no está configurada.")
         self.api_key = api_key
-        self.delay_between_requests = delay
+        base_url = (base_url or app_config.get_setting('google', 'api_base_url', DEFAULT_API_BASE_URL)).rstrip('/')
+        self.geocode_url = f"{base_url}/geocode/json"
+        self.text_search_url = f"{base_url}/place/textsearch/json"
+        self.details_url = f"{base_url}/place/details/json"
+        self.delay_between_requests = DEFAULT_REQUEST_DELAY if delay is None else delay
         self._seen_place_ids: Set[str] = set()
         self.progress_callback = progress_callback
+        # Presupuesto de requests compartido con las búsquedas de otras sesiones del proceso
+        self.rate_limiter = rate_limiter or google_api_limiter()
+
+    def _api_get(self, url: str, params: Dict) -> requests.Response:
+        """GET a la API de Google esperando turno en el presupuesto compartido"""
+        self.rate_limiter.acquire(id(self))
+        return requests.get(url, params=params)
 
     def get_location_bounds(self, location_query: str) -> Optional[Dict]:
         logger.info(f"📍 Geocoding para '{location_query}'...")
-        geocode_url = "https://maps.googleapis.com/maps/api/geocode/json"
         params = {'address': location_query, 'key': self.api_key}
         try:
-            resp = requests.get(geocode_url, params=params)
+            resp = self._api_get(self.geocode_url, params)
             resp.raise_for_status()
             data = resp.json()
             if data.get('status') == 'OK':
@@ -115,11 +132,11 @@ class GooglePlacesFetcher:
                 'key': self.api_key
             }
             if next_token:
-                time.sleep(2)  # wait for token activation
+                time.sleep(PAGE_TOKEN_DELAY)  # wait for token activation
 
             try:
                 time.sleep(self.delay_between_requests)
-                resp = requests.get(self.TEXT_SEARCH_URL, params=params)
+                resp = self._api_get(self.text_search_url, params)
                 resp.raise_for_status()
                 data = resp.json()
                 status = data.get('status')
@@ -161,7 +178,7 @@ class GooglePlacesFetcher:
         }
         try:
             time.sleep(self.delay_between_requests * 0.5)
-            resp = requests.get(self.DETAILS_URL, params=params)
+            resp = self._api_get(self.details_url, params)
             resp.raise_for_status()
             data = resp.json()
             if data.get('status') == 'OK':
@@ -189,16 +206,17 @@ class GooglePlacesFetcher:
                                grid_size: int,
                                radius: int,
                                recursion: int,
-                               max_recursion: int) -> List[Dict]:
+                               max_recursion: int) -> Iterator[Dict]:
+        """Generador: entrega cada lugar nuevo apenas aparece en la grilla"""
         if recursion >= max_recursion:
             logger.info(f"🛑 Nivel máximo de recursión alcanzado ({recursion}) - retornando solo resultados locales")
             # Simple grid search sin más subdivisiones
-            return self._search_grid_simple(query, bounds, grid_size, radius)
+            yield from self._search_grid_simple(query, bounds, grid_size, radius)
+            return
 
         logger.info(f"🔄 Recursión nivel {recursion}/{max_recursion}")
         points = self.calculate_grid_points(bounds, grid_size)
         total_points = len(points)
-        found = []
         subs = []
 
         for idx, p in enumerate(points, start=1):
@@ -210,7 +228,7 @@ class GooglePlacesFetcher:
             places, count, limited = self.search_places_from_point(
                 query, p['latitude'], p['longitude'], radius
             )
-            found.extend(places)
+            yield from places
             logger.info(f"   → {len(places)} únicos de {count} revisados")
             # Subdividir solo si alcanzamos límite real de resultados
             if limited:
@@ -219,21 +237,18 @@ class GooglePlacesFetcher:
         # Procesar subgrillas solo si detectamos limitaciones
         for sub in subs:
             logger.info(f"   ↪ Subgrilla por límite detectado")
-            found.extend(self._search_grid_recursive(
+            yield from self._search_grid_recursive(
                 query,
                 sub['bounds'],
                 max(2, grid_size // 2),
                 max(100, radius // 2),
                 recursion + 1,
                 max_recursion
-            ))
-
-        return found
+            )
 
-    def _search_grid_simple(self, query: str, bounds: Dict, grid_size: int, radius: int) -> List[Dict]:
+    def _search_grid_simple(self, query: str, bounds: Dict, grid_size: int, radius: int) -> Iterator[Dict]:
         logger.info("🔄 Búsqueda simple por grilla (sin subdivisión)")
         points = self.calculate_grid_points(bounds, grid_size)
-        found = []
         total_points = len(points)
         for i, p in enumerate(points, start=1):
             if self.progress_callback:
@@ -241,8 +256,7 @@ class GooglePlacesFetcher:
                 
             logger.info(f"🔍 Simple Punto {i}/{len(points)} {p['grid_pos']}...")
             places, _, _ = self.search_places_from_point(query, p['latitude'], p['longitude'], radius)
-            found.extend(places)
-        return found
+            yield from places
 
     def search_places_grid(self,
                             query: str,
@@ -255,7 +269,7 @@ class GooglePlacesFetcher:
         if not bounds:
             return []
         
-        raw = self._search_grid_recursive(query, bounds, grid_size, radius, 0, max_recursion)
+        raw = list(self._search_grid_recursive(query, bounds, grid_size, radius, 0, max_recursion))
 
         detailed = []
         logger.info("👷 Obteniendo detalles para cada lugar...")
@@ -267,21 +281,44 @@ class GooglePlacesFetcher:
                 
             det = self.get_place_details(p['id'])
             if det:
-                detailed.append({
-                    'place_id': p['id'],
-                    'name': det.get('name'),
-                    'address': det.get('formatted_address'),
-                    'phone': det.get('international_phone_number'),
-                    'website': det.get('website'),
-                    'latitude': det.get('geometry', {}).get('location', {}).get('lat'),
-                    'longitude': det.get('geometry', {}).get('location', {}).get('lng'),
-                    'rating': det.get('rating'),
-                    'user_ratings_total': det.get('user_ratings_total'),
-                    'types': det.get('types')
-                })
+                detailed.append(self._place_record(p['id'], det))
         logger.info(f"🎉 Total final: {len(detailed)} lugares con detalles")
         return detailed
 
+    def iter_places_grid(self,
+                         query: str,
+                         location_query: str,
+                         grid_size: int = 6,
+                         radius: int = 3000,
+                         max_recursion: int = 2) -> Iterator[Dict]:
+        """
+        Versión streaming de search_places_grid: pide los detalles de cada lugar
+        apenas la grilla lo encuentra y lo entrega, sin esperar al resto de la búsqueda.
+        """
+        self._seen_place_ids.clear()
+        bounds = self.get_location_bounds(location_query)
+        if not bounds:
+            return
+
+        for p in self._search_grid_recursive(query, bounds, grid_size, radius, 0, max_recursion):
+            det = self.get_place_details(p['id'])
+            if det:
+                yield self._place_record(p['id'], det)
+
+    def _place_record(self, place_id: str, det: Dict) -> Dict:
+        return {
+            'place_id': place_id,
+            'name': det.get('name'),
+            'address': det.get('formatted_address'),
+            'phone': det.get('international_phone_number'),
+            'website': det.get('website'),
+            'latitude': det.get('geometry', {}).get('location', {}).get('lat'),
+            'longitude': det.get('geometry', {}).get('location', {}).get('lng'),
+            'rating': det.get('rating'),
+            'user_ratings_total': det.get('user_ratings_total'),
+            'types': det.get('types')
+        }
+
     def save_to_csv(self, places: List[Dict], filename: str = "places_results.csv"):
         if not places:
             logger.warning("⚠️ No hay datos para guardar.")
@@ -4,38 +4,56 @@ Google Sheets Manager - Módulo de Carga
 
 Responsabilidad: Conectar y subir datos a una hoja de cálculo de Google Sheets,
 manejando la deduplicación de registros.
+
+La hoja se lee una sola vez por manager (las claves de los registros existentes
+quedan en memoria y se actualizan con cada carga) y las filas nuevas se agregan
+con values().append, así varios lotes o jobs no se pisan calculando la fila
+donde escribir.
 """
 
 import pandas as pd
+import time
 from datetime import datetime
 import logging
-import streamlit as st
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+import app_config
+
+try:
+    # errors es liviano; discovery y google.oauth2 (lo pesado) se importan recién en connect()
+    from googleapiclient.errors import HttpError
+except ImportError:
+    class HttpError(Exception):
+        """Sin googleapiclient connect() falla antes de que se pueda lanzar este error"""
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Lecturas de la hoja para cargar las claves de deduplicación antes de abandonar la carga
+KEY_LOAD_ATTEMPTS = 3
+KEY_LOAD_RETRY_SECONDS = 2
+
 class GoogleSheetsManager:
     """Maneja la conexión y escritura a Google Sheets"""
     
     def __init__(self, credentials_file=None, spreadsheet_id=None):
-        # Intentar obtener configuración desde st.secrets primero
-        try:
-            self.spreadsheet_id = spreadsheet_id or st.secrets["google_sheets"]["spreadsheet_id"]
-            self.credentials_file = credentials_file or st.secrets["google_sheets"]["credentials_file"]
-            self.use_secrets_auth = True
-        except (KeyError, AttributeError):
+        # Configuración desde flags, entorno, archivo o st.secrets (ver app_config)
+        self.spreadsheet_id = spreadsheet_id or app_config.get_setting("google_sheets", "spreadsheet_id")
+        self.credentials_file = credentials_file or app_config.get_setting("google_sheets", "credentials_file")
+        # Credenciales de la cuenta de servicio embebidas en la configuración (sección google_service_account)
+        self.service_account_info = app_config.get_section("google_service_account")
+        self.use_secrets_auth = self.service_account_info is not None
+        if not self.spreadsheet_id or not self.credentials_file:
             # Fallback a valores por defecto
-            self.spreadsheet_id = spreadsheet_id or '1KjQMeQQ_3EO0MtfrSO7waTHtiZdTb7futHIA4yk6Xf8'
-            self.credentials_file = credentials_file or 'google_credentials_coti.json'
-            self.use_secrets_auth = False
+            self.spreadsheet_id = self.spreadsheet_id or '1KjQMeQQ_3EO0MtfrSO7waTHtiZdTb7futHIA4yk6Xf8'
+            self.credentials_file = self.credentials_file or 'google_credentials_coti.json'
             logger.warning("⚠️ Usando configuración hardcodeada - configura st.secrets para producción")
         
         self.service = None
         self.sheet_name = 'Leads Data'
+        # Claves de deduplicación de la hoja (place_id y nombre|dirección), cargadas al primer upload
+        self._known_place_ids = None
+        self._known_combinations = None
+        self._row_count = 0
         
         self.column_mapping = {
             'place_id': 'Place ID',
@@ -57,12 +75,15 @@ class GoogleSheetsManager:
         self.connect()
 
     def connect(self):
-        """Conecta a Google Sheets API usando st.secrets o archivo de credenciales"""
+        """Conecta a Google Sheets API usando las credenciales de la configuración o el archivo"""
         try:
+            # Import diferido: el cliente de Google solo se carga si se usa Sheets
+            from google.oauth2.service_account import Credentials
+            from googleapiclient.discovery import build
+
             if self.use_secrets_auth:
-                # Usar credenciales desde st.secrets
-                creds_info = dict(st.secrets["google_service_account"])
-                creds = Credentials.from_service_account_info(creds_info, scopes=self.scopes)
+                # Usar credenciales de la configuración (st.secrets o archivo de config)
+                creds = Credentials.from_service_account_info(self.service_account_info, scopes=self.scopes)
             else:
                 # Usar archivo de credenciales
                 creds = Credentials.from_service_account_file(self.credentials_file, scopes=self.scopes)
@@ -118,62 +139,87 @@ class GoogleSheetsManager:
             logger.error(f"❌ Error configurando headers: {e}")
 
     def get_existing_data(self):
-        """Obtiene todos los datos existentes de la hoja"""
+        """Obtiene todos los datos existentes de la hoja (vacío si la lectura falla)"""
         try:
-            result = self.service.spreadsheets().values().get(
-                spreadsheetId=self.spreadsheet_id, 
-                range=f"'{self.sheet_name}'!A:Z"
-            ).execute()
-            values = result.get('values', [])
-            if len(values) <= 1: 
-                return pd.DataFrame()
-            
-            headers = values[0]
-            data = values[1:]
-            
-            # Asegurar que todas las filas tengan el mismo número de columnas que los encabezados
-            data = [row + [''] * (len(headers) - len(row)) for row in data]
-
-            df = pd.DataFrame(data, columns=headers)
-            # Mapear de vuelta a nombres programáticos
-            reverse_mapping = {v: k for k, v in self.column_mapping.items()}
-            df.rename(columns=reverse_mapping, inplace=True)
-            
-            logger.info(f"📊 Datos existentes obtenidos: {len(df)} registros")
-            return df
+            return self._read_existing_data()
         except HttpError as e:
             logger.error(f"❌ Error obteniendo datos existentes: {e}")
             return pd.DataFrame()
 
-    def check_for_duplicates(self, new_df, existing_df):
+    def _read_existing_data(self):
+        """Lee todos los datos de la hoja; los errores de la API se propagan"""
+        result = self.service.spreadsheets().values().get(
+            spreadsheetId=self.spreadsheet_id,
+            range=f"'{self.sheet_name}'!A:Z"
+        ).execute()
+        values = result.get('values', [])
+        if len(values) <= 1:
+            return pd.DataFrame()
+
+        headers = values[0]
+        data = values[1:]
+
+        # Asegurar que todas las filas tengan el mismo número de columnas que los encabezados
+        data = [row + [''] * (len(headers) - len(row)) for row in data]
+
+        df = pd.DataFrame(data, columns=headers)
+        # Mapear de vuelta a nombres programáticos
+        reverse_mapping = {v: k for k, v in self.column_mapping.items()}
+        df.rename(columns=reverse_mapping, inplace=True)
+
+        logger.info(f"📊 Datos existentes obtenidos: {len(df)} registros")
+        return df
+
+    @staticmethod
+    def name_address_keys(df):
+        """Clave "nombre|dirección" normalizada de cada fila ('' si falta alguno de los dos)"""
+        def column(name):
+            if name not in df.columns:
+                return pd.Series('', index=df.index)
+            return df[name].fillna('').astype(str).str.strip().str.lower()
+        name, address = column('displayName.text'), column('formattedAddress')
+        return (name + '|' + address).where((name != '') & (address != ''), '')
+
+    def load_existing_keys(self):
+        """
+        Lee la hoja una vez y guarda las claves de deduplicación de los registros existentes.
+        Si la lectura sigue fallando después de los reintentos se propaga el error y las claves
+        quedan sin cargar: la carga se aborta en lugar de agregar filas sin deduplicar.
         """
-        Verifica duplicados de manera más robusta usando múltiples criterios
+        for attempt in range(1, KEY_LOAD_ATTEMPTS + 1):
+            try:
+                existing_data = self._read_existing_data()
+                break
+            except (HttpError, OSError) as e:
+                if attempt == KEY_LOAD_ATTEMPTS:
+                    logger.error(f"❌ No se pudo leer la hoja para deduplicar ({attempt} intentos): {e}")
+                    raise
+                logger.warning(f"⚠️ Error leyendo la hoja para deduplicar (intento {attempt}): {e}. "
+                               f"Reintentando en {KEY_LOAD_RETRY_SECONDS}s...")
+                time.sleep(KEY_LOAD_RETRY_SECONDS)
+        self._row_count = len(existing_data)
+        if existing_data.empty:
+            self._known_place_ids, self._known_combinations = set(), set()
+            return
+        self._known_place_ids = set(existing_data['place_id'].dropna()) if 'place_id' in existing_data.columns else set()
+        self._known_combinations = set(self.name_address_keys(existing_data)) - {''}
+
+    def check_for_duplicates(self, new_df):
         """
-        if existing_df.empty:
+        Verifica duplicados contra las claves de la hoja usando múltiples criterios
+        """
+        if self._known_place_ids is None:
+            self.load_existing_keys()
+        if not self._known_place_ids and not self._known_combinations:
             return new_df, 0
         
         logger.info("🔍 Verificando duplicados...")
         
         # Criterio 1: place_id (más confiable)
-        existing_place_ids = set(existing_df['place_id'].dropna().tolist())
-        mask_place_id = ~new_df['place_id'].isin(existing_place_ids)
+        mask_place_id = ~new_df['place_id'].isin(self._known_place_ids)
         
         # Criterio 2: combinación de nombre + dirección (backup)
-        existing_combinations = set()
-        for _, row in existing_df.iterrows():
-            name = str(row.get('displayName.text', '')).strip().lower()
-            address = str(row.get('formattedAddress', '')).strip().lower()
-            if name and address:
-                existing_combinations.add(f"{name}|{address}")
-        
-        mask_combination = pd.Series([True] * len(new_df), index=new_df.index)
-        for idx, row in new_df.iterrows():
-            name = str(row.get('displayName.text', '')).strip().lower()
-            address = str(row.get('formattedAddress', '')).strip().lower()
-            if name and address:
-                combination = f"{name}|{address}"
-                if combination in existing_combinations:
-                    mask_combination.loc[idx] = False
+        mask_combination = ~self.name_address_keys(new_df).isin(self._known_combinations)
         
         # Combinar ambos criterios
         final_mask = mask_place_id & mask_combination
@@ -200,9 +246,8 @@ class GoogleSheetsManager:
             df_with_meta = df.copy()
             df_with_meta['extraction_date'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             
-            # 2. Obtener datos existentes y verificar duplicados
-            existing_data = self.get_existing_data()
-            unique_df, duplicates_count = self.check_for_duplicates(df_with_meta, existing_data)
+            # 2. Verificar duplicados contra las claves de la hoja (se lee una sola vez por manager)
+            unique_df, duplicates_count = self.check_for_duplicates(df_with_meta)
             
             if duplicates_count > 0:
                 logger.info(f"🔍 Se encontraron y omitieron {duplicates_count} duplicados.")
@@ -212,26 +257,30 @@ class GoogleSheetsManager:
                 return True
             
             # 3. Preparar datos para subida
-            start_row = len(existing_data) + 2
             programmatic_headers = list(self.column_mapping.keys())
             final_df = unique_df.reindex(columns=programmatic_headers, fill_value='')
             
             # 4. Convertir a valores y limpiar
             values = final_df.fillna('').astype(str).values.tolist()
             
-            # 5. Subir a Google Sheets
+            # 5. Agregar al final de la tabla (la API elige la fila: no se pisan cargas concurrentes)
             body = {'values': values}
-            range_name = f"'{self.sheet_name}'!A{start_row}"
             
-            self.service.spreadsheets().values().update(
+            self.service.spreadsheets().values().append(
                 spreadsheetId=self.spreadsheet_id, 
-                range=range_name, 
+                range=f"'{self.sheet_name}'!A1",
                 valueInputOption='USER_ENTERED', 
+                insertDataOption='INSERT_ROWS',
                 body=body
             ).execute()
             
+            # 6. Los lotes siguientes deduplican también contra lo recién subido
+            self._known_place_ids.update(unique_df['place_id'].dropna())
+            self._known_combinations.update(set(self.name_address_keys(unique_df)) - {''})
+            self._row_count += len(values)
+
             logger.info(f"✅ Datos subidos exitosamente. {len(values)} filas nuevas agregadas.")
-            logger.info(f"📊 Total de registros en la hoja: {len(existing_data) + len(values)}")
+            logger.info(f"📊 Total de registros en la hoja: {self._row_count}")
             return True
             
         except HttpError as e:
@@ -358,7 +407,7 @@ class GoogleSheetsManager:
         Esta función reclasifica todas las URLs existentes en la hoja
         """
         try:
-            from main_orchestrator import classify_url
+            from main_orchestrator import reclassify_website_urls
             
             logger.info("🧹 Iniciando limpieza de URLs históricas...")
             
@@ -368,33 +417,11 @@ class GoogleSheetsManager:
                 logger.info("No hay datos para limpiar")
                 return True
             
-            # Contadores para reporte
-            websites_moved = 0
-            facebooks_added = 0
-            instagrams_added = 0
-            
-            # Procesar cada fila
-            for idx, row in existing_data.iterrows():
-                website_url = row.get('websiteUri', '')
-                current_facebook = row.get('facebook_url', '')
-                current_instagram = row.get('instagram_url', '')
-                
-                if website_url and str(website_url) != 'nan':
-                    url_type, clean_url = classify_url(website_url)
-                    
-                    # Si la URL del sitio web es realmente una red social
-                    if url_type in ['facebook', 'instagram']:
-                        # Limpiar el campo websiteUri
-                        existing_data.at[idx, 'websiteUri'] = ''
-                        websites_moved += 1
-                        
-                        # Mover a la columna correcta (solo si no hay una ya)
-                        if url_type == 'facebook' and not current_facebook:
-                            existing_data.at[idx, 'facebook_url'] = clean_url
-                            facebooks_added += 1
-                        elif url_type == 'instagram' and not current_instagram:
-                            existing_data.at[idx, 'instagram_url'] = clean_url
-                            instagrams_added += 1
+            # Reclasificar todas las filas de una vez (el host de cada URL se extrae una sola vez)
+            counts = reclassify_website_urls(existing_data)
+            websites_moved = counts['websites_moved']
+            facebooks_added = counts['facebooks_added']
+            instagrams_added = counts['instagrams_added']
             
             # Solo actualizar si hay cambios
             if websites_moved > 0:
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Host Health - Resolución DNS cacheada y circuit breaker por host
+
+Responsabilidad: Detectar antes de scrapear los dominios que no existen
+(NXDOMAIN) y cortar los intentos contra hosts que fallan repetidamente al
+conectar, para que un sitio muerto no ocupe un worker durante todo el timeout.
+"""
+
+import socket
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class HostUnavailableError(Exception):
+    """El host no resuelve o su circuit breaker está abierto: se falla sin hacer el request"""
+
+class HostResolver:
+    """Cache de resoluciones DNS con pre-resolución en lote"""
+
+    def __init__(self, max_workers=20):
+        self.max_workers = max_workers
+        # host -> lista de IPs, o None si el dominio no existe
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, host):
+        """Resuelve un host (usando la cache) y devuelve sus IPs o None si no existe"""
+        with self._lock:
+            if host in self._cache:
+                return self._cache[host]
+
+        try:
+            infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+            addresses = sorted({info[4][0] for info in infos})
+        except socket.gaierror as e:
+            if e.errno == socket.EAI_NONAME:
+                addresses = None
+            else:
+                # Error transitorio del resolver: no se cachea, se reintentará al conectar
+                logger.debug(f"⚠️ DNS transitorio para {host}: {e}")
+                return []
+        except UnicodeError:
+            addresses = None
+
+        with self._lock:
+            self._cache[host] = addresses
+        return addresses
+
+    def resolve_many(self, hosts):
+        """Resuelve en paralelo una lista de hosts y devuelve cuántos no existen"""
+        pending = [h for h in set(hosts) if h and h not in self._cache]
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                list(executor.map(self.resolve, pending))
+        return sum(1 for h in set(hosts) if self.is_dead(h))
+
+    def is_dead(self, host):
+        """True si ya se sabe que el dominio no existe"""
+        with self._lock:
+            return host in self._cache and self._cache[host] is None
+
+class CircuitBreaker:
+    """Abre el circuito de un host tras N fallas de conexión seguidas"""
+
+    def __init__(self, failure_threshold=2, reset_after=300):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self._failures = {}
+        self._opened_at = {}
+        self._lock = threading.Lock()
+
+    def allow(self, host):
+        """True si se puede intentar un request contra el host"""
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return True
+            if time.time() - opened_at >= self.reset_after:
+                # Medio abierto: se permite un nuevo intento
+                del self._opened_at[host]
+                self._failures[host] = self.failure_threshold - 1
+                return True
+            return False
+
+    def record_failure(self, host):
+        with self._lock:
+            self._failures[host] = self._failures.get(host, 0) + 1
+            if self._failures[host] >= self.failure_threshold and host not in self._opened_at:
+                self._opened_at[host] = time.time()
+                logger.info(f"🔌 Circuit breaker abierto para {host} ({self._failures[host]} fallas de conexión)")
+
+    def record_success(self, host):
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened_at.pop(host, None)
+
+    def open_count(self):
+        with self._lock:
+            return len(self._opened_at)
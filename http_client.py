@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+HTTP Client - Sesiones HTTP intercambiables para WebsiteScraper
+
+Responsabilidad: Crear la sesión con la que descarga el scraper. El modo
+'requests' (por defecto) es una requests.Session que cuenta las conexiones
+que abre. El modo 'http2' usa httpx con HTTP/2 (requiere `pip install httpx[http2]`):
+la home y las páginas de contacto de un mismo host viajan multiplexadas por una
+sola conexión TLS. Ambos modos anuncian solo las compresiones que pueden
+decodificar (gzip/deflate y brotli si está instalado) y exponen la misma
+interfaz mínima que usa el scraper (.headers, .get y respuestas tipo requests).
+"""
+
+import importlib.util
+import functools
+import ssl
+import threading
+import weakref
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def accept_encoding():
+    """Valor de Accept-Encoding según los decodificadores disponibles"""
+    encodings = ['gzip', 'deflate']
+    if importlib.util.find_spec('brotli') or importlib.util.find_spec('brotlicffi'):
+        encodings.append('br')
+    return ', '.join(encodings)
+
+def wire_bytes(response):
+    """Bytes que viajaron por la red (comprimidos) para una respuesta y sus redirects"""
+    if hasattr(response, 'wire_bytes'):
+        return response.wire_bytes
+    total = 0
+    for r in [*getattr(response, 'history', []), response]:
+        raw = getattr(r, 'raw', None)
+        try:
+            total += raw.tell()
+        except (AttributeError, OSError):
+            total += len(r.content or b'')
+    return total
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def __init__(self, *args, on_connect=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._on_connect = on_connect
+
+    def _new_conn(self):
+        if self._on_connect:
+            self._on_connect()
+        return super()._new_conn()
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def __init__(self, *args, on_connect=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._on_connect = on_connect
+
+    def _new_conn(self):
+        if self._on_connect:
+            self._on_connect()
+        return super()._new_conn()
+
+class _CountingAdapter(HTTPAdapter):
+    """HTTPAdapter cuyos pools avisan cada conexión nueva"""
+
+    def __init__(self, on_connect=None, **kwargs):
+        self._on_connect = on_connect
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': functools.partial(_CountingHTTPConnectionPool, on_connect=self._on_connect),
+            'https': functools.partial(_CountingHTTPSConnectionPool, on_connect=self._on_connect),
+        }
+
+class RequestsSession(requests.Session):
+    """requests.Session que cuenta conexiones y anuncia las compresiones soportadas"""
+
+    client_name = 'requests'
+
+    def __init__(self, on_connect=None, max_connections=10):
+        super().__init__()
+        adapter = _CountingAdapter(on_connect=on_connect, pool_connections=max_connections,
+                                   pool_maxsize=max_connections)
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+        self.headers['Accept-Encoding'] = accept_encoding()
+
+class Http2Response:
+    """Respuesta de httpx con la interfaz de requests.Response que usa el scraper"""
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.content = response.content
+        self.url = str(response.url)
+        self.http_version = response.http_version
+        self.history = [Http2Response(r) for r in response.history]
+        self.wire_bytes = response.num_bytes_downloaded + sum(r.wire_bytes for r in self.history)
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            kind = 'Client' if self.status_code < 500 else 'Server'
+            raise requests.exceptions.HTTPError(
+                f"{self.status_code} {kind} Error: {self._response.reason_phrase} for url: {self.url}",
+                response=self
+            )
+
+class Http2Session:
+    """
+    Sesión basada en httpx con HTTP/2. Los errores se traducen a las excepciones de
+    requests para que el circuit breaker y la clasificación de fallas funcionen igual.
+    HTTP/2 se negocia por ALPN, así que solo aplica a sitios https.
+    """
+
+    client_name = 'http2'
+
+    def __init__(self, on_connect=None, max_connections=10):
+        if httpx is None:
+            raise ImportError("httpx no está instalado")
+        self._client = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self._client.headers['Accept-Encoding'] = accept_encoding()
+        self._on_connect = on_connect
+        # Streams de red ya vistos: uno nuevo equivale a una conexión abierta
+        self._streams = weakref.WeakSet()
+        self._streams_lock = threading.Lock()
+
+    @property
+    def headers(self):
+        return self._client.headers
+
+    def get(self, url, timeout=None, allow_redirects=True, headers=None):
+        if isinstance(timeout, tuple):
+            connect_timeout, read_timeout = timeout
+            timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        try:
+            response = self._client.get(url, timeout=timeout, follow_redirects=allow_redirects, headers=headers)
+        except httpx.TimeoutException as e:
+            error = requests.exceptions.ConnectTimeout if isinstance(e, httpx.ConnectTimeout) else requests.exceptions.ReadTimeout
+            raise error(str(e)) from e
+        except httpx.ConnectError as e:
+            error = requests.exceptions.SSLError if _has_ssl_cause(e) else requests.exceptions.ConnectionError
+            raise error(str(e)) from e
+        except httpx.TooManyRedirects as e:
+            raise requests.exceptions.TooManyRedirects(str(e)) from e
+        except (httpx.UnsupportedProtocol, httpx.InvalidURL) as e:
+            raise requests.exceptions.InvalidURL(str(e)) from e
+        except (httpx.TransportError, httpx.DecodingError) as e:
+            raise requests.exceptions.ConnectionError(str(e)) from e
+
+        self._track_connections([*response.history, response])
+        return Http2Response(response)
+
+    def _track_connections(self, responses):
+        if not self._on_connect:
+            return
+        for response in responses:
+            stream = response.extensions.get('network_stream')
+            if stream is None:
+                continue
+            with self._streams_lock:
+                try:
+                    if stream in self._streams:
+                        continue
+                    self._streams.add(stream)
+                except TypeError:
+                    continue
+            self._on_connect()
+
+    def close(self):
+        self._client.close()
+
+def _has_ssl_cause(exc):
+    while exc is not None:
+        if isinstance(exc, ssl.SSLError):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+def create_session(client='requests', on_connect=None, max_connections=10):
+    """
+    Crea la sesión del scraper. client='http2' usa httpx con HTTP/2; si httpx o h2
+    no están instalados se avisa y se sigue con requests.
+    """
+    if client == 'http2':
+        try:
+            return Http2Session(on_connect=on_connect, max_connections=max_connections)
+        except ImportError as e:
+            logger.warning(f"⚠️ Cliente HTTP/2 no disponible ({e}); se usa requests. Instalar con: pip install 'httpx[http2]'")
+    elif client != 'requests':
+        raise ValueError(f"Cliente HTTP desconocido: {client}")
+    return RequestsSession(on_connect=on_connect, max_connections=max_connections)
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Job Queue - Búsquedas en segundo plano con cola persistente
+
+Responsabilidad: Desacoplar las búsquedas de la sesión de Streamlit. La UI
+encola un job en una base SQLite local y los workers (threads dentro del
+servidor de Streamlit o procesos `leads_cli.py worker`) lo toman, corren
+main_orchestrator.main y van guardando el progreso en la misma base. Así un
+rerun, un refresh del navegador o una reconexión no cortan la búsqueda: la UI
+solo consulta el estado. Cancelar un job marca un flag que el worker revisa
+periódicamente y traslada al cancel_event del pipeline.
+
+Cada worker actualiza un heartbeat mientras corre un job; los jobs "running"
+sin heartbeat reciente (el proceso murió) se marcan como interrumpidos. Los
+workers respetan el tope global de búsquedas simultáneas de
+admission_control: con el tope alcanzado, los jobs esperan en la cola.
+"""
+
+import json
+import numbers
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+# Cada cuánto el worker busca jobs nuevos, revisa cancelaciones y renueva el heartbeat
+POLL_SECONDS = 1.0
+# Un job "running" sin heartbeat en este tiempo quedó huérfano (el worker murió)
+STALE_SECONDS = 60.0
+RESULTS_DIR = 'job_results'
+# Duración supuesta de una búsqueda mientras no haya jobs terminados para promediar
+DEFAULT_JOB_SECONDS = 600
+# Jobs terminados que se promedian para estimar la duración de los que esperan
+DURATION_SAMPLE = 20
+
+# Avance (%) de la barra de progreso para cada evento del progress_callback de main()
+STEP_PROGRESS = {
+    'places_searching': 5,
+    'places_found': 60,
+    'scraping_start': 65,
+    'scraping_complete': 85,
+    'sheets_start': 90,
+    'sheets_complete': 100,
+}
+# Eventos cuyo dato es un contador que va a las estadísticas del job
+STEP_STATS = {
+    'places_found': 'places_found',
+    'scraping_complete': 'emails_found',
+    'sheets_complete': 'sheets_uploaded',
+}
+
+def progress_for_event(step, data, current=0):
+    """Porcentaje de avance de un evento de progreso (mismas etapas que la barra de la app)"""
+    if step == 'places_progress':
+        current_point, total_points, _ = data
+        return 10 + int((current_point / total_points) * 40) if total_points else current
+    if step == 'places_details_progress':
+        done, total = data
+        return 50 + int((done / total) * 10) if total else current
+    if step == 'scraping_progress':
+        return min(65 + int((data or 0) * 0.2), 85)
+    return STEP_PROGRESS.get(step, current)
+
+class JobStore:
+    """Jobs y su progreso en SQLite, compartido entre threads y procesos"""
+
+    def __init__(self, db_path="jobs.db", results_dir=RESULTS_DIR):
+        self.db_path = db_path
+        self.results_dir = results_dir
+        self._lock = threading.Lock()
+        # Autocommit (isolation_level=None) para poder usar BEGIN IMMEDIATE al tomar jobs
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        # WAL: la UI puede leer mientras un worker escribe
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                location TEXT NOT NULL,
+                max_results INTEGER,
+                refresh INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                progress INTEGER NOT NULL DEFAULT 0,
+                step TEXT,
+                message TEXT,
+                stats TEXT NOT NULL,
+                summary TEXT,
+                result_path TEXT,
+                worker TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                heartbeat_at REAL
+            )
+        """)
+        # Bases creadas antes de la opción de refresh
+        columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if 'refresh' not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN refresh INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def _execute(self, sql, params=()):
+        """Ejecuta una escritura y devuelve la cantidad de filas afectadas"""
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    def _fetch(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _to_job(self, row):
+        job = dict(row)
+        job['stats'] = json.loads(job['stats'])
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        job['refresh'] = bool(job['refresh'])
+        return job
+
+    def submit(self, query, location, max_results=None, refresh=False):
+        """Encola una búsqueda y devuelve el id del job (refresh=True ignora el cache de búsquedas)"""
+        job_id = uuid.uuid4().hex[:12]
+        stats = {'places_found': 0, 'emails_found': 0, 'sheets_uploaded': 0}
+        self._execute(
+            "INSERT INTO jobs (id, query, location, max_results, refresh, status, stats, message, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, query, location, max_results, int(refresh), QUEUED, json.dumps(stats), "En cola", time.time())
+        )
+        logger.info(f"📥 Job {job_id} encolado: '{query}' en '{location}'")
+        return job_id
+
+    def get(self, job_id):
+        rows = self._fetch("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return self._to_job(rows[0]) if rows else None
+
+    def list_jobs(self, statuses=None, limit=20):
+        """Jobs más recientes primero, opcionalmente filtrados por estado"""
+        if statuses:
+            marks = ','.join('?' * len(statuses))
+            rows = self._fetch(
+                f"SELECT * FROM jobs WHERE status IN ({marks}) ORDER BY created_at DESC LIMIT ?",
+                (*statuses, limit)
+            )
+        else:
+            rows = self._fetch("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))
+        return [self._to_job(row) for row in rows]
+
+    def claim_next(self, worker, max_running=None):
+        """
+        Toma el job en cola más antiguo (atómico entre procesos) o devuelve None.
+        Con max_running no toma nada si ya hay esa cantidad de jobs corriendo.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = None
+                running = self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (RUNNING,)).fetchone()[0]
+                if max_running is None or running < max_running:
+                    row = self._conn.execute(
+                        "SELECT id FROM jobs WHERE status = ? AND cancel_requested = 0 ORDER BY created_at LIMIT 1",
+                        (QUEUED,)
+                    ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, worker = ?, started_at = ?, heartbeat_at = ?, message = ? "
+                        "WHERE id = ?",
+                        (RUNNING, worker, now, now, "Iniciando búsqueda...", row['id'])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row['id']) if row is not None else None
+
+    def average_duration(self):
+        """Duración promedio (segundos) de las últimas búsquedas completadas"""
+        rows = self._fetch(
+            "SELECT finished_at - started_at AS seconds FROM jobs WHERE status = ? AND started_at IS NOT NULL "
+            "ORDER BY finished_at DESC LIMIT ?",
+            (COMPLETED, DURATION_SAMPLE)
+        )
+        if not rows:
+            return DEFAULT_JOB_SECONDS
+        return sum(row['seconds'] for row in rows) / len(rows)
+
+    def queue_estimates(self, max_running):
+        """
+        Posición en la cola e inicio estimado (epoch) de cada job en espera: {id: (posición, inicio)}.
+        Supone que cada búsqueda dura el promedio reciente y que se liberan de a max_running lugares.
+        """
+        now = time.time()
+        duration = self.average_duration()
+        running = self._fetch("SELECT started_at FROM jobs WHERE status = ?", (RUNNING,))
+        queued = self._fetch("SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,))
+        # Momento en que se libera cada lugar de ejecución
+        slots = sorted(max(now, row['started_at'] + duration) for row in running)[:max_running]
+        slots += [now] * (max_running - len(slots))
+        estimates = {}
+        for position, row in enumerate(queued, start=1):
+            start = min(slots)
+            slots[slots.index(start)] = start + duration
+            estimates[row['id']] = (position, start)
+        return estimates
+
+    def update_progress(self, job_id, step, message, data=None):
+        """Guarda el último evento de progreso del job (lo llama el worker desde el progress_callback)"""
+        job = self.get(job_id)
+        if job is None:
+            return
+        stats = job['stats']
+        if step in STEP_STATS and isinstance(data, numbers.Number):
+            stats[STEP_STATS[step]] = int(data)
+        # En el pipeline las etapas corren a la vez: la barra nunca retrocede
+        progress = max(job['progress'], progress_for_event(step, data, job['progress']))
+        self._execute(
+            "UPDATE jobs SET step = ?, message = ?, progress = ?, stats = ?, heartbeat_at = ? WHERE id = ?",
+            (step, message, progress, json.dumps(stats), time.time(), job_id)
+        )
+
+    def heartbeat(self, job_id):
+        """Renueva el heartbeat y devuelve True si se pidió cancelar el job"""
+        self._execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time(), job_id))
+        rows = self._fetch("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,))
+        return bool(rows and rows[0]['cancel_requested'])
+
+    def finish(self, job_id, status, summary, result_df=None):
+        """Cierra el job con su estado final y guarda el DataFrame resultante (CSV) si lo hay"""
+        result_path = None
+        if result_df is not None:
+            os.makedirs(self.results_dir, exist_ok=True)
+            result_path = os.path.join(self.results_dir, f"{job_id}.csv")
+            result_df.to_csv(result_path, index=False, encoding='utf-8')
+        progress = 100 if status == COMPLETED else None
+        self._execute(
+            "UPDATE jobs SET status = ?, summary = ?, message = ?, result_path = ?, finished_at = ?, "
+            "progress = COALESCE(?, progress) WHERE id = ?",
+            (status, summary, summary, result_path, time.time(), progress, job_id)
+        )
+
+    def load_result(self, job_id):
+        """DataFrame resultante de un job terminado, o None"""
+        job = self.get(job_id)
+        if not job or not job['result_path'] or not os.path.exists(job['result_path']):
+            return None
+        import pandas as pd
+        return pd.read_csv(job['result_path'], keep_default_na=False)
+
+    def request_cancel(self, job_id):
+        """Pide cancelar un job: si está en cola se cancela en el acto, si corre lo corta el worker"""
+        self._execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status IN (?, ?)",
+                      (job_id, QUEUED, RUNNING))
+        self._execute(
+            "UPDATE jobs SET status = ?, message = ?, finished_at = ? WHERE id = ? AND status = ?",
+            (CANCELLED, "Cancelado antes de empezar", time.time(), job_id, QUEUED)
+        )
+        logger.info(f"⛔ Cancelación pedida para el job {job_id}")
+
+    def recover_stale(self, stale_seconds=STALE_SECONDS):
+        """Marca como fallidos los jobs "running" cuyo worker dejó de dar señales; devuelve cuántos"""
+        recovered = self._execute(
+            "UPDATE jobs SET status = ?, message = ?, summary = ?, finished_at = ? "
+            "WHERE status = ? AND heartbeat_at < ?",
+            (FAILED, "Interrumpido: el worker se detuvo", "Interrumpido: el worker se detuvo",
+             time.time(), RUNNING, time.time() - stale_seconds)
+        )
+        if recovered:
+            logger.warning(f"⚠️ {recovered} jobs interrumpidos marcados como fallidos")
+        return recovered
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class JobRunner:
+    """Workers (threads) que toman jobs de la cola y corren la búsqueda completa"""
+
+    def __init__(self, store, workers=1, name=None, search_fn=None, max_running=None):
+        self.store = store
+        self.workers = workers
+        # Tope de jobs corriendo entre todos los procesos que comparten la base
+        if max_running is None:
+            from admission_control import max_concurrent_searches
+            max_running = max_concurrent_searches()
+        self.max_running = max_running
+        self.name = name or f"{os.getpid()}"
+        # Función que corre la búsqueda (por defecto main_orchestrator.main, importado recién al usarse)
+        self.search_fn = search_fn
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """Arranca los workers en threads daemon (no bloquea)"""
+        self.store.recover_stale()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, args=(f"{self.name}-{i}",),
+                                      name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"👷 {self.workers} workers de búsquedas en marcha (máximo {self.max_running} a la vez)")
+        return self
+
+    def wake(self):
+        """Avisa a los workers que hay un job nuevo (evita esperar al próximo poll)"""
+        self._wakeup.set()
+
+    def stop(self, wait=True):
+        self._stop.set()
+        self._wakeup.set()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def run_forever(self):
+        """Corre los workers hasta Ctrl+C (modo proceso: `leads_cli.py worker`)"""
+        self.start()
+        try:
+            while not self._stop.is_set():
+                self._stop.wait(timeout=POLL_SECONDS)
+                self.store.recover_stale()
+        except KeyboardInterrupt:
+            logger.info("⛔ Deteniendo workers (los jobs en curso se cancelan)")
+            self.stop(wait=False)
+            for thread in self._threads:
+                thread.join()
+
+    def _worker_loop(self, worker_name):
+        while not self._stop.is_set():
+            job = self.store.claim_next(worker_name, self.max_running)
+            if job is None:
+                self._wakeup.wait(timeout=POLL_SECONDS)
+                self._wakeup.clear()
+                continue
+            self.run_job(job)
+
+    def run_job(self, job):
+        """Corre un job tomado de la cola y guarda su resultado"""
+        job_id = job['id']
+        logger.info(f"▶️ Job {job_id}: '{job['query']}' en '{job['location']}'")
+        cancel_event = threading.Event()
+        done = threading.Event()
+        watcher = threading.Thread(target=self._watch_job, args=(job_id, cancel_event, done),
+                                   name=f"job-watch-{job_id}", daemon=True)
+        watcher.start()
+
+        def progress_callback(step, message, data=None):
+            self.store.update_progress(job_id, step, message, data)
+
+        search_fn = self.search_fn
+        if search_fn is None:
+            from main_orchestrator import main as search_fn
+        try:
+            result_df, message = search_fn(
+                query=job['query'],
+                location=job['location'],
+                max_results=job['max_results'],
+                progress_callback=progress_callback,
+                cancel_event=cancel_event,
+                refresh=job['refresh'],
+            )
+            if cancel_event.is_set():
+                self.store.finish(job_id, CANCELLED, "Búsqueda cancelada", result_df)
+            elif result_df is None:
+                self.store.finish(job_id, FAILED, message)
+            else:
+                self.store.finish(job_id, COMPLETED, message, result_df)
+        except Exception as e:
+            logger.error(f"🚨 Error en el job {job_id}: {e}", exc_info=True)
+            self.store.finish(job_id, FAILED, f"Error inesperado durante el proceso: {e}")
+        finally:
+            done.set()
+            watcher.join()
+        logger.info(f"🏁 Job {job_id} terminado: {self.store.get(job_id)['status']}")
+
+    def _watch_job(self, job_id, cancel_event, done):
+        """Renueva el heartbeat del job y traslada el pedido de cancelación al pipeline"""
+        while not done.wait(timeout=POLL_SECONDS):
+            if self.store.heartbeat(job_id) or self._stop.is_set():
+                cancel_event.set()
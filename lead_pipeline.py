@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Lead Pipeline - Etapas concurrentes conectadas por colas acotadas
+
+Responsabilidad: Correr las etapas del flujo de leads (Places → Scraper →
+Sheets) en paralelo, cada una en su thread. Entre etapas hay colas con tamaño
+máximo: si una etapa se atrasa, la anterior se frena al intentar encolar
+(backpressure) en lugar de acumular resultados en memoria. Un error en
+cualquier etapa, o el evento de cancelación externo, detiene a todas. Cada
+etapa registra su tiempo ocupado y el tiempo que pasó esperando (ociosa).
+Los eventos de progreso se entregan en el thread que llamó a run() (Streamlit
+solo permite actualizar la UI desde el thread del script).
+"""
+
+import queue
+import threading
+import time
+import logging
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Intervalo con el que las esperas revisan si el pipeline fue cancelado
+POLL_SECONDS = 0.2
+
+class PipelineCancelled(Exception):
+    """El pipeline se canceló (por error en otra etapa o desde afuera)"""
+
+class _EndOfStream:
+    """Marca de fin de datos que una etapa envía a la siguiente"""
+
+END = _EndOfStream()
+
+class Channel:
+    """Cola acotada entre dos etapas"""
+
+    def __init__(self, name, maxsize, cancel_event):
+        self.name = name
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._cancel_event = cancel_event
+
+    def put(self, item, stage=None):
+        """Encola un item; si la cola está llena espera (el tiempo cuenta como ocioso para la etapa)"""
+        waited_from = time.time()
+        try:
+            while True:
+                if self._cancel_event.is_set():
+                    raise PipelineCancelled()
+                try:
+                    self._queue.put(item, timeout=POLL_SECONDS)
+                    return
+                except queue.Full:
+                    continue
+        finally:
+            if stage:
+                stage.idle_seconds += time.time() - waited_from
+
+    def close(self, stage=None):
+        """Avisa a la etapa siguiente que no vienen más datos"""
+        self.put(END, stage)
+
+    def get(self, stage=None, timeout=None):
+        """Devuelve el próximo item (END si terminó) o None si venció el timeout"""
+        waited_from = time.time()
+        deadline = waited_from + timeout if timeout is not None else None
+        try:
+            while True:
+                if self._cancel_event.is_set():
+                    raise PipelineCancelled()
+                wait = POLL_SECONDS if deadline is None else min(POLL_SECONDS, deadline - time.time())
+                if wait <= 0:
+                    return None
+                try:
+                    return self._queue.get(timeout=wait)
+                except queue.Empty:
+                    continue
+        finally:
+            if stage:
+                stage.idle_seconds += time.time() - waited_from
+
+    def get_batch(self, max_items, max_wait, stage=None):
+        """
+        Espera el primer item y junta hasta max_items más durante max_wait segundos.
+        Retorna (items, terminado): terminado=True si llegó el fin de datos.
+        """
+        first = self.get(stage)
+        if first is END:
+            return [], True
+        items = [first]
+        deadline = time.time() + max_wait
+        while len(items) < max_items:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            item = self.get(stage, timeout=remaining)
+            if item is None:
+                break
+            if item is END:
+                return items, True
+            items.append(item)
+        return items, False
+
+class Stage:
+    """Una etapa del pipeline: una función que corre en su propio thread"""
+
+    def __init__(self, name, target):
+        self.name = name
+        self.target = target
+        self.items = 0
+        self.idle_seconds = 0.0
+        self.started = None
+        self.finished = None
+        self.error = None
+        self.cancelled = False
+
+    @property
+    def elapsed_seconds(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def busy_seconds(self):
+        return max(0.0, self.elapsed_seconds - self.idle_seconds)
+
+    def summary(self):
+        return {
+            'items': self.items,
+            'busy_seconds': round(self.busy_seconds, 2),
+            'idle_seconds': round(self.idle_seconds, 2),
+            'elapsed_seconds': round(self.elapsed_seconds, 2),
+        }
+
+class Pipeline:
+    """Conjunto de etapas y colas; run() las ejecuta en paralelo hasta que todas terminan"""
+
+    def __init__(self, cancel_event=None):
+        # El evento puede venir de afuera (ej. un botón de cancelar en la UI)
+        self.cancel_event = cancel_event or threading.Event()
+        self.stages = []
+        self._events = queue.Queue()
+
+    def channel(self, name, maxsize):
+        return Channel(name, maxsize, self.cancel_event)
+
+    def add_stage(self, name, target):
+        """target(stage) hace el trabajo de la etapa usando las colas que capture"""
+        stage = Stage(name, target)
+        self.stages.append(stage)
+        return stage
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def emit(self, *event):
+        """Publica un evento de progreso desde una etapa; lo procesa el thread de run()"""
+        self._events.put(event)
+
+    def _dispatch_events(self, event_handler):
+        while True:
+            try:
+                event = self._events.get_nowait()
+            except queue.Empty:
+                return
+            if event_handler:
+                try:
+                    event_handler(*event)
+                except Exception as e:
+                    logger.warning(f"⚠️ Error en el callback de progreso: {e}")
+
+    def _run_stage(self, stage):
+        stage.started = time.time()
+        try:
+            stage.target(stage)
+        except PipelineCancelled:
+            stage.cancelled = True
+        except Exception as e:
+            logger.error(f"🚨 Error en la etapa '{stage.name}': {e}", exc_info=True)
+            stage.error = e
+            self.cancel()
+        finally:
+            stage.finished = time.time()
+
+    def run(self, event_handler=None):
+        """
+        Ejecuta todas las etapas y devuelve el primer error (o None si terminaron bien).
+        event_handler(*evento) recibe, en este thread, lo publicado con emit().
+        """
+        threads = [threading.Thread(target=self._run_stage, args=(stage,), name=f"stage-{stage.name}", daemon=True)
+                   for stage in self.stages]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=POLL_SECONDS)
+                    self._dispatch_events(event_handler)
+        except KeyboardInterrupt:
+            logger.warning("⛔ Pipeline cancelado por el usuario")
+            self.cancel()
+            for thread in threads:
+                thread.join()
+        self._dispatch_events(event_handler)
+        return next((stage.error for stage in self.stages if stage.error), None)
+
+    def log_summary(self):
+        for stage in self.stages:
+            s = stage.summary()
+            state = " (cancelada)" if stage.cancelled else (" (con error)" if stage.error else "")
+            logger.info(
+                f"⚙️ Etapa {stage.name}{state}: {s['items']} items, ocupada {s['busy_seconds']:.1f}s, "
+                f"ociosa {s['idle_seconds']:.1f}s de {s['elapsed_seconds']:.1f}s"
+            )
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+🖥️ Leads CLI - Punto de entrada headless (cron, scripts, workers)
+
+Corre el mismo flujo que la app (main_orchestrator.main) sin importar
+Streamlit. La configuración sale de flags, variables de entorno o un archivo
+(ver app_config.py); googleapiclient solo se importa si se llega a subir a
+Sheets.
+
+Uso:
+    python leads_cli.py search --query cotillones --location "Once, Buenos Aires, Argentina"
+    python leads_cli.py search --query librerías --location Palermo --max-results 50 --output leads.csv
+    python leads_cli.py --config secrets.toml search --query ...
+    python leads_cli.py worker --workers 2          # procesa la cola de búsquedas en segundo plano
+    python leads_cli.py submit --query cotillones --location Once
+    python leads_cli.py jobs
+    python leads_cli.py cancel <job_id>
+"""
+
+import argparse
+import sys
+import logging
+
+import app_config
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def log_progress(step, message, data=None):
+    """progress_callback de main() que escribe el progreso en el log"""
+    logger.info(f"[{step}] {message}")
+
+def run_search(args):
+    # Import diferido: `leads_cli.py --help` no carga pandas ni el orquestador
+    from main_orchestrator import main
+
+    result_df, message = main(
+        query=args.query,
+        location=args.location,
+        max_results=args.max_results,
+        progress_callback=log_progress,
+        pipelined=not args.sequential,
+        use_cache=not args.no_cache,
+        refresh=args.refresh,
+    )
+    print(f"\n📊 Resultado: {message}")
+    if result_df is None:
+        return 1
+    print(f"📈 Procesados: {len(result_df)} registros")
+    if args.output:
+        result_df.to_csv(args.output, index=False, encoding='utf-8')
+        logger.info(f"✅ Resultados exportados a {args.output}")
+    return 0
+
+def run_worker(args):
+    from job_queue import JobStore, JobRunner
+
+    JobRunner(JobStore(args.jobs_db), workers=args.workers).run_forever()
+    return 0
+
+def run_submit(args):
+    from job_queue import JobStore
+
+    job_id = JobStore(args.jobs_db).submit(args.query, args.location, args.max_results, refresh=args.refresh)
+    print(job_id)
+    return 0
+
+def run_jobs(args):
+    from job_queue import JobStore
+
+    for job in JobStore(args.jobs_db).list_jobs(limit=args.limit):
+        print(f"{job['id']}  {job['status']:<10} {job['progress']:>3}%  '{job['query']}' en '{job['location']}'"
+              f"  - {job['message'] or ''}")
+    return 0
+
+def run_cancel(args):
+    from job_queue import JobStore
+
+    JobStore(args.jobs_db).request_cancel(args.job_id)
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Generador de leads sin interfaz (no requiere Streamlit)")
+    parser.add_argument('--config', help="Archivo de configuración TOML (formato de secrets.toml) o JSON")
+    parser.add_argument('--api-key', help="API key de Google Places (o GOOGLE_PLACES_API_KEY)")
+    parser.add_argument('--spreadsheet-id', help="ID del spreadsheet destino (o GOOGLE_SHEETS_SPREADSHEET_ID)")
+    parser.add_argument('--credentials-file', help="JSON de la cuenta de servicio (o GOOGLE_SHEETS_CREDENTIALS_FILE)")
+    parser.add_argument('--scrape-time-budget', type=float,
+                        help="Segundos máximos de scraping por búsqueda (o SCRAPE_TIME_BUDGET_SECONDS)")
+    parser.add_argument('--jobs-db', default='jobs.db', help="Base SQLite de la cola de búsquedas")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    search = subparsers.add_parser('search', help="Buscar negocios, scrapear sus sitios y subir a Sheets")
+    search.add_argument('--query', required=True, help="Tipo de negocio a buscar")
+    search.add_argument('--location', required=True, help="Ubicación geográfica")
+    search.add_argument('--max-results', type=int, default=None, help="Límite de resultados (por defecto sin límite)")
+    search.add_argument('--sequential', action='store_true', help="Correr las etapas en secuencia en lugar del pipeline")
+    search.add_argument('--output', help="Guardar también el resultado en este CSV")
+    search.add_argument('--refresh', action='store_true', help="Ignorar el resultado guardado y volver a buscar")
+    search.add_argument('--no-cache', action='store_true', help="No consultar ni actualizar el cache de búsquedas")
+    search.set_defaults(handler=run_search)
+
+    worker = subparsers.add_parser('worker', help="Procesar las búsquedas encoladas (hasta Ctrl+C)")
+    worker.add_argument('--workers', type=int, default=1, help="Búsquedas en paralelo")
+    worker.set_defaults(handler=run_worker)
+
+    submit = subparsers.add_parser('submit', help="Encolar una búsqueda para los workers e imprimir su id")
+    submit.add_argument('--query', required=True, help="Tipo de negocio a buscar")
+    submit.add_argument('--location', required=True, help="Ubicación geográfica")
+    submit.add_argument('--max-results', type=int, default=None, help="Límite de resultados (por defecto sin límite)")
+    submit.add_argument('--refresh', action='store_true', help="Ignorar el resultado guardado y volver a buscar")
+    submit.set_defaults(handler=run_submit)
+
+    jobs = subparsers.add_parser('jobs', help="Listar las búsquedas encoladas, en curso y terminadas")
+    jobs.add_argument('--limit', type=int, default=20, help="Cantidad de jobs a mostrar")
+    jobs.set_defaults(handler=run_jobs)
+
+    cancel = subparsers.add_parser('cancel', help="Cancelar una búsqueda encolada o en curso")
+    cancel.add_argument('job_id', help="Id del job (ver `jobs`)")
+    cancel.set_defaults(handler=run_cancel)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    app_config.configure(
+        config_file=args.config,
+        google_places_api_key=args.api_key,
+        google_sheets_spreadsheet_id=args.spreadsheet_id,
+        google_sheets_credentials_file=args.credentials_file,
+        limits_scrape_time_budget=args.scrape_time_budget,
+    )
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,108 +6,177 @@ Orquesta el proceso completo:
 1. Llama a GooglePlacesFetcher para obtener datos de negocios.
 2. Llama a WebsiteScraper para enriquecer los datos con información de contacto.
 3. Llama a GoogleSheetsManager para subir los datos finales a la nube.
+
+Por defecto las tres etapas corren en paralelo como un pipeline (ver
+lead_pipeline.py): los lugares pasan al scraper a medida que aparecen y los
+registros enriquecidos se suben a Sheets en lotes. Con pipelined=False se
+ejecutan en secuencia como antes.
+
+Si la misma búsqueda (query, ubicación y opciones normalizadas) ya se corrió
+dentro de la ventana de frescura, main() devuelve el resultado guardado en el
+cache compartido (ver search_cache.py) sin volver a correr el flujo.
 """
 
+import time
+import numpy as np
 import pandas as pd
 import logging
 import re
-import streamlit as st
+import app_config
 from google_places_fetcher import GooglePlacesFetcher
 from website_scraper import WebsiteScraper
 from google_sheets_manager import GoogleSheetsManager
+from lead_pipeline import Pipeline, PipelineCancelled, END, POLL_SECONDS
+from phone_normalizer import clean_phone_number, normalize_phone_numbers
+from search_cache import get_shared_cache, format_age
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Limpieza por columna de representaciones de listas y marcadores de vacío
+LIST_EDGES_RE = re.compile(r"^\['|'\]$")
+EMPTY_MARKERS = ('None', 'nan', 'NaN')
+# Último link "red:url" de cada celda de social_media_links (como separate_social_media_data)
+SOCIAL_LINK_PATTERNS = {
+    network: re.compile(rf"(?s)^(?:.*;)?\s*{network}:([^;]*)") for network in ('facebook', 'instagram')
+}
+# Dominios de redes sociales y el tipo de URL que indican; se comparan contra el host
+# de la URL (incluidos sus subdominios, ej. m.facebook.com), no contra la URL entera
+SOCIAL_DOMAINS = {
+    'facebook.com': 'facebook',
+    'fb.com': 'facebook',
+    'instagram.com': 'instagram',
+    'instagr.am': 'instagram',
+    'twitter.com': 'other_social',
+    'linkedin.com': 'other_social',
+    'youtube.com': 'other_social',
+    'tiktok.com': 'other_social',
+}
+# El host de una URL con o sin esquema ("https://www.x.com/a", "x.com/a", "//x.com") se obtiene
+# quitando lo que va antes (esquema, usuario@) y lo que va después (puerto, ruta, query)
+URL_BEFORE_HOST_PATTERN = r'^\s*(?:[A-Za-z][A-Za-z0-9+.\-]*://|//)?(?:[^@/?#\s]*@)?'
+URL_AFTER_HOST_PATTERN = r'[/?#:\s].*'
+# Un patrón por tipo, en el orden de prioridad de classify_url: el host es el dominio o un subdominio,
+# con o sin el dominio de país agregado (facebook.com.ar, instagram.com.ar)
+SOCIAL_HOST_PATTERNS = {
+    url_type: r'(?:^|\.)(?:' + '|'.join(re.escape(domain) for domain, t in SOCIAL_DOMAINS.items() if t == url_type) +
+              r')(?:\.[a-z]{2})?\.?$'
+    for url_type in dict.fromkeys(SOCIAL_DOMAINS.values())
+}
+
+# Columnas del formato del sistema y el campo de GooglePlacesFetcher del que salen
+PLACES_COLUMNS = {
+    'place_id': 'place_id',
+    'displayName.text': 'name',
+    'formattedAddress': 'address',
+    'rating': 'rating',
+    'userRatingCount': 'user_ratings_total',
+    'websiteUri': 'website',
+    'nationalPhoneNumber': 'phone',
+    'latitude': 'latitude',
+    'longitude': 'longitude',
+    'types': 'types',
+}
+
+# Tamaños de las colas y lotes del pipeline
+PLACES_QUEUE_SIZE = 50
+SCRAPED_QUEUE_SIZE = 10
+SCRAPE_BATCH_SIZE = 10
+# Segundos sin lugares nuevos tras los que se pasa al scraper lo juntado (aunque el lote no esté completo)
+SCRAPE_BATCH_WAIT = 0.5
+UPLOAD_BATCH_SIZE = 50
+# Si no llegan registros nuevos en este tiempo se sube lo acumulado
+UPLOAD_FLUSH_SECONDS = 15.0
+# Solo se guardan en el cache las búsquedas que terminaron bien (incluida la carga a Sheets)
+SUCCESS_SUMMARY_PREFIX = "✅"
+
+def get_scrape_time_budget():
+    """
+    Presupuesto en segundos para el scraping de una búsqueda (limits.scrape_time_budget o
+    SCRAPE_TIME_BUDGET_SECONDS). Con presupuesto el scraper usa el crawler con frontier y
+    entrega lo encontrado al vencer; None o 0 = sin límite.
+    """
+    value = app_config.get_setting('limits', 'scrape_time_budget')
+    return float(value) if value and float(value) > 0 else None
+
+def search_cache_options(max_results=None, scrape_time_budget=None):
+    """
+    Opciones que forman la clave de una búsqueda en el cache (las mismas al guardar y al consultar).
+    scrape_time_budget=None toma el presupuesto de la configuración, como main().
+    """
+    if scrape_time_budget is None:
+        scrape_time_budget = get_scrape_time_budget()
+    # Con presupuesto el resultado puede ser parcial: no comparte entrada con las búsquedas sin límite
+    return {'max_results': max_results, 'scrape_time_budget': scrape_time_budget}
+
 def get_api_keys():
     """
-    Obtiene las API keys desde Streamlit secrets o variables de entorno
+    Obtiene las API keys desde la configuración (flags, entorno, archivo o Streamlit secrets)
     """
-    try:
-        # Intentar obtener desde Streamlit secrets primero
-        google_api_key = st.secrets["google"]["places_api_key"]
-        return google_api_key
-    except (KeyError, AttributeError):
-        # Fallback a valores hardcodeados para desarrollo
-        logger.warning("⚠️ Usando API key hardcodeada - configura st.secrets para producción")
-        google_api_key = "YOUR_GOOGLE_PLACES_API_KEY_HERE"
+    google_api_key = app_config.get_setting("google", "places_api_key")
+    if google_api_key:
         return google_api_key
+    # Fallback a valores hardcodeados para desarrollo
+    logger.warning("⚠️ Usando API key hardcodeada - configura st.secrets o GOOGLE_PLACES_API_KEY para producción")
+    return "YOUR_GOOGLE_PLACES_API_KEY_HERE"
 
-def clean_phone_number(phone):
+def extract_hosts(urls):
     """
-    Limpia y formatea un número de teléfono para WhatsApp Argentina (+54 9 código área número)
+    Host en minúsculas de cada URL de una Series, con operaciones por columna.
+    Los valores vacíos o nulos quedan como "".
     """
-    if not phone or pd.isna(phone):
-        return ""
-    
-    # Convertir a string y limpiar
-    phone = str(phone).strip()
-    
-    # Remover caracteres no numéricos excepto el +
-    phone_clean = re.sub(r'[^\d+]', '', phone)
-    
-    # Si ya está en formato WhatsApp correcto (+54 9), mantenerlo
-    if phone_clean.startswith('+549'):
-        return phone_clean
-    
-    # Si tiene +54 pero no el 9, agregarlo
-    if phone_clean.startswith('+54') and not phone_clean.startswith('+549'):
-        # Extraer el número después del +54
-        number_part = phone_clean[3:]
-        return f"+549{number_part}"
-    
-    # Si empieza con 54 (sin +), agregar + y 9
-    if phone_clean.startswith('54') and not phone_clean.startswith('549'):
-        number_part = phone_clean[2:]
-        return f"+549{number_part}"
-    
-    # Si empieza con 549, solo agregar +
-    if phone_clean.startswith('549'):
-        return f"+{phone_clean}"
-    
-    # Números de Buenos Aires (011 o 11)
-    if phone_clean.startswith('011'):
-        number_part = phone_clean[3:]  # Remover 011
-        return f"+54911{number_part}"
-    elif phone_clean.startswith('11'):
-        number_part = phone_clean[2:]  # Remover 11
-        return f"+54911{number_part}"
-    
-    # Otros códigos de área argentinos con 0 inicial (ej: 0341, 0351, etc.)
-    if phone_clean.startswith('0') and len(phone_clean) >= 11:
-        # Remover el 0 inicial y agregar +549
-        number_part = phone_clean[1:]
-        return f"+549{number_part}"
-    
-    # Para otros números argentinos (códigos de área), asumir que necesitan +54 9
-    # Si el número tiene 10 dígitos o más, probablemente ya incluye código de área
-    if len(phone_clean) >= 10:
-        return f"+549{phone_clean}"
-    
-    # Para números más cortos, asumir Buenos Aires
-    return f"+54911{phone_clean}"
+    text = urls.astype(object).where(urls.notna(), '').astype(str)
+    hosts = text.str.replace(URL_BEFORE_HOST_PATTERN, '', regex=True).str.replace(URL_AFTER_HOST_PATTERN, '', regex=True)
+    return hosts.str.lower()
+
+def classify_urls(urls):
+    """
+    Versión por columna de classify_url: devuelve una Series con el tipo de cada URL
+    ('website', 'facebook', 'instagram', 'other_social' o 'empty'), mismo índice que urls.
+    El host se extrae una vez y se compara contra los dominios de SOCIAL_DOMAINS.
+    """
+    urls = pd.Series(urls, dtype=object) if not isinstance(urls, pd.Series) else urls
+    hosts = extract_hosts(urls)
+    conditions = [urls.isna().to_numpy() | ~urls.fillna('').astype(object).to_numpy().astype(bool)]
+    conditions += [np.asarray(hosts.str.contains(pattern, regex=True), dtype=bool) for pattern in SOCIAL_HOST_PATTERNS.values()]
+    url_types = np.select(conditions, ['empty', *SOCIAL_HOST_PATTERNS], default='website').astype(object)
+    return pd.Series(url_types, index=urls.index, dtype=object)
+
+def reclassify_website_urls(df):
+    """
+    Mueve a facebook_url/instagram_url las URLs de redes sociales que quedaron en websiteUri
+    (ej. datos históricos clasificados con reglas anteriores). Modifica df y devuelve los contadores.
+    Solo completa la columna de la red si estaba vacía.
+    """
+    def blank(column):
+        if column not in df.columns:
+            return np.ones(len(df), dtype=bool)
+        return ~df[column].astype(object).to_numpy().astype(bool)
+
+    websites = df['websiteUri'] if 'websiteUri' in df.columns else pd.Series('', index=df.index, dtype=object)
+    url_types = classify_urls(websites).to_numpy()
+    moved = np.isin(url_types, ['facebook', 'instagram'])
+    counts = {'websites_moved': int(moved.sum())}
+    for network in ('facebook', 'instagram'):
+        added = (url_types == network) & blank(f'{network}_url')
+        if added.any():
+            df.loc[added, f'{network}_url'] = websites[added]
+        counts[f'{network}s_added'] = int(added.sum())
+    if moved.any():
+        df.loc[moved, 'websiteUri'] = ''
+    return counts
 
 def classify_url(url):
     """
     Clasifica una URL como sitio web real o red social
     Retorna: ('website', url) o ('facebook', url) o ('instagram', url) o ('other_social', url)
+    Para columnas enteras usar classify_urls.
     """
-    if not url or pd.isna(url):
+    url_type = classify_urls([url]).iloc[0]
+    if url_type == 'empty':
         return 'empty', ''
-    
-    url_str = str(url).lower().strip()
-    
-    # Verificar redes sociales específicas
-    if 'facebook.com' in url_str or 'fb.com' in url_str:
-        return 'facebook', url
-    elif 'instagram.com' in url_str or 'instagr.am' in url_str:
-        return 'instagram', url
-    elif any(domain in url_str for domain in ['twitter.com', 'linkedin.com', 'youtube.com', 'tiktok.com']):
-        return 'other_social', url
-    else:
-        # Es un sitio web real
-        return 'website', url
+    return url_type, url
 
 def separate_social_media_data(social_media_string):
     """
@@ -130,6 +199,20 @@ def separate_social_media_data(social_media_string):
     
     return facebook_url, instagram_url
 
+def extract_social_network(social_media_links, network):
+    """
+    Versión por columna de separate_social_media_data: devuelve la URL de la red
+    ('facebook' o 'instagram') de cada celda "red:url; red:url" ('' si no tiene).
+    """
+    values = social_media_links.astype(str)
+    links = pd.Series('', index=values.index, dtype=object)
+    # La regex solo corre sobre las celdas que mencionan la red
+    mentions = values.str.contains(f'{network}:', regex=False)
+    if mentions.any():
+        found = values[mentions].str.extract(SOCIAL_LINK_PATTERNS[network], expand=False).fillna('')
+        links[mentions] = found.str.replace(f'{network}:', '', regex=False).str.strip()
+    return links
+
 def clean_dataframe_for_sheets(df, search_query="", search_location=""):
     """
     Limpia el DataFrame eliminando valores NaN y preparándolo para Google Sheets
@@ -150,38 +233,23 @@ def clean_dataframe_for_sheets(df, search_query="", search_location=""):
     
     # Limpiar formato de teléfonos
     if 'nationalPhoneNumber' in df_clean.columns:
-        df_clean['nationalPhoneNumber'] = df_clean['nationalPhoneNumber'].apply(clean_phone_number)
+        df_clean['nationalPhoneNumber'] = normalize_phone_numbers(df_clean['nationalPhoneNumber'])
         logger.info("📱 Teléfonos limpiados y formateados")
     
-    # Separar y consolidar redes sociales de múltiples fuentes
-    facebook_urls = []
-    instagram_urls = []
-    
-    # Fuente 1: Redes sociales extraídas por web scraping
-    if 'social_media_links' in df_clean.columns:
-        social_media_split = df_clean['social_media_links'].apply(separate_social_media_data)
-        scraped_facebook = [x[0] for x in social_media_split]
-        scraped_instagram = [x[1] for x in social_media_split]
-    else:
-        scraped_facebook = [''] * len(df_clean)
-        scraped_instagram = [''] * len(df_clean)
-    
-    # Fuente 2: Redes sociales de Google Places (clasificadas en transform_places_data)
-    places_facebook = df_clean.get('places_facebook_url', [''] * len(df_clean))
-    places_instagram = df_clean.get('places_instagram_url', [''] * len(df_clean))
+    # Separar y consolidar redes sociales de múltiples fuentes (operaciones por columna)
+    for network in ('facebook', 'instagram'):
+        # Fuente 1: Redes sociales extraídas por web scraping
+        if 'social_media_links' in df_clean.columns:
+            scraped = extract_social_network(df_clean['social_media_links'], network)
+        else:
+            scraped = pd.Series('', index=df_clean.index)
     
-    # Consolidar: priorizar web scraping, luego Google Places
-    for i in range(len(df_clean)):
-        # Facebook: usar scraped si existe, sino usar places
-        fb_final = scraped_facebook[i] if scraped_facebook[i] else str(places_facebook.iloc[i] if hasattr(places_facebook, 'iloc') else places_facebook[i] if i < len(places_facebook) else '')
-        facebook_urls.append(fb_final)
-        
-        # Instagram: usar scraped si existe, sino usar places  
-        ig_final = scraped_instagram[i] if scraped_instagram[i] else str(places_instagram.iloc[i] if hasattr(places_instagram, 'iloc') else places_instagram[i] if i < len(places_instagram) else '')
-        instagram_urls.append(ig_final)
+        # Fuente 2: Redes sociales de Google Places (clasificadas en transform_places_data)
+        places_col = f'places_{network}_url'
+        places = df_clean[places_col].astype(str) if places_col in df_clean.columns else ''
     
-    df_clean['facebook_url'] = facebook_urls
-    df_clean['instagram_url'] = instagram_urls
+        # Consolidar: priorizar web scraping, luego Google Places
+        df_clean[f'{network}_url'] = scraped.where(scraped != '', places).tolist()
     
     # Eliminar columnas temporales
     if 'places_facebook_url' in df_clean.columns:
@@ -190,81 +258,271 @@ def clean_dataframe_for_sheets(df, search_query="", search_location=""):
     logger.info("📱 Redes sociales consolidadas desde múltiples fuentes")
     
     # Convertir listas a strings si existen
+    other_cols = []
     for col in df_clean.columns:
         if df_clean[col].dtype == 'object':
-            df_clean[col] = df_clean[col].astype(str)
-            # Limpiar representaciones de listas como "['item1', 'item2']"
-            df_clean[col] = df_clean[col].str.replace(r"^\['|'\]$", "", regex=True)
-            df_clean[col] = df_clean[col].str.replace(r"', '", "; ", regex=True)
-    
-    # Asegurar que no hay valores None
-    df_clean = df_clean.replace('None', '')
-    df_clean = df_clean.replace('nan', '')
-    df_clean = df_clean.replace('NaN', '')
+            values = df_clean[col].astype(str)
+            # Limpiar representaciones de listas como "['item1', 'item2']" (solo celdas con comillas)
+            quoted = values.str.contains("'", regex=False)
+            if quoted.any():
+                values[quoted] = (values[quoted]
+                                  .str.replace(LIST_EDGES_RE, "", regex=True)
+                                  .str.replace("', '", "; ", regex=False))
+            # Asegurar que no hay valores None
+            df_clean[col] = values.mask(values.isin(EMPTY_MARKERS), '')
+        else:
+            other_cols.append(col)
+    if other_cols:
+        df_clean[other_cols] = df_clean[other_cols].replace(list(EMPTY_MARKERS), '')
     
     logger.info(f"✅ Datos limpios: {len(df_clean)} filas, {len(df_clean.columns)} columnas")
     return df_clean
 
 def transform_places_data(places_results):
     """
-    Transforma la estructura de datos de GooglePlacesFetcher al formato esperado por el sistema
+    Transforma la estructura de datos de GooglePlacesFetcher al formato esperado por el sistema.
+    Arma el DataFrame directamente por columnas.
     """
     logger.info("🔄 Transformando estructura de datos de Google Places...")
     
-    transformed_data = []
-    for place in places_results:
-        # Clasificar la URL del sitio web
-        website_url = place.get('website', '')
-        url_type, clean_url = classify_url(website_url)
-        
-        # Inicializar campos
-        final_website = ''
-        places_facebook = ''
-        places_instagram = ''
+    fields = list(PLACES_COLUMNS.values())
+    raw = pd.DataFrame.from_records(list(places_results), columns=fields)
+    df = pd.DataFrame({column: raw[field] for column, field in PLACES_COLUMNS.items()})
+    df['types'] = raw['types'].map(str)  # Convertir lista a string
         
-        # Asignar según el tipo de URL
-        if url_type == 'website':
-            final_website = clean_url
-        elif url_type == 'facebook':
-            places_facebook = clean_url
-        elif url_type == 'instagram':
-            places_instagram = clean_url
-        # Si es 'other_social' o 'empty', no asignamos nada
+    # Clasificar la URL del sitio web: solo los sitios reales quedan en websiteUri.
+    # Las de Facebook/Instagram van a campos temporales; 'other_social' y 'empty' no se asignan.
+    url_types = classify_urls(raw['website'])
+    websites = raw['website'].astype(object)
+    df['websiteUri'] = websites.where(url_types == 'website', '')
+    df['places_facebook_url'] = websites.where(url_types == 'facebook', '')
+    df['places_instagram_url'] = websites.where(url_types == 'instagram', '')
         
-        transformed_place = {
-            'place_id': place.get('place_id', ''),
-            'displayName.text': place.get('name', ''),
-            'formattedAddress': place.get('address', ''),
-            'rating': place.get('rating', ''),
-            'userRatingCount': place.get('user_ratings_total', ''),
-            'websiteUri': final_website,  # Solo sitios web reales
-            'nationalPhoneNumber': place.get('phone', ''),
-            'latitude': place.get('latitude', ''),
-            'longitude': place.get('longitude', ''),
-            'types': str(place.get('types', [])),  # Convertir lista a string
-            # Campos temporales para redes sociales de Google Places
-            'places_facebook_url': places_facebook,
-            'places_instagram_url': places_instagram
-        }
-        transformed_data.append(transformed_place)
-    
-    logger.info(f"✅ Transformados {len(transformed_data)} registros al formato correcto")
-    return transformed_data
+    logger.info(f"✅ Transformados {len(df)} registros al formato correcto")
+    # Mismos tipos de columna que si se armara desde una lista de diccionarios
+    return df.infer_objects()
+
+def count_emails(df):
+    """Cantidad de emails en la columna scraped_emails (0 si no hay scraping)"""
+    if df is None or 'scraped_emails' not in df.columns:
+        return 0
+    return int(df['scraped_emails'].astype(str).str.count('@').sum())
+
+def run_pipeline(query, location, max_results=None, progress_callback=None, cancel_event=None,
+                 scrape_time_budget=None):
+    """
+    Versión en pipeline del flujo: Places, scraping y carga a Sheets corren a la vez,
+    conectados por colas acotadas (si una etapa se atrasa, la anterior espera).
+    cancel_event (threading.Event) permite cortar el proceso desde afuera.
+    Retorna (DataFrame final, mensaje de resumen) como main().
+    scrape_time_budget (segundos) limita la etapa de scraping completa.
+    """
+    GOOGLE_API_KEY = get_api_keys()
+    pipeline = Pipeline(cancel_event=cancel_event)
+    places_channel = pipeline.channel("places", PLACES_QUEUE_SIZE)
+    scraped_channel = pipeline.channel("scraped", SCRAPED_QUEUE_SIZE)
+    totals = {'places': 0, 'scraped': 0, 'emails': 0, 'uploaded': 0, 'upload_failed': False}
+    uploaded_batches = []
+
+    if progress_callback:
+        progress_callback("places_searching", f"Inicializando búsqueda de '{query}' en '{location}'...", 0)
+
+    def places_fetcher_progress(current, total, found_count, phase="grid"):
+        if phase == "grid":
+            pipeline.emit("places_progress", f"Procesando grilla: Punto {current}/{total}. "
+                          f"Lugares únicos encontrados: {found_count}.", (current, total, found_count))
+
+    def places_stage(stage):
+        fetcher = GooglePlacesFetcher(api_key=GOOGLE_API_KEY, progress_callback=places_fetcher_progress)
+        for place in fetcher.iter_places_grid(query, location):
+            places_channel.put(place, stage)
+            stage.items += 1
+            totals['places'] = stage.items
+            if max_results and stage.items >= max_results:
+                logger.info(f"🔬 Limitando resultados a {max_results} para procesamiento")
+                break
+        places_channel.close(stage)
+        pipeline.emit("places_found", f"Encontrados {stage.items} lugares en {location}", stage.items)
+
+    def scraping_stage(stage):
+        def forward(batch_df):
+            stage.items += len(batch_df)
+            totals['scraped'] = stage.items
+            totals['emails'] += count_emails(batch_df)
+            found = max(totals['places'], stage.items)
+            pipeline.emit("scraping_progress", f"Procesados {stage.items}/{found} lugares",
+                          int(stage.items / found * 100))
+            scraped_channel.put(batch_df, stage)
+
+        # Una sola corrida del scraper para toda la búsqueda: los lugares entran a la cola de sitios
+        # apenas llegan, sin esperar a que termine el lote anterior, y el presupuesto de tiempo es de la etapa
+        with WebsiteScraper() as website_scraper:
+            stream = website_scraper.start_stream(time_budget=scrape_time_budget)
+            try:
+                places = []
+                while not stream.closed:
+                    item = places_channel.get(stage, timeout=SCRAPE_BATCH_WAIT)
+                    if item is not None and item is not END:
+                        places.append(item)
+                    if places and (item is None or item is END or len(places) >= SCRAPE_BATCH_SIZE):
+                        stream.add(transform_places_data(places))
+                        places = []
+                    if item is END:
+                        stream.close()
+                    for batch_df in stream.completed():
+                        forward(batch_df)
+                while not stream.done:
+                    if pipeline.cancel_event.is_set():
+                        raise PipelineCancelled()
+                    for batch_df in stream.completed(timeout=POLL_SECONDS):
+                        forward(batch_df)
+            finally:
+                # Sin efecto si la corrida terminó; si se canceló, descarta los sitios que no empezaron
+                stream.cancel()
+                stream.join()
+        scraped_channel.close(stage)
+        pipeline.emit("scraping_complete", "Scraping de sitios web finalizado.", totals['emails'])
+
+    def sheets_stage(stage):
+        sheets_manager = GoogleSheetsManager()
+        pending = []
+
+        def flush():
+            batch_df = clean_dataframe_for_sheets(pd.concat(pending, ignore_index=True),
+                                                  search_query=query, search_location=location)
+            pending.clear()
+            pipeline.emit("sheets_start", f"Subiendo {len(batch_df)} registros a Google Sheets...", len(batch_df))
+            if not sheets_manager.upload_data(batch_df):
+                totals['upload_failed'] = True
+            uploaded_batches.append(batch_df)
+            stage.items += len(batch_df)
+            totals['uploaded'] = stage.items
+
+        while True:
+            item = scraped_channel.get(stage, timeout=UPLOAD_FLUSH_SECONDS if pending else None)
+            if item is None:
+                flush()
+                continue
+            if item is END:
+                break
+            pending.append(item)
+            if sum(len(df) for df in pending) >= UPLOAD_BATCH_SIZE:
+                flush()
+        if pending:
+            flush()
+        totals['sheets_total'] = sheets_manager.get_stats().get('total_records', 0)
+
+    pipeline.add_stage("places", places_stage)
+    pipeline.add_stage("scraping", scraping_stage)
+    pipeline.add_stage("sheets", sheets_stage)
+
+    started = time.time()
+    error = pipeline.run(event_handler=progress_callback)
+    pipeline.log_summary()
+    logger.info(f"⏱️ Pipeline completo en {time.time() - started:.1f}s")
+
+    if error is not None:
+        return None, f"Error inesperado durante el proceso: {error}"
+    if pipeline.cancel_event.is_set():
+        return None, "Proceso cancelado"
+    if totals['places'] == 0:
+        logger.error("El Paso 1 (Google Places) no devolvió resultados. Abortando.")
+        return None, "No se encontraron resultados en Google Places"
+
+    final_df = pd.concat(uploaded_batches, ignore_index=True)
+    stage_lines = "\n".join(
+        f"            • Etapa {s.name}: ocupada {s.busy_seconds:.0f}s, ociosa {s.idle_seconds:.0f}s"
+        for s in pipeline.stages
+    )
+    if not totals['upload_failed']:
+        logger.info("\n🎉 ¡PROCESO COMPLETADO EXITOSAMENTE! 🎉")
+        summary_message = f"""
+            ✅ Proceso completado exitosamente para '{query}' en '{location}'
+            📊 Resumen final:
+            • {len(final_df)} lugares procesados
+            • {totals['emails']} emails extraídos
+            • {totals.get('sheets_total', 0)} registros totales en Google Sheets
+            ⚙️ Etapas:
+{stage_lines}
+            """
+        if progress_callback:
+            progress_callback("sheets_complete", f"Datos subidos exitosamente: {totals.get('sheets_total', 0)} registros totales",
+                              totals.get('sheets_total', 0))
+    else:
+        logger.error("\n❌ HUBO UN ERROR DURANTE LA CARGA A GOOGLE SHEETS.")
+        summary_message = f"""
+            ⚠️ Datos procesados correctamente pero error al subir a Google Sheets
+            📊 Resumen:
+            • {len(final_df)} lugares procesados
+            • {totals['emails']} emails extraídos
+            • Error en subida a Google Sheets
+            ⚙️ Etapas:
+{stage_lines}
+            """
+        if progress_callback:
+            progress_callback("sheets_complete", "Error al subir a Google Sheets", 0)
+    return final_df, summary_message.strip()
+
+def main(query="cotillones", location="Once, Buenos Aires, Argentina", max_results=None, progress_callback=None,
+         pipelined=True, cancel_event=None, use_cache=True, refresh=False, scrape_time_budget=None):
+    """
+    Función principal: devuelve el resultado guardado si la búsqueda está en el cache
+    y es reciente; si no, corre el flujo completo (run_search) y guarda el resultado.
 
-def main(query="cotillones", location="Once, Buenos Aires, Argentina", max_results=None, progress_callback=None):
+    Args:
+        use_cache (bool): Consultar y actualizar el cache compartido de búsquedas
+        refresh (bool): Ignorar el resultado guardado y volver a buscar (actualiza el cache)
+        scrape_time_budget (float): Segundos para el scraping; por defecto el de la configuración
+        El resto, como en run_search.
     """
-    Función principal que orquesta todo el flujo de trabajo.
+    if scrape_time_budget is None:
+        scrape_time_budget = get_scrape_time_budget()
+    # Una sola conexión por proceso: cada llamada a main (jobs, sesiones) reutiliza la misma
+    cache = get_shared_cache() if use_cache else None
+    options = search_cache_options(max_results, scrape_time_budget)
+    if cache is not None and not refresh:
+        cached = cache.lookup(query, location, options)
+        if cached is not None:
+            age = format_age(cached['age'])
+            logger.info(f"♻️ Resultado de '{query}' en '{location}' tomado del cache (de hace {age})")
+            if progress_callback:
+                progress_callback("cache_hit", f"Resultado guardado de hace {age}", len(cached['df']))
+            return cached['df'], f"♻️ Resultado guardado de hace {age} (sin nueva búsqueda)\n{cached['summary']}"
+
+    result_df, message = run_search(query, location, max_results, progress_callback, pipelined, cancel_event,
+                                    scrape_time_budget)
+    if cache is not None and result_df is not None and message.startswith(SUCCESS_SUMMARY_PREFIX):
+        try:
+            cache.store(query, location, result_df, message, options)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo guardar el resultado en el cache de búsquedas: {e}")
+    return result_df, message
+
+def run_search(query="cotillones", location="Once, Buenos Aires, Argentina", max_results=None, progress_callback=None,
+               pipelined=True, cancel_event=None, scrape_time_budget=None):
+    """
+    Corre el flujo completo de trabajo (sin cache).
     
     Args:
         query (str): Tipo de negocio a buscar
         location (str): Ubicación geográfica
         max_results (int): Límite máximo de resultados (None = sin límite)
         progress_callback (function): Callback para reportar progreso en tiempo real
+        pipelined (bool): Correr las etapas en paralelo (True) o en secuencia (False)
+        cancel_event (threading.Event): Permite cancelar el pipeline desde afuera
+        scrape_time_budget (float): Segundos para todo el scraping (None = sin límite)
     """
     print("=" * 60)
     print("🚀 INICIANDO ORQUESTADOR DE GENERACIÓN DE LEADS 🚀")
     print("=" * 60)
 
+    if pipelined:
+        try:
+            return run_pipeline(query, location, max_results, progress_callback, cancel_event, scrape_time_budget)
+        except Exception as e:
+            logger.error(f"\n🚨 OCURRIÓ UN ERROR INESPERADO EN EL ORQUESTADOR: {e}", exc_info=True)
+            return None, f"Error inesperado durante el proceso: {str(e)}"
+
     # --- Configuración del Proceso ---
     GOOGLE_API_KEY = get_api_keys()
 
@@ -308,16 +566,13 @@ def main(query="cotillones", location="Once, Buenos Aires, Argentina", max_resul
         if progress_callback:
             progress_callback("places_searching", f"Procesando {len(places_results_raw)} lugares encontrados...", len(places_results_raw))
         
-        # Transformar la estructura de datos al formato esperado
-        places_results = transform_places_data(places_results_raw)
-        
         # Aplicar límite si se especifica
-        if max_results and len(places_results) > max_results:
-            places_results = places_results[:max_results]
+        if max_results and len(places_results_raw) > max_results:
+            places_results_raw = places_results_raw[:max_results]
             logger.info(f"🔬 Limitando resultados a {max_results} para procesamiento")
         
-        # Convertir a DataFrame
-        places_df = pd.DataFrame(places_results)
+        # Transformar la estructura de datos al formato esperado (directo a DataFrame)
+        places_df = transform_places_data(places_results_raw)
         logger.info(f"✅ Datos de Google Places procesados: {len(places_df)} registros")
         
         if progress_callback:
@@ -331,6 +586,7 @@ def main(query="cotillones", location="Once, Buenos Aires, Argentina", max_resul
         if progress_callback:
             progress_callback("scraping_start", f"Iniciando scraping de {sites_with_url} sitios web...", sites_with_url)
         
+        website_scraper = None
         try:
             website_scraper = WebsiteScraper()
             
@@ -343,7 +599,8 @@ def main(query="cotillones", location="Once, Buenos Aires, Argentina", max_resul
             # Ejecutar scraping con progreso
             scraped_df = website_scraper.run_scraping_process_from_dataframe(
                 places_df, 
-                progress_callback=scraping_progress_callback
+                progress_callback=scraping_progress_callback,
+                time_budget=scrape_time_budget
             )
             logger.info("✅ Paso 2 (Website Scraper) completado.")
             if progress_callback:
@@ -356,6 +613,10 @@ def main(query="cotillones", location="Once, Buenos Aires, Argentina", max_resul
             scraped_df = places_df # Continuar con los datos originales
             if progress_callback:
                 progress_callback("error", f"Error en scraping: {e}", 0)
+        finally:
+            # Sin esto el pool de parseo queda vivo y un proceso hijo que corre el flujo no termina
+            if website_scraper is not None:
+                website_scraper.close()
 
         # --- LIMPIEZA FINAL DE DATOS ---
         logger.info("\n--- LIMPIEZA FINAL DE DATOS ---")
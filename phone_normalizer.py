@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Phone Normalizer - Normalización de teléfonos argentinos para WhatsApp
+
+Responsabilidad: Llevar teléfonos al formato de WhatsApp Argentina (+54 9
+código de área + número). normalize_phone_numbers procesa columnas enteras con
+operaciones de strings de pandas, sin recorrer fila por fila; clean_phone_number
+es la versión para un solo teléfono, en Python puro y con las mismas reglas
+(los mismos patrones compilados con re). Ambas dan exactamente el resultado del
+clean_phone_number original fila por fila (dataframe_benchmark.py lo verifica).
+
+Con pyarrow instalado (viene con streamlit) las operaciones corren en los
+kernels de Arrow; sin pyarrow se usa el motor de strings de Python de pandas,
+con el mismo resultado pero sin la ganancia de velocidad.
+"""
+
+import logging
+import re
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+STRING_DTYPE = pd.StringDtype('pyarrow') if pyarrow is not None else object
+
+WHATSAPP_PREFIX = '+549'
+BUENOS_AIRES_AREA_CODE = '11'
+# Los patrones son strings (no re.compile) para que pandas pueda usar los kernels de Arrow
+NON_PHONE_CHARS_PATTERN = r'[^\d+]'
+# RE2 (Arrow) solo reconoce dígitos ASCII: los textos con otros caracteres van por el motor de Python
+NON_ASCII_PATTERN = r'[^\x00-\x7f]'
+
+# Las reglas de clean_phone_number siempre terminan en +549 + número nacional. Este patrón quita
+# lo que va antes del número nacional, respetando el orden de las reglas originales:
+# +549, +54, 549, 54 (sin el 9), el 0 de 011 y el 0 inicial de los códigos del interior (11+ dígitos)
+LEADING_PREFIX_PATTERN = r'^(?:\+549|\+54|549|54|0(11)|0(.{10,}$))'
+# Comienzos que alguna regla reconoce; el resto, con menos de 10 dígitos, se asume de Buenos Aires
+KNOWN_STARTS = ('+54', '54', '011', BUENOS_AIRES_AREA_CODE)
+AREA_CODE_LENGTH = 10
+
+# Los mismos patrones compilados para el camino escalar (clean_phone_number)
+NON_PHONE_CHARS_RE = re.compile(NON_PHONE_CHARS_PATTERN)
+LEADING_PREFIX_RE = re.compile(LEADING_PREFIX_PATTERN)
+
+def clean_phone_number(phone):
+    """
+    Normaliza un solo teléfono al formato WhatsApp Argentina ("" si está vacío o es nulo).
+    Mismas reglas que normalize_phone_numbers, sin pasar por pandas; para columnas usar esa.
+    """
+    if pd.isna(phone) or not phone:
+        return ''
+    digits = NON_PHONE_CHARS_RE.sub('', str(phone))
+    national = LEADING_PREFIX_RE.sub(r'\1\2', digits)
+
+    # Número corto sin prefijo conocido: asumir Buenos Aires
+    if len(digits) < AREA_CODE_LENGTH and not digits.startswith(KNOWN_STARTS):
+        national = BUENOS_AIRES_AREA_CODE + national
+    return WHATSAPP_PREFIX + national
+
+def _national_numbers(text):
+    """
+    Número nacional (sin +549) de cada teléfono de una Series de strings no vacíos.
+    El dtype de la Series define el motor (Arrow u objetos de Python).
+    """
+    digits = text.str.replace(NON_PHONE_CHARS_PATTERN, '', regex=True)
+    national = digits.str.replace(LEADING_PREFIX_PATTERN, r'\1\2', regex=True)
+
+    # Números cortos sin prefijo conocido: asumir Buenos Aires
+    short = digits.str.len().to_numpy(dtype=int) < AREA_CODE_LENGTH
+    short &= ~np.asarray(digits.str.startswith(KNOWN_STARTS), dtype=bool)
+    if short.any():
+        national[short] = BUENOS_AIRES_AREA_CODE + national[short]
+    return national
+
+def normalize_phone_numbers(phones):
+    """
+    Normaliza una columna de teléfonos al formato WhatsApp Argentina.
+    Acepta cualquier iterable/Series y devuelve una Series de strings con el mismo índice;
+    los valores vacíos o nulos quedan como "".
+    """
+    phones = pd.Series(phones, dtype=object) if not isinstance(phones, pd.Series) else phones.astype(object)
+    result = pd.Series('', index=phones.index, dtype=object)
+
+    # Vacíos: nulos y valores falsos ("", 0)
+    present = phones.notna().to_numpy() & phones.fillna('').to_numpy().astype(bool)
+    if not present.any():
+        return result
+
+    text = phones[present].astype(str)
+    non_ascii = text.str.contains(NON_ASCII_PATTERN, regex=True).to_numpy(dtype=bool)
+    for rows, dtype in ((~non_ascii, STRING_DTYPE), (non_ascii, object)):
+        if rows.any():
+            normalized = WHATSAPP_PREFIX + _national_numbers(text[rows].astype(dtype))
+            result.iloc[present.nonzero()[0][rows]] = normalized.to_numpy(dtype=object)
+    return result
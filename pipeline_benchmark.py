@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+🎞️ Pipeline Benchmark - Mide el flujo completo sin red ni API key
+
+Corre main_orchestrator.main de punta a punta contra un cassette grabado
+(ver api_cassette.py): Geocoding, Text Search, Details, las páginas que
+descarga el scraper y las llamadas a Sheets salen del archivo, así que cada
+corrida procesa exactamente los mismos datos. Reporta el tiempo total y por
+etapa, las llamadas por etapa, CPU y pico de memoria (RSS), y una huella del
+resultado para detectar cambios de comportamiento además de los de velocidad.
+Cada repetición corre en un proceso aparte y en una carpeta temporal (caches
+de scraping y de búsquedas vacías).
+
+Por defecto se anulan las pausas fijas del fetcher (delay entre requests y
+espera del next_page_token) y el presupuesto compartido de QPS: son constantes
+y taparían las regresiones del código. Con --real-delays se mantienen.
+
+El repo trae un cassette de ejemplo (fixtures/cassettes/fixture_cotillon.json,
+el que usa run por defecto) grabado sin red externa con el subcomando fixture:
+Places sale de fake_places_api.py y los sitios web de los fixtures de
+scraper_benchmark.py. Al grabar, Sheets es siempre una hoja en memoria (no hacen
+falta credenciales); con --real-sheets se parte del contenido de la hoja real.
+
+Uso:
+    # Regenerar el cassette de ejemplo
+    python pipeline_benchmark.py fixture
+    # Grabar una búsqueda real (requiere API key; para Places sin cuota se puede
+    # apuntar GOOGLE_API_BASE_URL a fake_places_api.py)
+    python pipeline_benchmark.py record --query cotillones --location "Once, Buenos Aires, Argentina" \\
+        --cassette fixtures/cassettes/cotillones_once.json
+    # Repetirla offline
+    python pipeline_benchmark.py run --cassette fixtures/cassettes/cotillones_once.json --repeat 3
+    python pipeline_benchmark.py run --compare benchmark_results/pipeline_20250101_120000.json
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import tempfile
+import time
+from datetime import datetime
+import logging
+
+import app_config
+import google_places_fetcher
+from api_cassette import Cassette, CASSETTES_DIR
+from fake_places_api import SyntheticCity, FakePlacesServer, DEFAULT_CATEGORIES
+from places_benchmark import BENCHMARK_PAGE_TOKEN_DELAY
+from scraper_benchmark import RESULTS_DIR, FIXTURE_KINDS, FixtureServer, _environment, _peak_rss_mb
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Llamadas del cassette que corresponden a cada etapa del pipeline
+STAGE_CALLS = {
+    'places': ('google_geocode', 'google_text_search', 'google_details'),
+    'scraping': ('pages',),
+    'sheets': ('sheets',),
+}
+# En modo secuencial no hay objetos Stage: cada etapa va del evento de inicio al de fin
+SEQUENTIAL_STAGE_EVENTS = {
+    'places': ('places_searching', 'places_found'),
+    'scraping': ('places_found', 'scraping_complete'),
+    'sheets': ('sheets_start', 'sheets_complete'),
+}
+# Columnas que cambian entre corridas aunque el resultado sea el mismo
+VOLATILE_COLUMNS = ('extraction_date',)
+# Cassette de ejemplo: ciudad y sitios chicos para poder versionarlo (sin las páginas 'huge' de 2 MB)
+FIXTURE_CASSETTE = os.path.join(CASSETTES_DIR, 'fixture_cotillon.json')
+FIXTURE_BUSINESSES = 80
+FIXTURE_SITES = 18
+FIXTURE_SITE_KINDS = tuple(kind for kind in FIXTURE_KINDS if kind != 'huge')
+FIXTURE_LOCATION = 'Ciudad sintética'
+
+def result_fingerprint(df):
+    """Hash del DataFrame final (sin columnas volátiles), para comparar resultados entre corridas"""
+    if df is None:
+        return None
+    stable = df.drop(columns=[c for c in VOLATILE_COLUMNS if c in df.columns])
+    return hashlib.sha1(stable.to_csv(index=False).encode('utf-8')).hexdigest()[:16]
+
+def _run_once(cassette_path, pipelined, real_delays, conn):
+    """Una corrida completa en un proceso aparte (así el pico de RSS es por corrida)"""
+    os.chdir(tempfile.mkdtemp(prefix='pipeline_bench_'))
+    import main_orchestrator
+    from lead_pipeline import Pipeline
+
+    pipelines = []
+
+    class RecordingPipeline(Pipeline):
+        """Pipeline que queda registrado para leer las métricas de sus etapas al terminar"""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            pipelines.append(self)
+
+    main_orchestrator.Pipeline = RecordingPipeline
+    cassette = Cassette(cassette_path, mode='replay')
+    # Misma base de la API que al grabar (las URLs del cassette la incluyen)
+    app_config.configure(google_places_api_key='cassette', google_api_base_url=cassette.meta.get('api_base_url'))
+    if not real_delays:
+        google_places_fetcher.DEFAULT_REQUEST_DELAY = 0
+        google_places_fetcher.PAGE_TOKEN_DELAY = 0
+        app_config.configure(limits_google_api_qps=1_000_000)
+
+    events = {}
+
+    def progress_callback(step, message, data=None):
+        events.setdefault(step, [time.time(), None])[1] = time.time()
+
+    usage_before = (resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN))
+    started = time.time()
+    with cassette.install():
+        result_df, message = main_orchestrator.main(
+            query=cassette.meta.get('query', ''),
+            location=cassette.meta.get('location', ''),
+            max_results=cassette.meta.get('max_results'),
+            progress_callback=progress_callback,
+            pipelined=pipelined,
+            use_cache=False,
+        )
+    wall = time.time() - started
+    usage_after = (resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN))
+    cpu_seconds = sum((after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+                      for before, after in zip(usage_before, usage_after))
+
+    if pipelines:
+        stages = {stage.name: stage.summary() for stage in pipelines[-1].stages}
+    else:
+        stages = {}
+        for name, (start_event, end_event) in SEQUENTIAL_STAGE_EVENTS.items():
+            if start_event in events and end_event in events:
+                elapsed = events[end_event][1] - events[start_event][0]
+                stages[name] = {'elapsed_seconds': round(elapsed, 2)}
+    for name, kinds in STAGE_CALLS.items():
+        stages.setdefault(name, {})['calls'] = sum(cassette.calls[kind] for kind in kinds)
+
+    conn.send({
+        'wall_seconds': round(wall, 3),
+        'cpu_seconds': round(cpu_seconds, 3),
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'stages': stages,
+        'calls': dict(cassette.calls),
+        'cassette_misses': dict(cassette.misses),
+        'rows': 0 if result_df is None else len(result_df),
+        'emails': main_orchestrator.count_emails(result_df),
+        'fingerprint': result_fingerprint(result_df),
+        'ok': result_df is not None,
+        'message': message.splitlines()[0] if message else '',
+    })
+    conn.close()
+
+def run_benchmark(cassette_path, repeat=3, pipelined=True, real_delays=False):
+    """Corre el flujo contra el cassette repeat veces y devuelve el reporte"""
+    cassette_path = os.path.abspath(cassette_path)
+    meta = Cassette(cassette_path, mode='replay').meta
+    logger.info(f"🎞️ Cassette {cassette_path}: '{meta.get('query')}' en '{meta.get('location')}'")
+    report = {
+        'benchmark': 'pipeline',
+        'environment': _environment(),
+        'cassette': os.path.basename(cassette_path),
+        'query': meta.get('query'),
+        'location': meta.get('location'),
+        'pipelined': pipelined,
+        'real_delays': real_delays,
+        'runs': [],
+    }
+    for i in range(1, repeat + 1):
+        parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(target=_run_once, args=(cassette_path, pipelined, real_delays, child_conn))
+        process.start()
+        run = parent_conn.recv()
+        process.join()
+        report['runs'].append(run)
+        stage_text = " | ".join(
+            f"{name} {s.get('busy_seconds', s.get('elapsed_seconds', 0))}s/{s['calls']} llamadas"
+            for name, s in run['stages'].items()
+        )
+        logger.info(
+            f"   Corrida {i}: {run['wall_seconds']}s total, {run['cpu_seconds']}s CPU, RSS {run['peak_rss_mb']} MB | "
+            f"{stage_text} | {run['rows']} filas, {run['emails']} emails ({run['fingerprint']})"
+        )
+        if run['cassette_misses']:
+            logger.warning(f"⚠️ Llamadas fuera del cassette: {run['cassette_misses']}")
+
+    report['summary'] = summarize(report['runs'])
+    fingerprints = {run['fingerprint'] for run in report['runs']}
+    if len(fingerprints) > 1:
+        logger.warning(f"⚠️ Las corridas dieron resultados distintos: {fingerprints}")
+    s = report['summary']
+    logger.info(f"📊 Mediana: {s['wall_seconds']}s total, {s['cpu_seconds']}s CPU, RSS {s['peak_rss_mb']} MB")
+    return report
+
+def summarize(runs):
+    """Medianas de las métricas principales y de cada etapa"""
+    summary = {metric: round(statistics.median(run[metric] for run in runs), 3)
+               for metric in ('wall_seconds', 'cpu_seconds', 'peak_rss_mb')}
+    summary['stages'] = {}
+    for name in runs[0]['stages']:
+        values = [run['stages'][name] for run in runs if name in run['stages']]
+        summary['stages'][name] = {
+            key: round(statistics.median(v[key] for v in values), 3)
+            for key in values[0] if all(key in v for v in values)
+        }
+    summary['fingerprint'] = runs[-1]['fingerprint']
+    return summary
+
+def record(query, location, cassette_path, max_results=None, real_sheets=False):
+    """Corre una búsqueda real grabando todas las respuestas externas en el cassette"""
+    import main_orchestrator
+    from google_places_fetcher import DEFAULT_API_BASE_URL
+
+    cassette = Cassette(os.path.abspath(cassette_path), mode='record', real_sheets=real_sheets)
+    cassette.meta = {'query': query, 'location': location, 'max_results': max_results,
+                     'api_base_url': app_config.get_setting('google', 'api_base_url', DEFAULT_API_BASE_URL),
+                     'sheets': 'real' if real_sheets else 'memory',
+                     'recorded_at': datetime.now().isoformat(timespec='seconds')}
+    # Carpeta temporal: con el cache de scraping de la carpeta actual no se grabarían las páginas
+    previous_dir = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix='pipeline_record_'))
+    try:
+        with cassette.install():
+            result_df, message = main_orchestrator.main(query=query, location=location, max_results=max_results,
+                                                        use_cache=False)
+    finally:
+        os.chdir(previous_dir)
+    logger.info(f"📼 Grabadas {sum(cassette.calls.values())} llamadas: {dict(cassette.calls)}")
+    logger.info(f"📊 Resultado: {message.splitlines()[0] if message else ''} ({result_fingerprint(result_df)})")
+
+def record_fixture(cassette_path=FIXTURE_CASSETTE, num_businesses=FIXTURE_BUSINESSES, num_sites=FIXTURE_SITES,
+                   seed=42):
+    """Graba el cassette de ejemplo sin red externa: Places de fake_places_api.py y los sitios de prueba"""
+    query = DEFAULT_CATEGORIES[0]
+    city = SyntheticCity(num_businesses, 'clustered', seed=seed)
+    fixtures = FixtureServer(num_sites).start()
+    sites = [site for site in fixtures.sites if site.kind in FIXTURE_SITE_KINDS]
+    # Los negocios del rubro con sitio web apuntan a los sitios de prueba, en orden
+    for i, business in enumerate(b for b in city.matching(query) if b['website']):
+        business['website'] = fixtures.url_for(sites[i % len(sites)])
+    server = FakePlacesServer(city, page_token_delay=BENCHMARK_PAGE_TOKEN_DELAY).start()
+    google_places_fetcher.DEFAULT_REQUEST_DELAY = 0
+    google_places_fetcher.PAGE_TOKEN_DELAY = BENCHMARK_PAGE_TOKEN_DELAY
+    app_config.configure(google_places_api_key='fixture', google_api_base_url=server.base_url)
+    try:
+        record(query, FIXTURE_LOCATION, cassette_path)
+    finally:
+        server.stop()
+        fixtures.stop()
+
+def save_report(report, output_dir=RESULTS_DIR):
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"pipeline_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    logger.info(f"💾 Resultados guardados en {path}")
+    return path
+
+def compare_reports(previous, current):
+    """Muestra la variación de cada métrica (total y por etapa) contra una corrida anterior"""
+    before, after = previous['summary'], current['summary']
+    changes = []
+    for metric in ('wall_seconds', 'cpu_seconds', 'peak_rss_mb'):
+        old, new = before.get(metric), after.get(metric)
+        if old:
+            changes.append(f"{metric} {old} → {new} ({(new - old) / old:+.0%})")
+    logger.info("📊 Total: " + " | ".join(changes))
+    for name, stage in after['stages'].items():
+        old_stage = before.get('stages', {}).get(name, {})
+        stage_changes = [f"{key} {old_stage[key]} → {value}" for key, value in stage.items()
+                         if key in old_stage and old_stage[key] != value]
+        if stage_changes:
+            logger.info(f"📊 Etapa {name}: " + " | ".join(stage_changes))
+    if before.get('fingerprint') != after.get('fingerprint'):
+        logger.warning(f"⚠️ El resultado cambió: {before.get('fingerprint')} → {after.get('fingerprint')}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline del flujo completo contra respuestas grabadas")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser('record', help="Grabar una búsqueda real en un cassette")
+    record_parser.add_argument('--query', required=True, help="Tipo de negocio a buscar")
+    record_parser.add_argument('--location', required=True, help="Ubicación geográfica")
+    record_parser.add_argument('--max-results', type=int, default=None, help="Límite de resultados")
+    record_parser.add_argument('--cassette', help=f"Archivo del cassette (por defecto en {CASSETTES_DIR})")
+    record_parser.add_argument('--real-sheets', action='store_true',
+                               help="Partir del contenido de la hoja real (requiere credenciales; las filas no se suben)")
+
+    fixture_parser = subparsers.add_parser('fixture', help="Grabar el cassette de ejemplo sin red externa")
+    fixture_parser.add_argument('--cassette', default=FIXTURE_CASSETTE, help="Archivo del cassette")
+    fixture_parser.add_argument('--businesses', type=int, default=FIXTURE_BUSINESSES,
+                                help="Negocios de la ciudad sintética")
+    fixture_parser.add_argument('--sites', type=int, default=FIXTURE_SITES, help="Sitios web de prueba")
+    fixture_parser.add_argument('--seed', type=int, default=42, help="Semilla de la ciudad")
+
+    run_parser = subparsers.add_parser('run', help="Correr el flujo offline contra un cassette")
+    run_parser.add_argument('--cassette', default=FIXTURE_CASSETTE, help="Archivo del cassette")
+    run_parser.add_argument('--repeat', type=int, default=3, help="Corridas (se reporta la mediana)")
+    run_parser.add_argument('--sequential', action='store_true', help="Flujo secuencial en lugar del pipeline")
+    run_parser.add_argument('--real-delays', action='store_true', help="Mantener las pausas fijas y el límite de QPS")
+    run_parser.add_argument('--output', default=RESULTS_DIR, help="Carpeta donde guardar el JSON de resultados")
+    run_parser.add_argument('--compare', help="JSON de una corrida anterior para comparar")
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        cassette = args.cassette or os.path.join(
+            CASSETTES_DIR, f"{args.query}_{args.location}".lower().replace(' ', '_').replace(',', '') + '.json')
+        record(args.query, args.location, cassette, args.max_results, args.real_sheets)
+        return
+    if args.command == 'fixture':
+        record_fixture(args.cassette, args.businesses, args.sites, args.seed)
+        return
+
+    report = run_benchmark(args.cassette, args.repeat, not args.sequential, args.real_delays)
+    save_report(report, args.output)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare_reports(json.load(f), report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+🗺️ Places Benchmark - Cobertura vs. llamadas de las estrategias de búsqueda
+
+Levanta fake_places_api.py con una ciudad sintética (se conoce el total de
+negocios de cada rubro) y corre GooglePlacesFetcher.iter_places_grid con varias
+estrategias de grilla. Para cada una reporta:
+
+- Cobertura: negocios encontrados sobre el total del rubro en la ciudad.
+- Llamadas por endpoint y cuántas Text Search hicieron falta para llegar al
+  50/80/90/95% de cobertura (la curva completa queda en el JSON).
+- Throughput (lugares/s y requests/s) y las respuestas OVER_QUERY_LIMIT e
+  INVALID_REQUEST que devolvió el servidor.
+
+Las pausas del fetcher se reemplazan por las del servidor de prueba (la
+activación del next_page_token es configurable) para que una corrida a escala
+dure minutos y no horas; los resultados se guardan en JSON para comparar.
+
+Uso:
+    python places_benchmark.py --businesses 5000 --distributions uniform,clustered
+    python places_benchmark.py --strategies grilla_6x6_recursiva --client-qps 80 --qps 50
+    python places_benchmark.py --compare benchmark_results/places_20250101_120000.json
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime
+import logging
+
+import google_places_fetcher
+from admission_control import FairRateLimiter
+from fake_places_api import (SyntheticCity, FakePlacesServer, DISTRIBUTIONS, DEFAULT_CATEGORIES,
+                             DEFAULT_RADIUS_METERS)
+from google_places_fetcher import GooglePlacesFetcher
+from scraper_benchmark import RESULTS_DIR, _environment
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Parámetros de iter_places_grid de cada estrategia (grilla_6x6_recursiva es la que usa el orquestador)
+STRATEGIES = {
+    'grilla_3x3': {'grid_size': 3, 'radius': 3000, 'max_recursion': 0},
+    'grilla_6x6_recursiva': {'grid_size': 6, 'radius': 3000, 'max_recursion': 2},
+    'grilla_10x10': {'grid_size': 10, 'radius': 1500, 'max_recursion': 0},
+    'grilla_4x4_recursiva_profunda': {'grid_size': 4, 'radius': 4000, 'max_recursion': 4},
+}
+COVERAGE_MILESTONES = (0.5, 0.8, 0.9, 0.95)
+BENCHMARK_PAGE_TOKEN_DELAY = 0.2
+ENDPOINT_NAMES = {
+    '/geocode/json': 'geocode',
+    '/place/textsearch/json': 'text_search',
+    '/place/details/json': 'details',
+}
+
+class MeasuredFetcher(GooglePlacesFetcher):
+    """Fetcher que anota la curva de cobertura (lugares únicos por Text Search hecha)"""
+
+    def __init__(self, *args, fetch_details=True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fetch_details = fetch_details
+        self.text_searches = 0
+        self.curve = []
+
+    def search_places_from_point(self, *args, **kwargs):
+        result = super().search_places_from_point(*args, **kwargs)
+        self.curve.append((self.text_searches, len(self._seen_place_ids)))
+        return result
+
+    def _api_get(self, url, params):
+        if url == self.text_search_url:
+            self.text_searches += 1
+        return super()._api_get(url, params)
+
+    def get_place_details(self, place_id):
+        if not self.fetch_details:
+            return {'name': place_id}
+        return super().get_place_details(place_id)
+
+def calls_to_reach(curve, total, share):
+    """Text Search necesarias para llegar a la cobertura pedida (None si no se llegó)"""
+    return next((calls for calls, found in curve if total and found / total >= share), None)
+
+def run_strategy(server, query, name, params, client_qps, fetch_details=True):
+    """Corre una estrategia contra el servidor y devuelve sus métricas"""
+    server.reset_stats()
+    total = len(server.city.matching(query))
+    fetcher = MeasuredFetcher(api_key='benchmark', delay=0, rate_limiter=FairRateLimiter(client_qps),
+                              base_url=server.base_url, fetch_details=fetch_details)
+    started = time.time()
+    found = {place['place_id'] for place in fetcher.iter_places_grid(query, 'Ciudad sintética', **params)}
+    elapsed = time.time() - started
+
+    requests_made = Counter({ENDPOINT_NAMES.get(k, k): v for k, v in server.stats.items()})
+    total_requests = sum(requests_made[endpoint] for endpoint in ENDPOINT_NAMES.values())
+    result = {
+        'strategy': name,
+        'params': params,
+        'found': len(found),
+        'total': total,
+        'coverage': round(len(found) / total, 4) if total else 0.0,
+        'requests': dict(requests_made),
+        'text_search_calls': fetcher.text_searches,
+        'calls_to_coverage': {f"{share:.0%}": calls_to_reach(fetcher.curve, total, share)
+                              for share in COVERAGE_MILESTONES},
+        'elapsed_seconds': round(elapsed, 2),
+        'places_per_second': round(len(found) / elapsed, 2) if elapsed else 0.0,
+        'requests_per_second': round(total_requests / elapsed, 2) if elapsed else 0.0,
+        'curve': fetcher.curve,
+    }
+    milestones = ", ".join(f"{share} en {calls}" for share, calls in result['calls_to_coverage'].items()
+                           if calls is not None)
+    logger.info(
+        f"   {name}: {result['found']}/{total} ({result['coverage']:.0%}) con {fetcher.text_searches} Text Search "
+        f"[{milestones or 'sin hitos'}] | {result['places_per_second']} lugares/s, "
+        f"{result['requests_per_second']} req/s | OVER_QUERY_LIMIT {requests_made['OVER_QUERY_LIMIT']}, "
+        f"INVALID_REQUEST {requests_made['INVALID_REQUEST']}"
+    )
+    return result
+
+def run_benchmark(num_businesses=2000, distributions=('uniform', 'clustered'), strategies=None,
+                  query=DEFAULT_CATEGORIES[0], qps=50, client_qps=None, page_token_delay=BENCHMARK_PAGE_TOKEN_DELAY,
+                  fetch_details=True, seed=42):
+    """Corre cada estrategia en cada distribución de negocios y devuelve el reporte"""
+    strategies = strategies or list(STRATEGIES)
+    client_qps = client_qps or qps
+    # El fetcher espera lo mismo que tarda el servidor en activar el token
+    google_places_fetcher.PAGE_TOKEN_DELAY = page_token_delay
+    report = {
+        'benchmark': 'places',
+        'environment': _environment(),
+        'businesses': num_businesses,
+        'query': query,
+        'server_qps': qps,
+        'client_qps': client_qps,
+        'page_token_delay': page_token_delay,
+        'fetch_details': fetch_details,
+        'distributions': [],
+    }
+    for distribution in distributions:
+        city = SyntheticCity(num_businesses, distribution, seed=seed, radius_meters=DEFAULT_RADIUS_METERS)
+        server = FakePlacesServer(city, qps=qps, page_token_delay=page_token_delay).start()
+        logger.info(f"🗺️ Distribución '{distribution}': {len(city.matching(query))} negocios de '{query}'")
+        try:
+            results = [run_strategy(server, query, name, STRATEGIES[name], client_qps, fetch_details)
+                       for name in strategies]
+        finally:
+            server.stop()
+        report['distributions'].append({'distribution': distribution, 'strategies': results})
+    return report
+
+def save_report(report, output_dir=RESULTS_DIR):
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"places_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    logger.info(f"💾 Resultados guardados en {path}")
+    return path
+
+def compare_reports(previous, current):
+    """Muestra la variación de cobertura, llamadas y throughput contra una corrida anterior"""
+    metrics = ['coverage', 'text_search_calls', 'places_per_second', 'requests_per_second']
+    previous_results = {(d['distribution'], s['strategy']): s
+                        for d in previous.get('distributions', []) for s in d['strategies']}
+    for distribution in current['distributions']:
+        for result in distribution['strategies']:
+            before = previous_results.get((distribution['distribution'], result['strategy']))
+            if not before:
+                continue
+            changes = []
+            for metric in metrics:
+                old, new = before.get(metric), result.get(metric)
+                if old:
+                    changes.append(f"{metric} {old} → {new} ({(new - old) / old:+.0%})")
+            logger.info(f"📊 {distribution['distribution']}/{result['strategy']}: " + " | ".join(changes))
+
+def main():
+    parser = argparse.ArgumentParser(description="Cobertura vs. llamadas de las estrategias de búsqueda de Places")
+    parser.add_argument('--businesses', type=int, default=2000, help="Negocios de la ciudad sintética")
+    parser.add_argument('--distributions', default='uniform,clustered',
+                        help=f"Distribuciones separadas por coma ({', '.join(DISTRIBUTIONS)})")
+    parser.add_argument('--strategies', default=','.join(STRATEGIES),
+                        help=f"Estrategias separadas por coma ({', '.join(STRATEGIES)})")
+    parser.add_argument('--query', default=DEFAULT_CATEGORIES[0], help="Rubro a buscar")
+    parser.add_argument('--qps', type=float, default=50, help="Límite del servidor antes de OVER_QUERY_LIMIT")
+    parser.add_argument('--client-qps', type=float, default=None, help="Presupuesto del fetcher (por defecto = --qps)")
+    parser.add_argument('--page-token-delay', type=float, default=BENCHMARK_PAGE_TOKEN_DELAY,
+                        help="Segundos hasta que un next_page_token es válido")
+    parser.add_argument('--no-details', action='store_true', help="No pedir Details (solo mide la búsqueda)")
+    parser.add_argument('--seed', type=int, default=42, help="Semilla de la ciudad")
+    parser.add_argument('--output', default=RESULTS_DIR, help="Carpeta donde guardar el JSON de resultados")
+    parser.add_argument('--compare', help="JSON de una corrida anterior para comparar")
+    args = parser.parse_args()
+
+    distributions = [d.strip() for d in args.distributions.split(',') if d.strip()]
+    strategies = [s.strip() for s in args.strategies.split(',') if s.strip()]
+    unknown = [s for s in strategies if s not in STRATEGIES]
+    if unknown:
+        parser.error(f"Estrategias desconocidas: {', '.join(unknown)}")
+
+    report = run_benchmark(args.businesses, distributions, strategies, args.query, args.qps, args.client_qps,
+                           args.page_token_delay, not args.no_details, args.seed)
+    save_report(report, args.output)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare_reports(json.load(f), report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Scrape Cache - Cache persistente de resultados de scraping
+
+Responsabilidad: Guardar por sitio (website_scraper.site_key: host sin 'www.'
+más la ruta canónica) los emails, redes sociales y metadatos de descarga
+obtenidos por WebsiteScraper, para no volver a visitar un sitio procesado
+recientemente en otra búsqueda. La clave incluye la ruta para que negocios
+distintos en un host compartido (sites.google.com/view/..., linktr.ee/...)
+no reciban el resultado de otro. También guarda por URL los validadores HTTP
+(ETag/Last-Modified) y el hash del contenido, para revalidar páginas con
+requests condicionales cuando el resultado del sitio vence.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import logging
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Los validadores se usan justo cuando vence el resultado del sitio: se guardan un TTL más
+VALIDATOR_TTL_FACTOR = 2
+
+class ScrapeCache:
+    """Cache en SQLite de resultados por sitio con vencimiento (TTL)"""
+
+    def __init__(self, db_path="scrape_cache.db", ttl_hours=72):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_hours * 3600
+        # Una sola conexión compartida por los threads del scraper, serializada con un lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(site_results)")]
+        if 'domain' in columns:
+            # Caches anteriores estaban indexadas solo por host y pueden tener resultados de
+            # otro negocio del mismo host: se descartan (se vuelven a scrapear)
+            self._conn.execute("DROP TABLE site_results")
+            logger.info("🧹 Cache de scraping por dominio descartada: ahora se indexa por sitio (host + ruta)")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS site_results (
+                site TEXT PRIMARY KEY,
+                emails TEXT NOT NULL,
+                social_media TEXT NOT NULL,
+                meta TEXT NOT NULL,
+                scraped_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS page_validators (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT NOT NULL,
+                extraction TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+        self.purge_expired()
+
+    def get(self, site):
+        """Devuelve el resultado guardado para el sitio o None si no existe o venció"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT emails, social_media, meta, scraped_at FROM site_results WHERE site = ?",
+                (site,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        emails, social_media, meta, scraped_at = row
+        age = time.time() - scraped_at
+        if age > self.ttl_seconds:
+            return None
+
+        meta = json.loads(meta)
+        meta['cache_age'] = age
+        return {'emails': json.loads(emails), 'social_media': json.loads(social_media), 'meta': meta}
+
+    def set(self, site, result):
+        """Guarda (o reemplaza) el resultado de scraping de un sitio"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO site_results (site, emails, social_media, meta, scraped_at) VALUES (?, ?, ?, ?, ?)",
+                (
+                    site,
+                    json.dumps(result.get('emails', [])),
+                    json.dumps(result.get('social_media', [])),
+                    json.dumps(result.get('meta', {})),
+                    time.time()
+                )
+            )
+            self._conn.commit()
+
+    def get_page(self, url):
+        """Devuelve validadores, hash y extracción guardados para una URL (sin TTL: se revalidan)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, content_hash, extraction FROM page_validators WHERE url = ?",
+                (url,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        etag, last_modified, content_hash, extraction = row
+        return {
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_hash': content_hash,
+            'extraction': json.loads(extraction)
+        }
+
+    def set_page(self, url, etag, last_modified, content_hash, extraction):
+        """Guarda los validadores HTTP y la extracción de una página descargada"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO page_validators (url, etag, last_modified, content_hash, extraction, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, content_hash, json.dumps(extraction), time.time())
+            )
+            self._conn.commit()
+
+    def touch_page(self, url):
+        """Marca como recién validada una página que respondió 304 (no la alcanza la purga)"""
+        with self._lock:
+            self._conn.execute("UPDATE page_validators SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def purge_expired(self):
+        """
+        Elimina los resultados vencidos y los validadores de páginas que no se visitan hace
+        VALIDATOR_TTL_FACTOR TTLs; devuelve cuántas filas se borraron. Se llama al abrir la cache.
+        """
+        now = time.time()
+        with self._lock:
+            results = self._conn.execute(
+                "DELETE FROM site_results WHERE scraped_at < ?",
+                (now - self.ttl_seconds,)
+            ).rowcount
+            validators = self._conn.execute(
+                "DELETE FROM page_validators WHERE fetched_at < ?",
+                (now - self.ttl_seconds * VALIDATOR_TTL_FACTOR,)
+            ).rowcount
+            self._conn.commit()
+        if results or validators:
+            logger.info(f"🧹 Cache de scraping: {results} resultados y {validators} validadores vencidos eliminados")
+        return results + validators
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
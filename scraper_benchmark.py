@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+📏 Scraper Benchmark - Mide el rendimiento del scraper sin salir a internet
+
+Levanta un servidor HTTP local con sitios de prueba que imitan negocios reales
+(respuestas lentas, páginas enormes, cadenas de redirects, páginas sin charset,
+links mailto, JSON-LD, páginas de contacto, puertos muertos y negocios distintos
+en un mismo host, como sites.google.com/view/...), corre
+WebsiteScraper.run_scraping_process_from_dataframe con varios niveles de
+concurrencia y reporta sitios/seg, p50/p95 por sitio, CPU por página, pico de
+memoria (RSS) y precisión de la extracción. Los resultados se guardan en JSON
+para comparar corridas.
+
+Cada sitio de prueba usa su propia IP de loopback (127.0.x.y) para que el
+scraper los trate como dominios distintos; los 'shared' comparten una IP y se
+distinguen por la ruta (sus resultados no deben mezclarse). En Linux todo 127.0.0.0/8 apunta a
+la interfaz local; en macOS hay que agregar los alias (ifconfig lo0 alias ...).
+
+Uso:
+    python scraper_benchmark.py --sites 48 --levels 1,5,10
+    python scraper_benchmark.py --compare benchmark_results/scraper_20250101_120000.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+import logging
+import multiprocessing
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = "benchmark_results"
+# Tipos de sitio de prueba; los sitios se reparten en este orden
+FIXTURE_KINDS = ['mailto', 'contact', 'jsonld', 'nocharset', 'redirect', 'slow', 'huge', 'dead', 'shared']
+# Host común de los sitios 'shared' (como sites.google.com/view/...): cada negocio es una ruta distinta
+SHARED_HOST = '127.0.255.2'
+SLOW_DELAY = 0.4
+HUGE_PAGE_BYTES = 2 * 1024 * 1024
+REDIRECT_HOPS = 3
+
+def site_address(index):
+    """IP de loopback del sitio i (evita 127.0.0.1, que queda para el propio servidor)"""
+    return f"127.0.{index // 250}.{index % 250 + 2}"
+
+def _html(body, head=''):
+    return f"<!DOCTYPE html><html><head>{head}<title>Negocio</title></head><body>{body}</body></html>"
+
+class FixtureSite:
+    """Un sitio de prueba: sus páginas y el resultado que debería extraer el scraper"""
+
+    def __init__(self, index, kind):
+        self.index = index
+        self.kind = kind
+        slug = f"negocio{index}"
+        self.host = SHARED_HOST if kind == 'shared' else site_address(index)
+        self.home_path = f"/view/{slug}" if kind == 'shared' else '/'
+        self.name = f"Negocio {index} ({kind})"
+        self.email = f"ventas@{slug}.com.ar"
+        self.facebook = f"https://facebook.com/{slug}"
+        self.instagram = f"https://instagram.com/{slug}"
+        self.pages = {}
+        self.expected_emails = [self.email]
+        self.expected_social = [f"facebook:{self.facebook}"]
+
+        home_mailto = _html(
+            f'<h1>{self.name}</h1><p>Escribinos a <a href="mailto:{self.email}">{self.email}</a></p>'
+            f'<a href="{self.facebook}">Facebook</a>'
+        )
+        if kind in ('mailto', 'slow'):
+            self.pages['/'] = home_mailto
+        elif kind == 'contact':
+            self.pages['/'] = _html(
+                f'<h1>{self.name}</h1><a href="/productos">Productos</a>'
+                f'<a href="/contacto">Contacto</a><a href="{self.facebook}">Facebook</a>'
+            )
+            self.pages['/productos'] = _html('<p>Catálogo</p>')
+            self.pages['/contacto'] = _html(f'<p>Mail: <a href="mailto:{self.email}">{self.email}</a></p>')
+        elif kind == 'jsonld':
+            data = {"@context": "https://schema.org", "@type": "LocalBusiness", "name": self.name,
+                    "email": self.email, "sameAs": [self.instagram]}
+            self.pages['/'] = _html(f'<h1>{self.name}</h1><a href="/contacto">Contacto</a>',
+                                    head=f'<script type="application/ld+json">{json.dumps(data)}</script>')
+            self.pages['/contacto'] = _html('<p>Formulario de contacto</p>')
+            self.expected_social = [f"instagram:{self.instagram}"]
+        elif kind == 'nocharset':
+            # Latin-1 sin charset en el header ni en un <meta>: obliga a detectar el encoding
+            self.pages['/'] = (
+                f'<html><body><h1>Artículos de cotillón y decoración</h1><p>Dirección: Avenida Corrientes, '
+                f'atención al público. Contacto: {self.email}</p><a href="{self.facebook}">Facebook</a>'
+                '</body></html>'
+            ).encode('latin-1')
+        elif kind == 'redirect':
+            for hop in range(REDIRECT_HOPS):
+                self.pages['/' if hop == 0 else f'/r/{hop}'] = ('redirect', f'/r/{hop + 1}' if hop + 1 < REDIRECT_HOPS else '/inicio')
+            self.pages['/inicio'] = home_mailto
+        elif kind == 'huge':
+            filler = '<p>' + 'Lorem ipsum dolor sit amet, productos de cotillón. ' * 20 + '</p>'
+            repeats = HUGE_PAGE_BYTES // len(filler) + 1
+            self.pages['/'] = _html(
+                f'<h1>{self.name}</h1>' + filler * repeats +
+                f'<footer><a href="mailto:{self.email}">{self.email}</a><a href="{self.facebook}">Facebook</a></footer>'
+            )
+        elif kind == 'dead':
+            self.expected_emails = []
+            self.expected_social = []
+        elif kind == 'shared':
+            # Cada negocio del host compartido tiene sus propios datos: no deben mezclarse entre filas
+            self.pages[self.home_path] = home_mailto
+
+class FixtureServer:
+    """Servidor HTTP local que sirve todos los sitios de prueba según la IP pedida"""
+
+    def __init__(self, num_sites=48):
+        self.sites = [FixtureSite(i, FIXTURE_KINDS[i % len(FIXTURE_KINDS)]) for i in range(num_sites)]
+        self._by_host = {}
+        for site in self.sites:
+            self._by_host.setdefault(site.host, []).append(site)
+        self._lock = threading.Lock()
+        self._timings = {}
+        self._httpd = None
+        self._thread = None
+        self.port = None
+        self.dead_port = None
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                started = time.time()
+                host = (self.headers.get('Host') or '').rsplit(':', 1)[0]
+                path = self.path.split('?', 1)[0]
+                site = server.site_for(host, path)
+                page = site.pages.get(path) if site else None
+
+                if site and site.kind == 'slow':
+                    time.sleep(SLOW_DELAY)
+                if page is None:
+                    self._send(404, b'<html><body>No encontrado</body></html>')
+                elif isinstance(page, tuple):
+                    self.send_response(302)
+                    self.send_header('Location', page[1])
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                elif isinstance(page, bytes):
+                    self._send(200, page, 'text/html')
+                else:
+                    self._send(200, page.encode('utf-8'), 'text/html; charset=utf-8')
+
+                if site:
+                    server._record(site.index, started, time.time())
+
+            def _send(self, status, body, content_type='text/html; charset=utf-8'):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        # Escucha en todas las interfaces para atender cualquier IP 127.0.x.y
+        self._httpd = ThreadingHTTPServer(('0.0.0.0', 0), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+        # Puerto sin nadie escuchando para los sitios muertos
+        probe = socket.socket()
+        probe.bind(('127.0.0.1', 0))
+        self.dead_port = probe.getsockname()[1]
+        probe.close()
+        logger.info(f"🧪 Servidor de fixtures en el puerto {self.port} con {len(self.sites)} sitios")
+        return self
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+    def url_for(self, site):
+        port = self.dead_port if site.kind == 'dead' else self.port
+        return f"http://{site.host}:{port}{site.home_path}"
+
+    def site_for(self, host, path):
+        """Sitio dueño de la página pedida (en el host compartido se distingue por la ruta)"""
+        sites = self._by_host.get(host, [])
+        return next((site for site in sites if path in site.pages), sites[0] if sites else None)
+
+    def dataframe(self):
+        """DataFrame con el formato que recibe run_scraping_process_from_dataframe"""
+        return pd.DataFrame({
+            'name': [site.name for site in self.sites],
+            'website': [self.url_for(site) for site in self.sites],
+        })
+
+    def _record(self, site_index, started, finished):
+        with self._lock:
+            first, last = self._timings.get(site_index, (started, finished))
+            self._timings[site_index] = (min(first, started), max(last, finished))
+
+    def reset_timings(self):
+        with self._lock:
+            self._timings.clear()
+
+    def site_latencies(self):
+        """Segundos entre el primer request y la última respuesta de cada sitio"""
+        with self._lock:
+            return [last - first for first, last in self._timings.values()]
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    low = int(k)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+def _split(cell):
+    return {v.strip() for v in str(cell or '').split(';') if v.strip()}
+
+def score_extraction(sites, result_df):
+    """Compara lo extraído contra lo esperado de cada sitio de prueba"""
+    totals = {'emails_expected': 0, 'emails_found': 0, 'emails_correct': 0,
+              'social_expected': 0, 'social_found': 0, 'social_correct': 0, 'sites_exact': 0}
+    misses = []
+    for site, (_, row) in zip(sites, result_df.iterrows()):
+        emails, social = _split(row.get('scraped_emails')), _split(row.get('social_media_links'))
+        expected_emails, expected_social = set(site.expected_emails), set(site.expected_social)
+        totals['emails_expected'] += len(expected_emails)
+        totals['emails_found'] += len(emails)
+        totals['emails_correct'] += len(emails & expected_emails)
+        totals['social_expected'] += len(expected_social)
+        totals['social_found'] += len(social)
+        totals['social_correct'] += len(social & expected_social)
+        if emails == expected_emails and social == expected_social:
+            totals['sites_exact'] += 1
+        else:
+            misses.append(site.kind)
+
+    def ratio(a, b):
+        return round(a / b, 4) if b else 1.0
+
+    return {
+        'email_recall': ratio(totals['emails_correct'], totals['emails_expected']),
+        'email_precision': ratio(totals['emails_correct'], totals['emails_found']),
+        'social_recall': ratio(totals['social_correct'], totals['social_expected']),
+        'social_precision': ratio(totals['social_correct'], totals['social_found']),
+        'sites_exact': ratio(totals['sites_exact'], len(sites)),
+        'missed_kinds': sorted(set(misses)),
+    }
+
+def _peak_rss_mb():
+    """Pico de RSS del proceso y sus hijos (ru_maxrss está en KB en Linux y en bytes en macOS)"""
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def _run_level(df, scraper_kwargs, time_budget, conn):
+    """Corre una pasada del scraper en un proceso aparte (así el pico de RSS es por nivel)"""
+    from website_scraper import WebsiteScraper
+
+    scraper = WebsiteScraper(cache_path=None, **scraper_kwargs)
+    cpu_before = os.times()
+    started = time.time()
+    result_df = scraper.run_scraping_process_from_dataframe(df, time_budget=time_budget)
+    wall = time.time() - started
+    cpu_after = os.times()
+    stats = scraper.get_stats()
+    parse_pool_used = bool(scraper.parse_workers)
+    scraper.close()
+
+    cpu_seconds = (cpu_after.user - cpu_before.user) + (cpu_after.system - cpu_before.system)
+    if parse_pool_used:
+        # El parseo en el pool de procesos no aparece en los tiempos de este proceso
+        cpu_seconds += stats.get('parse_cpu_seconds', 0)
+    conn.send({
+        'wall_seconds': wall,
+        'cpu_seconds': cpu_seconds,
+        'peak_rss_mb': _peak_rss_mb(),
+        'stats': stats,
+        'emails': result_df['scraped_emails'].tolist(),
+        'social': result_df['social_media_links'].tolist(),
+    })
+    conn.close()
+
+def run_benchmark(num_sites=48, levels=(1, 5, 10), parse_workers=None, time_budget=None, http_client='requests'):
+    """Corre el scraper contra los fixtures para cada nivel de concurrencia y devuelve el reporte"""
+    server = FixtureServer(num_sites).start()
+    df = server.dataframe()
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'environment': _environment(),
+        'config': {'sites': num_sites, 'levels': list(levels), 'parse_workers': parse_workers,
+                   'time_budget': time_budget, 'http_client': http_client, 'fixture_kinds': FIXTURE_KINDS},
+        'levels': [],
+    }
+    try:
+        for workers in levels:
+            logger.info(f"▶️ Nivel de concurrencia: {workers} workers")
+            server.reset_timings()
+            parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+            kwargs = {'max_workers': workers, 'parse_workers': parse_workers, 'http_client': http_client}
+            process = multiprocessing.Process(target=_run_level, args=(df, kwargs, time_budget, child_conn))
+            process.start()
+            raw = parent_conn.recv()
+            process.join()
+
+            result_df = df.assign(scraped_emails=raw['emails'], social_media_links=raw['social'])
+            latencies = server.site_latencies()
+            pages = raw['stats'].get('fetch_pages', 0)
+            level = {
+                'workers': workers,
+                'wall_seconds': round(raw['wall_seconds'], 3),
+                'sites_per_second': round(num_sites / raw['wall_seconds'], 2) if raw['wall_seconds'] else 0,
+                'site_p50_seconds': round(percentile(latencies, 50), 3),
+                'site_p95_seconds': round(percentile(latencies, 95), 3),
+                'pages_fetched': pages,
+                'connections_opened': raw['stats'].get('connections_opened', 0),
+                'wire_kb': round(raw['stats'].get('fetch_wire_bytes', 0) / 1024, 1),
+                'cpu_ms_per_page': round(raw['cpu_seconds'] * 1000 / pages, 2) if pages else 0,
+                'peak_rss_mb': round(raw['peak_rss_mb'], 1),
+                'accuracy': score_extraction(server.sites, result_df),
+            }
+            report['levels'].append(level)
+            logger.info(
+                f"   {level['sites_per_second']} sitios/s | p50 {level['site_p50_seconds']}s "
+                f"p95 {level['site_p95_seconds']}s | {level['cpu_ms_per_page']} ms CPU/página | "
+                f"RSS {level['peak_rss_mb']} MB | {level['connections_opened']} conexiones, "
+                f"{level['wire_kb']} KB en la red | recall emails {level['accuracy']['email_recall']:.0%}"
+            )
+    finally:
+        server.stop()
+    return report
+
+def _environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {'python': platform.python_version(), 'platform': platform.platform(),
+            'cpu_count': os.cpu_count(), 'git_commit': commit}
+
+def save_report(report, output_dir=RESULTS_DIR):
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"scraper_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    logger.info(f"💾 Resultados guardados en {path}")
+    return path
+
+def compare_reports(previous, current):
+    """Muestra la variación de cada métrica contra una corrida anterior, nivel por nivel"""
+    metrics = ['sites_per_second', 'site_p50_seconds', 'site_p95_seconds', 'cpu_ms_per_page', 'peak_rss_mb',
+               'connections_opened', 'wire_kb']
+    previous_levels = {level['workers']: level for level in previous.get('levels', [])}
+    for level in current['levels']:
+        before = previous_levels.get(level['workers'])
+        if not before:
+            continue
+        changes = []
+        for metric in metrics:
+            old, new = before.get(metric), level.get(metric)
+            if old:
+                changes.append(f"{metric} {old} → {new} ({(new - old) / old:+.0%})")
+        old_recall, new_recall = before['accuracy']['email_recall'], level['accuracy']['email_recall']
+        changes.append(f"email_recall {old_recall:.0%} → {new_recall:.0%}")
+        logger.info(f"📊 {level['workers']} workers: " + " | ".join(changes))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline del scraper contra un servidor local de fixtures")
+    parser.add_argument('--sites', type=int, default=48, help="Cantidad de sitios de prueba")
+    parser.add_argument('--levels', default='1,5,10', help="Niveles de concurrencia separados por coma")
+    parser.add_argument('--parse-workers', type=int, default=None, help="Procesos de parseo (0 = en los threads)")
+    parser.add_argument('--time-budget', type=float, default=None, help="Usar el crawler con frontier y este deadline")
+    parser.add_argument('--http-client', default='requests', choices=['requests', 'http2'],
+                        help="Cliente HTTP del scraper (http2 requiere httpx[http2])")
+    parser.add_argument('--output', default=RESULTS_DIR, help="Carpeta donde guardar el JSON de resultados")
+    parser.add_argument('--compare', help="JSON de una corrida anterior para comparar")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.levels.split(',') if level.strip()]
+    report = run_benchmark(args.sites, levels, args.parse_workers, args.time_budget, args.http_client)
+    save_report(report, args.output)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare_reports(json.load(f), report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Search Cache - Cache compartido de resultados de búsquedas completas
+
+Responsabilidad: Guardar el DataFrame final de cada búsqueda (query, ubicación
+y opciones) para que, si otra sesión repite la misma búsqueda dentro de la
+ventana de frescura, se devuelva el resultado guardado en lugar de volver a
+correr (y pagar) Places, scraping y Sheets. La clave se normaliza (mayúsculas,
+acentos, espacios y puntuación) para que "Cotillones" en "Once,  Buenos Aires"
+y "cotillones" en "once buenos aires" sean la misma búsqueda. También lleva la
+cuenta de aciertos y fallos para el dashboard.
+"""
+
+import hashlib
+import io
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import logging
+
+import pandas as pd
+
+import app_config
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_HOURS = 24
+DEFAULT_DB_PATH = "search_cache.db"
+# Puntuación y espacios que no cambian la búsqueda
+SEPARATORS_RE = re.compile(r'[\s,.;:\-_/]+')
+
+def normalize_text(text):
+    """Texto de búsqueda normalizado: minúsculas, sin acentos y con separadores unificados"""
+    text = unicodedata.normalize('NFKD', str(text or '')).encode('ascii', 'ignore').decode('ascii')
+    return SEPARATORS_RE.sub(' ', text.lower()).strip()
+
+def search_key(query, location, options=None):
+    """Clave del cache para una búsqueda y sus opciones (las None no cuentan)"""
+    options = {k: v for k, v in (options or {}).items() if v is not None}
+    raw = json.dumps([normalize_text(query), normalize_text(location), options], sort_keys=True)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def format_age(seconds):
+    """Antigüedad legible de un resultado ("5 min", "3 h")"""
+    if seconds < 3600:
+        return f"{max(1, int(seconds // 60))} min"
+    if seconds < 86400:
+        return f"{seconds / 3600:.0f} h"
+    return f"{seconds / 86400:.0f} días"
+
+class SearchCache:
+    """Cache en SQLite de resultados de búsquedas con ventana de frescura (TTL)"""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, ttl_hours=None):
+        self.db_path = db_path
+        if ttl_hours is None:
+            ttl_hours = float(app_config.get_setting('cache', 'search_ttl_hours', DEFAULT_TTL_HOURS))
+        self.ttl_seconds = ttl_hours * 3600
+        # Una sola conexión compartida por las sesiones y workers del proceso, serializada con un lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_results (
+                key TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                location TEXT NOT NULL,
+                options TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS lookups (
+                looked_up_at REAL NOT NULL,
+                hit INTEGER NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def lookup(self, query, location, options=None, record=True):
+        """
+        Resultado guardado y fresco para la búsqueda, o None.
+        Devuelve {'df', 'summary', 'age', 'created_at'}; record=False no suma a las estadísticas.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, result, created_at FROM search_results WHERE key = ? AND created_at >= ?",
+                (search_key(query, location, options), time.time() - self.ttl_seconds)
+            ).fetchone()
+        if record:
+            self.record_lookup(row is not None)
+        if row is None:
+            return None
+
+        summary, result, created_at = row
+        df = pd.read_json(io.StringIO(result), orient='split', dtype=False, convert_dates=False)
+        return {'df': df, 'summary': summary, 'age': time.time() - created_at, 'created_at': created_at}
+
+    def store(self, query, location, df, summary, options=None):
+        """Guarda (o reemplaza) el resultado de una búsqueda"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_results (key, query, location, options, summary, result, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    search_key(query, location, options),
+                    query,
+                    location,
+                    json.dumps(options or {}, sort_keys=True),
+                    summary,
+                    df.to_json(orient='split', index=False, force_ascii=False),
+                    time.time()
+                )
+            )
+            self._conn.commit()
+        logger.info(f"💾 Resultado de '{query}' en '{location}' guardado en el cache de búsquedas ({len(df)} registros)")
+
+    def record_lookup(self, hit):
+        with self._lock:
+            self._conn.execute("INSERT INTO lookups (looked_up_at, hit) VALUES (?, ?)", (time.time(), int(hit)))
+            self._conn.commit()
+
+    def get_stats(self, days=30):
+        """Aciertos, fallos y tasa de aciertos de los últimos días"""
+        with self._lock:
+            hits, total = self._conn.execute(
+                "SELECT COALESCE(SUM(hit), 0), COUNT(*) FROM lookups WHERE looked_up_at >= ?",
+                (time.time() - days * 86400,)
+            ).fetchone()
+            entries = self._conn.execute(
+                "SELECT COUNT(*) FROM search_results WHERE created_at >= ?",
+                (time.time() - self.ttl_seconds,)
+            ).fetchone()[0]
+        return {
+            'hits': hits,
+            'misses': total - hits,
+            'hit_rate': hits / total if total else 0.0,
+            'fresh_entries': entries,
+        }
+
+    def purge_expired(self):
+        """Elimina los resultados vencidos y devuelve cuántos se borraron"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM search_results WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# Instancias compartidas por el proceso (una conexión por archivo para todas las búsquedas y sesiones)
+_shared_caches = {}
+_shared_caches_lock = threading.Lock()
+
+def get_shared_cache(db_path=DEFAULT_DB_PATH):
+    """Cache de búsquedas del proceso para db_path (se abre la primera vez que se pide)"""
+    with _shared_caches_lock:
+        if db_path not in _shared_caches:
+            _shared_caches[db_path] = SearchCache(db_path)
+        return _shared_caches[db_path]
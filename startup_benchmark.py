@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+⏱️ Startup Benchmark - Costo de import de los puntos de entrada
+
+Importa cada módulo en un intérprete nuevo con `python -X importtime` y suma
+el tiempo acumulado de los imports de primer nivel. También informa qué
+dependencias pesadas (Streamlit, cliente de Google) quedaron cargadas, y mide
+esas dependencias por separado: es lo que cada proceso pagaba antes, cuando
+main_orchestrator y google_sheets_manager las importaban al cargarse.
+
+Uso:
+    python startup_benchmark.py
+    python startup_benchmark.py --modules main_orchestrator,leads_cli --repeat 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import logging
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODULES = ('leads_cli', 'app_config', 'google_sheets_manager', 'main_orchestrator')
+# Dependencias que los procesos headless ya no deberían cargar
+HEAVY_MODULES = ('streamlit', 'googleapiclient.discovery', 'google.oauth2.service_account')
+
+def measure_import(module, repeat=3):
+    """
+    Importa el módulo en intérpretes nuevos y devuelve (mediana en ms, módulos pesados cargados),
+    o (None, error) si el import falla.
+    """
+    check = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    loaded = ''
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', check],
+            capture_output=True, text=True, cwd=repo_dir,
+        )
+        if proc.returncode != 0:
+            return None, proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'error'
+        timings.append(_top_level_microseconds(proc.stderr) / 1000)
+        loaded = proc.stdout.strip()
+    return statistics.median(timings), loaded
+
+def _top_level_microseconds(importtime_output):
+    """Suma el tiempo acumulado de los imports de primer nivel de la salida de -X importtime"""
+    total = 0
+    for line in importtime_output.splitlines():
+        # Formato: "import time: self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|', 2)
+        if not cumulative.strip().isdigit():
+            continue
+        # Los de primer nivel llevan un solo espacio; los anidados, dos más por nivel
+        if name[1:2] == ' ':
+            continue
+        total += int(cumulative)
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de import de los módulos del proyecto")
+    parser.add_argument('--modules', default=','.join(DEFAULT_MODULES), help="Módulos separados por coma")
+    parser.add_argument('--repeat', type=int, default=3, help="Intérpretes por módulo (se reporta la mediana)")
+    args = parser.parse_args()
+
+    logger.info(f"⏱️ Midiendo imports con {sys.executable} ({args.repeat} corridas por módulo)")
+    for module in args.modules.split(','):
+        ms, loaded = measure_import(module, args.repeat)
+        if ms is None:
+            logger.warning(f"⚠️ {module}: no se pudo importar ({loaded})")
+            continue
+        heavy = f"carga {loaded}" if loaded else "sin Streamlit ni cliente de Google"
+        logger.info(f"📊 {module}: {ms:.0f} ms ({heavy})")
+
+    # Lo que cada proceso pagaba antes por importar estas dependencias al cargar los módulos
+    for module in HEAVY_MODULES:
+        ms, error = measure_import(module, args.repeat)
+        if ms is None:
+            logger.info(f"ℹ️ {module}: no instalado en este entorno")
+        else:
+            logger.info(f"📊 {module} (costo que ya no paga el proceso headless): {ms:.0f} ms")
+
+if __name__ == "__main__":
+    main()
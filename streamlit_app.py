@@ -11,8 +11,13 @@ from datetime import datetime
 import io
 
 # Importar nuestros módulos
-from main_orchestrator import main
 from google_sheets_manager import GoogleSheetsManager
+from job_queue import JobStore, JobRunner, ACTIVE_STATUSES, QUEUED, COMPLETED, CANCELLED
+from admission_control import max_concurrent_searches
+from search_cache import get_shared_cache, format_age
+
+# Cada cuánto la UI consulta el estado de la búsqueda en segundo plano
+JOB_POLL_SECONDS = 2
 
 # Configuración de la página
 st.set_page_config(
@@ -166,10 +171,41 @@ def initialize_session_state():
             'emails_found': 0,
             'sheets_uploaded': 0
         }
+    # Búsqueda en segundo plano que sigue esta sesión
+    if 'active_job_id' not in st.session_state:
+        st.session_state.active_job_id = None
+    # Búsqueda cuyo resultado se mostró desde el cache (para ofrecer actualizarla)
+    if 'cached_search' not in st.session_state:
+        st.session_state.cached_search = None
     # Estado de autenticación
     if 'authenticated' not in st.session_state:
         st.session_state.authenticated = False
 
+@st.cache_resource
+def get_job_store():
+    """Cola de búsquedas compartida por todas las sesiones del servidor"""
+    return JobStore()
+
+@st.cache_resource
+def get_search_cache():
+    """Cache de resultados de búsquedas compartido por todas las sesiones (y por main_orchestrator.main)"""
+    return get_shared_cache()
+
+@st.cache_resource
+def get_job_runner():
+    """Workers en threads del servidor: siguen corriendo entre reruns, refresh y reconexiones"""
+    return JobRunner(get_job_store(), workers=max_concurrent_searches()).start()
+
+def describe_queue_position(job):
+    """Texto con la posición en la cola y el inicio estimado de un job en espera"""
+    estimate = get_job_store().queue_estimates(get_job_runner().max_running).get(job['id'])
+    if estimate is None:
+        return "⏳ En cola"
+    position, start = estimate
+    minutes = max(0, round((start - time.time()) / 60))
+    start_text = datetime.fromtimestamp(start).strftime("%H:%M")
+    return f"⏳ En cola: posición {position}, inicio estimado {start_text} (~{minutes} min)"
+
 def create_header():
     """Crea el header principal de la aplicación"""
     st.markdown("""
@@ -274,6 +310,33 @@ def show_dashboard():
                     f"{avg_per_search:.0f}",
                     "registros encontrados"
                 )
+
+        # Búsquedas repetidas servidas desde el cache compartido
+        cache_stats = get_search_cache().get_stats()
+        if cache_stats['hits'] + cache_stats['misses'] > 0:
+            st.markdown("### ⚡ Cache de Búsquedas (últimos 30 días)")
+            cache_col1, cache_col2, cache_col3 = st.columns(3)
+
+            with cache_col1:
+                st.metric(
+                    "♻️ Tasa de Aciertos",
+                    f"{cache_stats['hit_rate'] * 100:.1f}%",
+                    f"{cache_stats['hits']} de {cache_stats['hits'] + cache_stats['misses']}"
+                )
+
+            with cache_col2:
+                st.metric(
+                    "💸 Búsquedas Evitadas",
+                    cache_stats['hits'],
+                    "sin costo de API"
+                )
+
+            with cache_col3:
+                st.metric(
+                    "🗄️ Resultados Guardados",
+                    cache_stats['fresh_entries'],
+                    "vigentes"
+                )
         
         # Sección de actividad reciente y búsquedas más realizadas
         if stats['recent_activity'] or stats['search_distribution']:
@@ -399,113 +462,114 @@ def show_progress_section():
     
     return main_progress, status_text, places_metric, scraped_metric, sheets_metric, details_text
 
-def execute_search(query, location, include_scraping, save_to_sheets):
-    """Ejecuta la búsqueda con indicadores de progreso mejorados en tiempo real"""
+def execute_search(query, location, include_scraping, save_to_sheets, refresh=False):
+    """
+    Muestra al instante el resultado guardado si la misma búsqueda es reciente; si no
+    (o con refresh=True) la encola para los workers en segundo plano como búsqueda activa.
+    """
+    if not refresh:
+        # Import diferido, como en job_queue: el orquestador se carga recién al buscar
+        from main_orchestrator import search_cache_options
+
+        cache = get_search_cache()
+        # El acierto se cuenta acá; el fallo lo cuenta main() al correr el job.
+        # Mismas opciones que usará el job (sin límite de resultados, presupuesto de la configuración)
+        cached = cache.lookup(query, location, search_cache_options(), record=False)
+        if cached is not None:
+            cache.record_lookup(True)
+            st.session_state.results_df = cached['df']
+            st.session_state.search_completed = True
+            st.session_state.cached_search = {
+                'query': query,
+                'location': location,
+                'created_at': cached['created_at']
+            }
+            return None
+
+    st.session_state.cached_search = None
+    job_id = get_job_store().submit(query, location, refresh=refresh)
+    get_job_runner().wake()
+    st.session_state.active_job_id = job_id
+    st.session_state.current_stats = {
+        'places_found': 0,
+        'emails_found': 0,
+        'sheets_uploaded': 0
+    }
+    return job_id
     
-    # Configurar progreso
+def show_job_progress(job):
+    """Muestra el progreso de una búsqueda en segundo plano según el estado guardado por el worker"""
     main_progress, status_text, places_metric, scraped_metric, sheets_metric, details_text = show_progress_section()
-    
-    try:
-        # Inicializar estadísticas
-        st.session_state.current_stats = {
-            'places_found': 0,
-            'emails_found': 0,
-            'sheets_uploaded': 0
-        }
-        
-        # Crear callback mejorado para actualizar progreso
-        def update_progress_callback(step, message, count=None):
-            if step == "places_searching":
-                main_progress.progress(5)
-                status_text.text(f"🔍 {message}")
-                places_metric.metric("📍 Lugares Encontrados", "0", delta="Iniciando...")
-                details_text.info(f"🔍 **Google Places**: {message}")
+    stats = job['stats']
+    st.session_state.current_stats = stats
+    
+    main_progress.progress(min(job['progress'], 100))
+    if job['status'] == QUEUED:
+        status_text.text(describe_queue_position(job))
+    elif job['cancel_requested']:
+        status_text.text("⛔ Cancelando búsqueda...")
+    else:
+        status_text.text(f"🔄 {job['message'] or 'Procesando...'}")
+    places_metric.metric("📍 Lugares Encontrados", stats['places_found'])
+    scraped_metric.metric("🌐 Emails Extraídos", stats['emails_found'])
+    sheets_metric.metric("☁️ Google Sheets", stats['sheets_uploaded'])
+    details_text.info(f"🔍 **'{job['query']}' en '{job['location']}'**: {job['message'] or ''}")
+        
+    if not job['cancel_requested']:
+        if st.button("⛔ Cancelar búsqueda", key=f"cancel_{job['id']}"):
+            get_job_store().request_cancel(job['id'])
+            st.rerun()
             
-            elif step == "places_progress":
-                current_point, total_points, found_count = count
-                progress_percentage = 10 + int((current_point / total_points) * 40) # 10% a 50%
-                main_progress.progress(progress_percentage)
-                status_text.text(f"🔍 Buscando en grilla... ({current_point}/{total_points})")
-                places_metric.metric("📍 Lugares Encontrados", str(found_count), delta="Buscando...")
-                details_text.info(f"🔍 **Google Places**: {message}")
-
-            elif step == "places_details_progress":
-                current, total = count
-                progress_percentage = 50 + int((current / total) * 10) # 50% a 60%
-                main_progress.progress(progress_percentage)
-                status_text.text(f"🛠️ Obteniendo detalles... ({current}/{total})")
-                details_text.info(f"🛠️ **Google Places**: {message}")
-
-            elif step == "places_found":
-                main_progress.progress(60)
-                status_text.text(f"✅ {message}")
-                st.session_state.current_stats['places_found'] = count
-                places_metric.metric("📍 Lugares Encontrados", count, delta=f"✅ Completado")
-                details_text.success(f"✅ **Google Places**: {message} - Total: {count}")
-                
-            elif step == "scraping_start":
-                main_progress.progress(65)
-                status_text.text(f"🌐 {message}")
-                scraped_metric.metric("🌐 Emails Extraídos", "0", delta="Iniciando...")
-                details_text.info(f"🌐 **Web Scraping**: {message}")
-                
-            elif step == "scraping_progress":
-                progress_value = 65 + (count or 0) * 0.25
-                main_progress.progress(min(progress_value, 85))
-                status_text.text(f"🌐 {message}")
-                scraped_metric.metric("🌐 Emails Extraídos", f"~{count or 0}%", delta="Procesando...")
-                details_text.info(f"🌐 **Web Scraping**: {message} - Progreso: {count or 0}%")
-                
-            elif step == "scraping_complete":
-                main_progress.progress(85)
-                status_text.text(f"✅ {message}")
-                st.session_state.current_stats['emails_found'] = count
-                scraped_metric.metric("🌐 Emails Extraídos", count, delta="✅ Completado")
-                details_text.success(f"✅ **Web Scraping**: {message} - Emails obtenidos: {count}")
-                
-            elif step == "sheets_start":
-                main_progress.progress(90)
-                status_text.text(f"☁️ {message}")
-                sheets_metric.metric("☁️ Google Sheets", "0", delta="Subiendo...")
-                details_text.info(f"☁️ **Google Sheets**: {message}")
-                
-            elif step == "sheets_complete":
-                main_progress.progress(100)
-                status_text.text(f"✅ {message}")
-                st.session_state.current_stats['sheets_uploaded'] = count
-                sheets_metric.metric("☁️ Google Sheets", count, delta="✅ Completado")
-                details_text.success(f"✅ **Google Sheets**: {message} - Registros subidos: {count}")
-        
-        # Ejecutar búsqueda principal con callback mejorado
-        result_df, message = main(
-            query=query,
-            location=location,
-            max_results=None,
-            progress_callback=update_progress_callback
-        )
-        
-        if result_df is None:
-            st.error(f"❌ Error en la búsqueda: {message}")
-            return None, message
-        
-        # Completado con resumen final
-        main_progress.progress(100)
-        status_text.text("🎉 ¡Proceso completado exitosamente!")
-        
-        # Mostrar resumen final
-        final_stats = st.session_state.current_stats
-        details_text.success(f"""
+def show_finished_job(job):
+    """Carga el resultado de la búsqueda activa cuando termina y muestra su resumen"""
+    if job['status'] == COMPLETED:
+        st.session_state.results_df = get_job_store().load_result(job['id'])
+        st.session_state.search_completed = st.session_state.results_df is not None
+        stats = job['stats']
+        st.success(f"""
         🎉 **PROCESO COMPLETADO** - Resumen Final:
-        - 📍 Lugares encontrados: {final_stats['places_found']}
-        - 🌐 Emails extraídos: {final_stats['emails_found']}
-        - ☁️ Registros en Sheets: {final_stats['sheets_uploaded']}
+        - 📍 Lugares encontrados: {stats['places_found']}
+        - 🌐 Emails extraídos: {stats['emails_found']}
+        - ☁️ Registros en Sheets: {stats['sheets_uploaded']}
         """)
-        
-        return result_df, message
-        
-    except Exception as e:
-        st.error(f"❌ Error durante la ejecución: {str(e)}")
-        return None, str(e)
+    elif job['status'] == CANCELLED:
+        st.warning(f"⛔ Búsqueda cancelada: '{job['query']}' en '{job['location']}'")
+    else:
+        st.error(f"❌ Error en la búsqueda: {job['summary']}")
+
+def show_cached_notice(cached_search):
+    """Aviso de que los resultados vienen del cache, con su antigüedad y la opción de actualizarlos"""
+    age = format_age(time.time() - cached_search['created_at'])
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.info(f"♻️ Resultado guardado de hace **{age}** para '{cached_search['query']}' en "
+                f"'{cached_search['location']}' (no se volvió a buscar)")
+    with col2:
+        if st.button("🔄 Actualizar resultados", use_container_width=True,
+                     help="Volver a correr la búsqueda completa y reemplazar el resultado guardado"):
+            execute_search(cached_search['query'], cached_search['location'], True, True, refresh=True)
+            st.rerun()
+
+def show_jobs_panel():
+    """Lista las búsquedas en curso (de cualquier sesión) para seguirlas o cancelarlas"""
+    jobs = [job for job in get_job_store().list_jobs(ACTIVE_STATUSES)
+            if job['id'] != st.session_state.active_job_id]
+    if not jobs:
+        return
+    st.markdown("#### 🗂️ Búsquedas en segundo plano")
+    for job in jobs:
+        col1, col2, col3 = st.columns([4, 1, 1])
+        with col1:
+            state = describe_queue_position(job) if job['status'] == QUEUED else f"{job['progress']}% · {job['message'] or ''}"
+            st.write(f"**{job['query']}** en {job['location']} - {state}")
+        with col2:
+            if st.button("👁️ Seguir", key=f"follow_{job['id']}"):
+                st.session_state.active_job_id = job['id']
+                st.rerun()
+        with col3:
+            if st.button("⛔ Cancelar", key=f"cancel_list_{job['id']}", disabled=job['cancel_requested']):
+                get_job_store().request_cancel(job['id'])
+                st.rerun()
 
 def show_results_section(df, message):
     """Muestra la sección de resultados mejorada"""
@@ -828,25 +892,42 @@ def main_app():
         if not query or not location:
             st.warning("⚠️ Por favor completa el tipo de negocio y la ubicación para continuar")
         
-        # Ejecutar búsqueda
+        # Encolar búsqueda (corre en segundo plano, la página solo consulta su estado)
+        get_job_runner()
         if search_button:
-            with st.spinner("🔄 Preparando búsqueda..."):
-                result_df, message = execute_search(
-                    query, location,
-                    include_scraping, save_to_sheets
-                )
+            execute_search(
+                query, location,
+                include_scraping, save_to_sheets
+            )
                 
-                if result_df is not None:
-                    st.session_state.results_df = result_df
-                    st.session_state.search_completed = True
+        job_running = False
+        if st.session_state.active_job_id:
+            job = get_job_store().get(st.session_state.active_job_id)
+            if job is None:
+                st.session_state.active_job_id = None
+            elif job['status'] in ACTIVE_STATUSES:
+                job_running = True
+                show_job_progress(job)
+            else:
+                show_finished_job(job)
+                st.session_state.active_job_id = None
+
+        show_jobs_panel()
         
         # Mostrar resultados si existen
         if st.session_state.search_completed and st.session_state.results_df is not None:
             st.markdown("---")
+            if st.session_state.cached_search:
+                show_cached_notice(st.session_state.cached_search)
             show_results_section(st.session_state.results_df, "Búsqueda completada exitosamente")
     
     with tab2:
         show_help_section()
 
+    # Mientras la búsqueda sigue, volver a consultar su estado (un click del usuario corta la espera)
+    if job_running:
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
+
 if __name__ == "__main__":
     main_app() 
\ No newline at end of file
@@ -9,24 +9,300 @@ y extraer información de contacto (emails, teléfonos, redes sociales).
 import requests
 import pandas as pd
 import re
+import os
+import json
 import time
 import random
-from urllib.parse import urljoin, urlparse
+import codecs
+import hashlib
+import heapq
+import threading
+import multiprocessing
+import multiprocessing.util
+from collections import Counter, OrderedDict, deque
+from urllib.parse import urljoin, urlparse, urlunparse, parse_qsl, urlencode
 from bs4 import BeautifulSoup
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import queue
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from scrape_cache import ScrapeCache
+from host_health import HostResolver, CircuitBreaker, HostUnavailableError
+from crawl_frontier import CrawlFrontier, SITEMAP_PRIORITY
+from http_client import create_session, wire_bytes
+
+try:
+    # Detector de charset incluido con requests>=2.26; si falta, usamos el fallback
+    from charset_normalizer import from_bytes as detect_charset
+except ImportError:
+    detect_charset = None
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Bytes iniciales del documento donde buscar <meta charset=...>
+META_SNIFF_BYTES = 4096
+# Tamaño máximo de la muestra que se entrega al detector de encoding
+DETECTOR_SAMPLE_BYTES = 32 * 1024
+FALLBACK_ENCODING = 'utf-8'
+
+HEADER_CHARSET_RE = re.compile(r'charset\s*=\s*["\']?([^"\';\s]+)', re.IGNORECASE)
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([A-Za-z0-9_:.-]+)', re.IGNORECASE)
+
+SITEMAP_LOC_RE = re.compile(rb'<loc>\s*([^<\s]+)\s*</loc>', re.IGNORECASE)
+# Máximo de entradas del sitemap que se inspeccionan por sitio
+MAX_SITEMAP_URLS = 500
+
+def normalize_encoding(name):
+    """Devuelve el nombre canónico de un encoding o None si Python no lo conoce"""
+    if not name:
+        return None
+    if isinstance(name, bytes):
+        name = name.decode('ascii', 'ignore')
+    try:
+        return codecs.lookup(name.strip()).name
+    except LookupError:
+        return None
+
+def is_ascii_compatible(encoding):
+    """Los encodings multibyte tipo UTF-16/32 no permiten buscar emails sobre los bytes crudos"""
+    return not encoding.startswith(('utf-16', 'utf-32'))
+
+# Scraper del proceso hijo del pool de parseo (lo instala _init_parse_worker)
+_WORKER_SCRAPER = None
+
+def _init_parse_worker(scraper):
+    global _WORKER_SCRAPER
+    _WORKER_SCRAPER = scraper
+
+def _parse_in_worker(content, content_type, base_url):
+    return _WORKER_SCRAPER.parse_content(content, content_type, base_url)
+
+# Pools de parseo compartidos por todos los scrapers del proceso, uno por cantidad de workers
+# (la configuración de parseo es la misma en todos los scrapers)
+_PARSE_POOLS = {}
+_PARSE_POOLS_LOCK = threading.Lock()
+
+def _parse_pool_context():
+    """
+    forkserver (o spawn donde no existe): el proceso que crea el pool tiene threads
+    (Streamlit, el pipeline, la descarga) y un fork podría copiar locks tomados
+    """
+    start_methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in start_methods else 'spawn')
+
+def get_parse_pool(workers, scraper):
+    """Devuelve el pool de parseo compartido del proceso, creándolo al primer uso"""
+    with _PARSE_POOLS_LOCK:
+        pool = _PARSE_POOLS.get(workers)
+        if pool is None:
+            if not _PARSE_POOLS:
+                # Finalize corre antes de que multiprocessing espere a los hijos al salir, también
+                # dentro de un multiprocessing.Process (donde atexit no se ejecuta); la prioridad
+                # alta lo adelanta al cierre de las colas del pool, que usan exitpriority=10
+                multiprocessing.util.Finalize(None, shutdown_parse_pools, exitpriority=100)
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=_parse_pool_context(),
+                                       initializer=_init_parse_worker, initargs=(scraper,))
+            _PARSE_POOLS[workers] = pool
+        return pool
+
+def shutdown_parse_pools(wait=True):
+    """Cierra los pools de parseo del proceso (se llama solo al terminar el proceso)"""
+    with _PARSE_POOLS_LOCK:
+        pools = list(_PARSE_POOLS.values())
+        _PARSE_POOLS.clear()
+    for pool in pools:
+        pool.shutdown(wait=wait)
+
+def _forget_parse_pools_after_fork():
+    """Un hijo creado con fork no hereda los procesos del pool del padre"""
+    global _PARSE_POOLS_LOCK
+    _PARSE_POOLS_LOCK = threading.Lock()
+    _PARSE_POOLS.clear()
+
+os.register_at_fork(after_in_child=_forget_parse_pools_after_fork)
+
+def normalize_domain(url):
+    """Reduce una URL a su dominio en minúsculas, sin esquema, puerto ni 'www.'"""
+    url = str(url).strip().lower()
+    if '://' not in url:
+        url = 'https://' + url
+    host = urlparse(url).hostname or ''
+    return host[4:] if host.startswith('www.') else host
+
+def site_key(url):
+    """
+    Clave de un sitio para agrupar filas y cachear resultados: host sin 'www.' más la
+    ruta canónica. Dos negocios en un host compartido (sites.google.com/view/a y /view/b,
+    linktr.ee/x y linktr.ee/y) son sitios distintos; http/https y www. no cambian la clave.
+    """
+    url = str(url).strip()
+    if '://' not in url:
+        url = 'https://' + url
+    parsed = urlparse(canonicalize_url(url))
+    host = parsed.netloc[4:] if parsed.netloc.startswith('www.') else parsed.netloc
+    path = '' if parsed.path == '/' else parsed.path
+    return host + path + (f"?{parsed.query}" if parsed.query else '')
+
+# Parámetros que no cambian el contenido útil de la página (tracking, idioma)
+IGNORED_QUERY_PARAMS = {'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'igshid', '_ga', 'lang', 'hl'}
+IGNORED_QUERY_PREFIXES = ('utm_',)
+INDEX_PAGE_RE = re.compile(r'/index\.(?:html?|php|asp)$', re.IGNORECASE)
+# Extracciones recordadas por hash de contenido (páginas idénticas entre URLs o sitios)
+MAX_HASHED_EXTRACTIONS = 5000
+
+def canonicalize_url(url):
+    """
+    Forma canónica de una URL para detectar duplicados: sin fragmento, sin parámetros
+    de tracking/idioma, host en minúsculas, sin puerto por defecto, sin index.html
+    ni barra final, y con los parámetros restantes ordenados.
+    """
+    parsed = urlparse(str(url).strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or '').lower()
+    try:
+        port = parsed.port
+    except ValueError:
+        port = None
+    netloc = host if port is None or (scheme, port) in (('http', 80), ('https', 443)) else f"{host}:{port}"
+
+    path = INDEX_PAGE_RE.sub('/', re.sub(r'/{2,}', '/', parsed.path))
+    path = path.rstrip('/') or '/'
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+        if k.lower() not in IGNORED_QUERY_PARAMS and not k.lower().startswith(IGNORED_QUERY_PREFIXES)
+    ))
+    return urlunparse((scheme, netloc, path, '', query, ''))
+
+# Cada cuánto revisan los motores de scraping si llegaron sitios nuevos a la corrida
+FEED_POLL_SECONDS = 0.2
+
+# Códigos HTTP que suelen resolverse solos (sobrecarga, mantenimiento, rate limit)
+TRANSIENT_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+def classify_failure(exc):
+    """
+    Clasifica el error de un sitio. Retorna (clase, transitoria): las transitorias
+    (timeouts, conexión cortada, 5xx, 429) vale la pena reintentarlas más tarde.
+    """
+    if isinstance(exc, HostUnavailableError):
+        return 'host_unavailable', False
+    if isinstance(exc, requests.exceptions.HTTPError):
+        status = exc.response.status_code if exc.response is not None else None
+        if status in TRANSIENT_STATUS_CODES:
+            return f'http_{status}', True
+        return 'http_4xx' if status and status < 500 else 'http_error', False
+    if isinstance(exc, requests.exceptions.Timeout):
+        return 'timeout', True
+    if isinstance(exc, requests.exceptions.SSLError):
+        return 'ssl', False
+    if isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError)):
+        # Un puerto cerrado no se abre en unos segundos; un reset o un corte a mitad sí pueden ser pasajeros
+        if _caused_by(exc, ConnectionRefusedError):
+            return 'connection_refused', False
+        return 'connection', True
+    if isinstance(exc, (requests.exceptions.TooManyRedirects, requests.exceptions.InvalidURL,
+                        requests.exceptions.MissingSchema, requests.exceptions.InvalidSchema)):
+        return 'invalid_site', False
+    return 'other', False
+
+def _caused_by(exc, exc_type, max_depth=6):
+    """True si exc_type aparece en la cadena de causas (requests envuelve el error de urllib3/socket)"""
+    for _ in range(max_depth):
+        if exc is None:
+            return False
+        if isinstance(exc, exc_type):
+            return True
+        reason = getattr(exc, 'reason', None)
+        if reason is None and exc.args and isinstance(exc.args[0], BaseException):
+            reason = exc.args[0]
+        exc = reason if isinstance(reason, BaseException) else (exc.__cause__ or exc.__context__)
+    return False
+
+class SiteFeed:
+    """
+    Sitios pendientes de una corrida, como (clave, posiciones). Pueden seguir llegando
+    mientras se scrapea hasta close(); los motores de scraping toman de acá sin bloquearse.
+    """
+
+    def __init__(self):
+        self._items = deque()
+        self._cond = threading.Condition()
+        self.closed = False
+        self.cancelled = False
+
+    def put(self, key, positions):
+        with self._cond:
+            if not self.closed:
+                self._items.append((key, positions))
+                self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def cancel(self):
+        """Descarta los sitios que no empezaron y cierra la entrada"""
+        with self._cond:
+            self._items.clear()
+            self.closed = self.cancelled = True
+            self._cond.notify_all()
+
+    def get_nowait(self):
+        with self._cond:
+            return self._items.popleft() if self._items else None
+
+    @property
+    def exhausted(self):
+        """Cerrado y sin sitios por tomar"""
+        with self._cond:
+            return self.closed and not self._items
+
+    def wait(self, timeout=None):
+        """Espera hasta timeout segundos a que llegue un sitio o se cierre la entrada"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._items or self.closed, timeout)
+
 class WebsiteScraper:
     """
     Clase dedicada a scrapear sitios web para encontrar información de contacto.
     """
-    def __init__(self, max_workers=5):
+    # Atributos de configuración que necesita el parseo; es lo único que se serializa hacia
+    # los procesos del pool (que arrancan con forkserver/spawn, no con fork)
+    PARSER_STATE_ATTRS = (
+        'email_patterns', 'email_patterns_bytes', 'contact_keyword_weights', 'contact_keywords',
+        'social_media_patterns'
+    )
+
+    def __init__(self, max_workers=5, cache_path="scrape_cache.db", cache_ttl_hours=72,
+                 max_contact_pages=2, per_host_limit=2, connect_timeout=3.05, read_timeout=10,
+                 breaker_threshold=2, parse_workers=None, site_page_budget=4, max_crawl_depth=2,
+                 max_retries=2, retry_backoff=2.0, http_client='requests'):
         self.max_workers = max_workers
-        self.session = requests.Session()
+        # Reintentos diferidos de fallas transitorias: espera retry_backoff * 2^intento segundos
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        # Presupuestos por sitio del crawler con frontier (corridas con time_budget)
+        self.site_page_budget = site_page_budget
+        self.max_crawl_depth = max_crawl_depth
+        # Etapa de parseo en procesos para no competir por el GIL con la descarga
+        # (None = un proceso por core, 0 = parsear en los mismos threads de descarga)
+        self.parse_workers = (os.cpu_count() or 1) if parse_workers is None else parse_workers
+        self.max_contact_pages = max_contact_pages
+        self.per_host_limit = per_host_limit
+        # Timeout separado: un host que no acepta conexiones se descarta rápido
+        self.timeout = (connect_timeout, read_timeout)
+        # 'requests' o 'http2' (httpx): ver http_client.py
+        self.session = create_session(http_client, on_connect=self._on_connection_opened,
+                                      max_connections=max(10, max_workers * per_host_limit * 2))
+        self.http_client = self.session.client_name
+        # Fail-fast para dominios inexistentes y hosts que no responden
+        self.resolver = HostResolver()
+        self.breaker = CircuitBreaker(failure_threshold=breaker_threshold)
+        # Cache persistente de resultados por sitio (cache_path=None la desactiva)
+        self.cache = ScrapeCache(cache_path, ttl_hours=cache_ttl_hours) if cache_path else None
         
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -36,12 +312,69 @@ class WebsiteScraper:
             r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
             r'mailto:([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,})',
         ]
-        self.contact_keywords = ['contacto', 'contact', 'about', 'info', 'telefono', 'email']
+        # Versiones precompiladas para buscar directamente sobre los bytes de la respuesta
+        self.email_patterns_bytes = [re.compile(p.encode('ascii'), re.IGNORECASE) for p in self.email_patterns]
+        # Peso de cada keyword para rankear candidatas a página de contacto
+        self.contact_keyword_weights = {
+            'contacto': 10, 'contact': 9, 'email': 6, 'telefono': 5, 'about': 3, 'info': 2
+        }
+        self.contact_keywords = list(self.contact_keyword_weights)
+        # Redes que, junto con un email, dan por completo el contacto de un sitio
+        self.main_social_networks = ['facebook', 'instagram']
         self.social_media_patterns = {
             'facebook': 'facebook.com', 'instagram': 'instagram.com', 'twitter': 'twitter.com',
             'linkedin': 'linkedin.com', 'youtube': 'youtube.com', 'tiktok': 'tiktok.com'
         }
 
+        # Extracciones por hash del cuerpo: host donde se calcularon y resultado
+        self._extractions_by_hash = OrderedDict()
+        self._extractions_lock = threading.Lock()
+
+        # Contadores de la corrida (compartidos entre los threads del pool)
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+        # Duración de cada sitio scrapeado en la corrida actual (para p50/p95)
+        self._site_latencies = []
+
+        # Pool para páginas de contacto y semáforos que limitan requests simultáneos por host
+        self._page_executor = ThreadPoolExecutor(max_workers=max_workers * max_contact_pages)
+        self._host_slots = {}
+        self._host_slots_lock = threading.Lock()
+
+        # Cola acotada de páginas esperando parseo (el pool es compartido, ver get_parse_pool)
+        self._parse_slots = threading.BoundedSemaphore(max(self.parse_workers, 1) * 2)
+
+    def __getstate__(self):
+        return {attr: getattr(self, attr) for attr in self.PARSER_STATE_ATTRS}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _get_parse_pool(self):
+        return get_parse_pool(self.parse_workers, self)
+
+    def close(self):
+        """Libera el pool de threads, la sesión HTTP y la cache (el pool de parseo es del proceso)"""
+        self._page_executor.shutdown(wait=False)
+        self.session.close()
+        if self.cache:
+            self.cache.close()
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _on_connection_opened(self):
+        self._count('connections_opened')
+
+    def get_stats(self):
+        """Devuelve una copia de los contadores acumulados"""
+        with self._stats_lock:
+            return dict(self.stats)
+
     def get_random_headers(self):
         return {'User-Agent': random.choice(self.user_agents), 'Accept': 'text/html,application/xhtml+xml', 'Accept-Language': 'es-ES,es;q=0.9'}
 
@@ -50,13 +383,44 @@ class WebsiteScraper:
         social_domains = ['facebook.com', 'instagram.com', 'twitter.com', 'linkedin.com', 'youtube.com', 'tiktok.com']
         return not any(domain in str(url).lower() for domain in social_domains)
 
+    def resolve_encoding(self, content, content_type=''):
+        """
+        Determina el encoding de una respuesta sin usar la detección completa de requests.
+        Orden: header Content-Type -> <meta charset> en los primeros KB -> detector sobre
+        una muestra acotada -> utf-8.
+        Retorna (encoding, camino usado).
+        """
+        match = HEADER_CHARSET_RE.search(content_type)
+        encoding = normalize_encoding(match.group(1)) if match else None
+        if encoding:
+            return encoding, 'header'
+
+        match = META_CHARSET_RE.search(content[:META_SNIFF_BYTES])
+        encoding = normalize_encoding(match.group(1)) if match else None
+        if encoding:
+            return encoding, 'meta'
+
+        if detect_charset is not None and content:
+            best = detect_charset(content[:DETECTOR_SAMPLE_BYTES]).best()
+            encoding = normalize_encoding(best.encoding) if best else None
+            if encoding:
+                return encoding, 'detector'
+
+        return FALLBACK_ENCODING, 'fallback'
+
     def extract_emails(self, text, html=""):
         emails = set()
-        for pattern in self.email_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                email = match if isinstance(match, str) else match[0] if match else ''
-                emails.add(email.strip().lower())
+        if isinstance(text, bytes):
+            # Los emails son ASCII: se buscan sobre los bytes sin decodificar la página
+            for pattern in self.email_patterns_bytes:
+                for match in pattern.findall(text):
+                    emails.add(match.decode('ascii', 'ignore').strip().lower())
+        else:
+            for pattern in self.email_patterns:
+                matches = re.findall(pattern, text, re.IGNORECASE)
+                for match in matches:
+                    email = match if isinstance(match, str) else match[0] if match else ''
+                    emails.add(email.strip().lower())
         
         if html:
             soup = BeautifulSoup(html, 'html.parser')
@@ -101,41 +465,326 @@ class WebsiteScraper:
                     break
         return [f"{name}:{url}" for name, url in social_links.items()]
     
+    def score_contact_link(self, full_url, link_text):
+        """Puntúa qué tan probable es que un link lleve a la página de contacto"""
+        path = urlparse(full_url).path.lower()
+        path_score = max((w for kw, w in self.contact_keyword_weights.items() if kw in path), default=0)
+        text_score = max((w for kw, w in self.contact_keyword_weights.items() if kw in link_text), default=0)
+        # La keyword en la ruta (/contacto) pesa más que en el texto del link
+        return path_score * 2 + text_score
+
     def find_contact_pages(self, soup, base_url):
-        contact_urls = set()
+        """Devuelve las páginas candidatas del mismo host, ordenadas de más a menos probable"""
+        base_netloc = urlparse(base_url).netloc
+        base_key = canonicalize_url(base_url)
+        # URL canónica -> (puntaje, URL a descargar): /#contacto o ?utm_... no son páginas nuevas
+        candidates = {}
         for link in soup.find_all('a', href=True):
             href = link.get('href', '')
             link_text = link.get_text().lower().strip()
             if any(kw in link_text or kw in href.lower() for kw in self.contact_keywords):
                 full_url = urljoin(base_url, href)
-                if urlparse(full_url).netloc == urlparse(base_url).netloc:
-                    contact_urls.add(full_url)
-        return list(contact_urls)
+                if urlparse(full_url).netloc != base_netloc:
+                    continue
+                key = canonicalize_url(full_url)
+                if key == base_key:
+                    continue
+                score = self.score_contact_link(full_url, link_text)
+                if key not in candidates or score > candidates[key][0]:
+                    candidates[key] = (score, full_url)
+        # A igual puntaje se prefieren las URLs más cortas (menos profundas)
+        ranked = sorted(candidates.values(), key=lambda c: (-c[0], len(c[1])))
+        return [url for _, url in ranked]
+
+    def has_enough_contact(self, emails, social_media):
+        """True si ya hay un email y las redes principales, y no vale la pena seguir descargando"""
+        networks = {link.split(':', 1)[0] for link in social_media}
+        return bool(emails) and all(net in networks for net in self.main_social_networks)
+
+    def _fetch_with_host_limit(self, url, raise_for_status=False, raw=False):
+        """
+        fetch_page respetando el máximo de requests simultáneos por host.
+        Falla de inmediato si el dominio no resuelve o si el circuit breaker del host está abierto.
+        Con raw=True devuelve la respuesta sin parsear (ej. sitemap.xml).
+        """
+        parsed = urlparse(url)
+        # DNS por nombre de host; breaker y semáforos por host:puerto
+        host = parsed.netloc
+        if self.resolver.is_dead(parsed.hostname or ''):
+            self._count('dns_failfast')
+            raise HostUnavailableError(f"El dominio {parsed.hostname} no existe (NXDOMAIN)")
+        if not self.breaker.allow(host):
+            self._count('breaker_failfast')
+            raise HostUnavailableError(f"Circuit breaker abierto para {host}")
+
+        with self._host_slots_lock:
+            slot = self._host_slots.setdefault(host, threading.BoundedSemaphore(self.per_host_limit))
+        with slot:
+            try:
+                if raw:
+                    result = self.session.get(url, timeout=self.timeout, allow_redirects=True)
+                    self._count_transfer(result)
+                else:
+                    result = self.fetch_page(url, raise_for_status=raise_for_status)
+            except (requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout):
+                self.breaker.record_failure(host)
+                raise
+        self.breaker.record_success(host)
+        return result
+
+    def _walk_json_ld(self, node, emails, same_as):
+        """Recorre un bloque JSON-LD (LocalBusiness, contactPoint, @graph...) juntando email y sameAs"""
+        if isinstance(node, list):
+            for item in node:
+                self._walk_json_ld(item, emails, same_as)
+        elif isinstance(node, dict):
+            for key, value in node.items():
+                values = value if isinstance(value, list) else [value]
+                if key == 'email':
+                    emails.extend(v for v in values if isinstance(v, str))
+                elif key == 'sameAs':
+                    same_as.extend(v for v in values if isinstance(v, str))
+                elif isinstance(value, (dict, list)):
+                    self._walk_json_ld(value, emails, same_as)
+
+    def extract_structured_data(self, soup, base_url):
+        """
+        Extrae emails y redes sociales de datos estructurados: JSON-LD (schema.org),
+        microdata (itemprop="email"/"sameAs") y microformato hCard/vCard (class="email").
+        """
+        emails, same_as = [], []
+
+        for script in soup.find_all('script', type='application/ld+json'):
+            try:
+                self._walk_json_ld(json.loads(script.string or ''), emails, same_as)
+            except ValueError:
+                continue
+
+        for tag in soup.find_all(itemprop=True):
+            props = tag['itemprop'].split() if isinstance(tag['itemprop'], str) else tag['itemprop']
+            value = tag.get('content') or tag.get('href') or tag.get_text(strip=True)
+            if 'email' in props:
+                emails.append(value)
+            if 'sameAs' in props:
+                same_as.append(value)
+
+        for card in soup.select('.vcard, .h-card'):
+            for tag in card.select('.email, .u-email'):
+                emails.append(tag.get('href') or tag.get_text(strip=True))
+
+        social_links = {}
+        for link in same_as:
+            for name, pattern in self.social_media_patterns.items():
+                if pattern in link.lower() and name not in social_links:
+                    social_links[name] = urljoin(base_url, link)
+                    break
+
+        emails = [e[7:] if e.lower().startswith('mailto:') else e for e in emails if e]
+        return {
+            'emails': self.extract_emails(' '.join(emails)),
+            'social_media': [f"{name}:{url}" for name, url in social_links.items()]
+        }
+
+    def parse_content(self, content, content_type, base_url):
+        """
+        Extrae emails, redes sociales y posibles páginas de contacto de los bytes de una página.
+        Trabaja sobre los bytes crudos: BeautifulSoup recibe el encoding ya resuelto
+        y los emails se buscan sin decodificar el documento.
+        No toca estado compartido, por lo que puede correr en un proceso del pool de parseo.
+        Retorna (extracción, info del parseo para los contadores).
+        """
+        cpu_started = time.thread_time()
+        encoding, charset_source = self.resolve_encoding(content, content_type)
+
+        full_decode = not is_ascii_compatible(encoding)
+        if full_decode:
+            emails = self.extract_emails(content.decode(encoding, errors='replace'))
+        else:
+            emails = self.extract_emails(content)
+
+        soup = BeautifulSoup(content, 'html.parser', from_encoding=encoding)
+        # Primero los datos estructurados: si traen email y redes, no hace falta recorrer el sitio
+        structured = self.extract_structured_data(soup, base_url)
+        social_media = self.extract_social_media(soup, base_url)
+        networks = {link.split(':', 1)[0] for link in social_media}
+        page = {
+            'emails': sorted(set(emails) | set(structured['emails'])),
+            'social_media': social_media + [s for s in structured['social_media'] if s.split(':', 1)[0] not in networks],
+            'contact_urls': self.find_contact_pages(soup, base_url),
+            'structured': structured
+        }
+        info = {
+            'charset': charset_source,
+            'full_decode': full_decode,
+            'cpu_seconds': time.thread_time() - cpu_started
+        }
+        return page, info
+
+    def parse_page(self, response, base_url):
+        """
+        Etapa de parseo: envía los bytes descargados al pool de procesos (o parsea en
+        el thread actual si parse_workers=0). La cola hacia el pool está acotada, así
+        los threads de descarga esperan en lugar de acumular páginas en memoria.
+        """
+        content_type = response.headers.get('Content-Type', '')
+        if self.parse_workers:
+            with self._parse_slots:
+                try:
+                    future = self._get_parse_pool().submit(_parse_in_worker, response.content, content_type, base_url)
+                    page, info = future.result()
+                except BrokenProcessPool:
+                    logger.warning("⚠️ Pool de parseo caído, se continúa parseando en los threads de descarga")
+                    self.parse_workers = 0
+                    page, info = self.parse_content(response.content, content_type, base_url)
+        else:
+            page, info = self.parse_content(response.content, content_type, base_url)
+
+        self._count(f"charset_{info['charset']}")
+        if info['full_decode']:
+            self._count('charset_full_decode')
+        self._count('parse_pages')
+        self._count('parse_cpu_seconds', info['cpu_seconds'])
+        return page
+
+    def fetch_page(self, url, raise_for_status=False):
+        """
+        Descarga y extrae una página usando requests condicionales.
+        Si la URL ya fue vista se envían If-None-Match/If-Modified-Since: ante un 304
+        (o un cuerpo con el mismo hash) se reutiliza la extracción anterior sin parsear.
+        Retorna (extracción, response).
+        """
+        stored = self.cache.get_page(url) if self.cache else None
+        headers = {}
+        if stored:
+            if stored['etag']:
+                headers['If-None-Match'] = stored['etag']
+            if stored['last_modified']:
+                headers['If-Modified-Since'] = stored['last_modified']
+
+        fetch_started = time.time()
+        response = self.session.get(url, timeout=self.timeout, allow_redirects=True, headers=headers)
+        self._count('fetch_seconds', time.time() - fetch_started)
+        self._count_transfer(response)
+        if response.status_code == 304 and stored:
+            self._count('http_not_modified')
+            self.cache.touch_page(url)
+            return stored['extraction'], response
+        if raise_for_status:
+            response.raise_for_status()
+
+        content_hash = hashlib.sha1(response.content).hexdigest()
+        if stored and stored['content_hash'] == content_hash:
+            self._count('content_unchanged')
+            page = stored['extraction']
+        else:
+            page = self._extraction_for_hash(content_hash, url)
+            if page is None:
+                page = self.parse_page(response, url)
+                self._remember_extraction(content_hash, url, page)
+
+        if self.cache and response.ok:
+            self.cache.set_page(
+                url, response.headers.get('ETag'), response.headers.get('Last-Modified'), content_hash, page
+            )
+        return page, response
+
+    def _extraction_for_hash(self, content_hash, url):
+        """
+        Extracción de una página ya parseada con el mismo contenido (otra URL del sitio o
+        un sitio armado con la misma plantilla). Si viene de otro host, los links de
+        contacto se trasladan al host actual.
+        """
+        with self._extractions_lock:
+            entry = self._extractions_by_hash.get(content_hash)
+            if entry is not None:
+                self._extractions_by_hash.move_to_end(content_hash)
+        if entry is None:
+            return None
+
+        self._count('content_hash_reuse')
+        origin, page = entry
+        target = urlparse(url)
+        if target.netloc == origin:
+            return page
+        rebased = []
+        for contact_url in page['contact_urls']:
+            parsed = urlparse(contact_url)
+            if parsed.netloc == origin:
+                contact_url = urlunparse(parsed._replace(scheme=target.scheme, netloc=target.netloc))
+            rebased.append(contact_url)
+        return {**page, 'contact_urls': rebased}
+
+    def _remember_extraction(self, content_hash, url, page):
+        with self._extractions_lock:
+            self._extractions_by_hash[content_hash] = (urlparse(url).netloc, page)
+            if len(self._extractions_by_hash) > MAX_HASHED_EXTRACTIONS:
+                self._extractions_by_hash.popitem(last=False)
+
+    def _count_transfer(self, response):
+        """Cuenta la página descargada, sus bytes descomprimidos y los que viajaron por la red"""
+        self._count('fetch_pages')
+        self._count('fetch_bytes', len(response.content))
+        self._count('fetch_wire_bytes', wire_bytes(response))
+        if getattr(response, 'http_version', None) == 'HTTP/2':
+            self._count('http2_responses')
+
+    def _ensure_scheme(self, url):
+        url = str(url).strip()
+        if not url.startswith(('http://', 'https://')): url = 'https://' + url
+        return url
 
     def scrape_single_website(self, url, name):
+        """
+        Scrapea la home y las páginas de contacto más probables del sitio (en paralelo),
+        deteniéndose apenas se tiene un email y las redes principales.
+        Retorna emails, redes sociales y metadatos de la descarga ('meta');
+        si hubo un error, 'meta' incluye la clave 'error'.
+        """
+        started = time.time()
+        meta = {'pages_fetched': 0}
         try:
-            if not url or pd.isna(url): return {'emails': [], 'social_media': []}
+            if not url or pd.isna(url): return {'emails': [], 'social_media': [], 'meta': meta}
             
-            url = str(url).strip()
-            if not url.startswith(('http://', 'https://')): url = 'https://' + url
+            url = self._ensure_scheme(url)
             
             self.session.headers.update(self.get_random_headers())
-            response = self.session.get(url, timeout=10, allow_redirects=True)
-            response.raise_for_status()
-            
-            html_content = response.text
-            soup = BeautifulSoup(html_content, 'html.parser')
+            page, response = self._fetch_with_host_limit(url, raise_for_status=True)
+            meta.update({'pages_fetched': 1, 'final_url': response.url, 'status_code': response.status_code})
             
-            emails = self.extract_emails(html_content)
-            social_media = self.extract_social_media(soup, url)
+            emails = list(page['emails'])
+            social_media = list(page['social_media'])
             
-            contact_urls = self.find_contact_pages(soup, url)
-            for contact_url in contact_urls[:2]:
-                time.sleep(random.uniform(1, 2))
-                contact_response = self.session.get(contact_url, timeout=10)
-                contact_soup = BeautifulSoup(contact_response.text, 'html.parser')
-                emails.extend(self.extract_emails(contact_response.text))
-                social_media.extend(self.extract_social_media(contact_soup, contact_url))
+            # La home puede haber redirigido: sus variantes tampoco son páginas de contacto
+            seen = {canonicalize_url(url), canonicalize_url(response.url)}
+            contact_urls = [u for u in page['contact_urls'] if canonicalize_url(u) not in seen]
+            self._count('canonical_duplicates_skipped', len(page['contact_urls']) - len(contact_urls))
+            contact_urls = contact_urls[:self.max_contact_pages]
+            structured = page.get('structured') or {}
+            if structured.get('emails'):
+                self._count('structured_data_sites')
+            if contact_urls and structured.get('emails') and structured.get('social_media'):
+                # Los datos estructurados de la home ya traen email y redes: se evita el crawl
+                self._count('structured_requests_avoided', len(contact_urls))
+                contact_urls = []
+            elif contact_urls and self.has_enough_contact(emails, social_media):
+                # La home ya alcanza: no se descargan páginas de contacto
+                self._count('contact_pages_skipped', len(contact_urls))
+                contact_urls = []
+
+            futures = [self._page_executor.submit(self._fetch_with_host_limit, u) for u in contact_urls]
+            for future in as_completed(futures):
+                try:
+                    contact_page, _ = future.result()
+                except Exception as e:
+                    logger.debug(f"⚠️ {name}: Error en página de contacto - {e}")
+                    continue
+                meta['pages_fetched'] += 1
+                emails.extend(contact_page['emails'])
+                social_media.extend(contact_page['social_media'])
+                if self.has_enough_contact(emails, social_media):
+                    # Salida temprana: cancelar las que aún no empezaron
+                    self._count('contact_pages_skipped', sum(f.cancel() for f in futures))
+                    break
             
             emails = list(set(emails))
             social_media = list(set(social_media))
@@ -143,11 +792,25 @@ class WebsiteScraper:
             if emails or social_media:
                 logger.info(f"✅ {name}: {len(emails)} emails, {len(social_media)} redes.")
             
-            return {'emails': emails, 'social_media': social_media}
+            meta['elapsed'] = time.time() - started
+            return {'emails': emails, 'social_media': social_media, 'meta': meta}
             
         except Exception as e:
-            logger.error(f"❌ {name}: Error - {e}")
-            return {'emails': [], 'social_media': []}
+            failure_class, transient = self._record_failure(e)
+            logger.error(f"❌ {name}: Error ({failure_class}) - {e}")
+            meta.update({'error': str(e), 'error_class': failure_class, 'transient': transient,
+                         'elapsed': time.time() - started})
+            return {'emails': [], 'social_media': [], 'meta': meta}
+
+    def _record_failure(self, exc):
+        """Clasifica una falla y la suma a los contadores por clase"""
+        failure_class, transient = classify_failure(exc)
+        self._count(f"failure_{failure_class}")
+        return failure_class, transient
+
+    def _retry_delay(self, attempt):
+        """Backoff exponencial con jitter para el intento número attempt (1 = primer reintento)"""
+        return self.retry_backoff * (2 ** (attempt - 1)) * random.uniform(0.8, 1.2)
 
     def run_scraping_process(self, input_filename="places_output.csv"):
         logger.info("--- INICIANDO PROCESO DE WEB SCRAPING ---")
@@ -159,8 +822,268 @@ class WebsiteScraper:
 
         return self.run_scraping_process_from_dataframe(df)
 
-    def run_scraping_process_from_dataframe(self, df, progress_callback=None):
-        """Procesa web scraping directamente desde un DataFrame"""
+    def run_scraping_process_chunked(self, input_filename="places_output.csv", output_filename="scraped_output.csv",
+                                     chunk_size=1000, progress_callback=None):
+        """
+        Modo streaming para exports grandes: lee el CSV de a bloques, scrapea cada bloque
+        con la ventana acotada de siempre y lo agrega al CSV de salida apenas termina.
+        La memoria queda acotada al bloque en curso y, si la corrida se corta, al volver
+        a ejecutarla se saltean las filas que ya están escritas en la salida.
+        Los dominios repetidos entre bloques se resuelven con la cache de scraping.
+        Retorna la cantidad de filas procesadas en esta ejecución.
+        """
+        logger.info("--- INICIANDO PROCESO DE WEB SCRAPING (POR BLOQUES) ---")
+        if not os.path.exists(input_filename):
+            logger.error(f"El archivo de entrada '{input_filename}' no fue encontrado. Abortando.")
+            return 0
+
+        # Reanudar: la salida se escribe en el mismo orden que la entrada, alcanza con contar sus filas
+        done_rows = self._count_csv_rows(output_filename)
+        if done_rows:
+            logger.info(f"⏯️ Reanudando: {done_rows} filas ya escritas en {output_filename}, se saltean")
+
+        processed_rows = 0
+        to_skip = done_rows
+        # Se saltea por filas leídas y no por líneas: un campo entre comillas puede ocupar varias
+        for chunk_number, chunk in enumerate(pd.read_csv(input_filename, chunksize=chunk_size), start=1):
+            if to_skip >= len(chunk):
+                to_skip -= len(chunk)
+                continue
+            chunk = chunk.iloc[to_skip:]
+            to_skip = 0
+
+            result = self.run_scraping_process_from_dataframe(chunk)
+            if result is None:
+                result = chunk
+            for column in ('scraped_emails', 'social_media_links'):
+                if column not in result.columns:
+                    result[column] = ''
+
+            # Cada bloque se escribe de una sola vez para no dejar filas a medias si el proceso muere
+            write_header = not os.path.exists(output_filename) or os.path.getsize(output_filename) == 0
+            with open(output_filename, 'a', encoding='utf-8', newline='') as f:
+                f.write(result.to_csv(index=False, header=write_header))
+                f.flush()
+                os.fsync(f.fileno())
+
+            processed_rows += len(result)
+            logger.info(f"📦 Bloque {chunk_number}: {len(result)} filas escritas ({done_rows + processed_rows} en total)")
+            if progress_callback:
+                progress_callback(done_rows + processed_rows)
+
+        logger.info(f"💾 Datos scrapeados guardados en: {output_filename}")
+        return processed_rows
+
+    @staticmethod
+    def _count_csv_rows(filename):
+        """Cantidad de filas de datos de un CSV (0 si no existe o está vacío)"""
+        if not os.path.exists(filename) or os.path.getsize(filename) == 0:
+            return 0
+        return sum(len(block) for block in pd.read_csv(filename, usecols=[0], chunksize=50000))
+
+    def _crawl_sitemap(self, frontier, site, url, depth):
+        """Encola las entradas del sitemap.xml con pinta de página de contacto"""
+        response = self._fetch_with_host_limit(url, raw=True)
+        if not response.ok:
+            return
+        base_netloc = urlparse(site.url).netloc
+        for loc in SITEMAP_LOC_RE.findall(response.content)[:MAX_SITEMAP_URLS]:
+            loc = loc.decode('utf-8', 'ignore')
+            if urlparse(loc).netloc != base_netloc:
+                continue
+            score = self.score_contact_link(loc, '')
+            if score:
+                # Las entradas del sitemap que parecen de contacto rankean por encima de los links de la home
+                frontier.push(site, loc, score + SITEMAP_PRIORITY, depth)
+
+    def _crawl_worker(self, frontier):
+        """Worker del frontier: descarga la página de mayor prioridad de cualquier sitio"""
+        while True:
+            item = frontier.pop()
+            if item is None:
+                return
+            site, url, depth, kind = item
+            finished = False
+            try:
+                if kind == 'sitemap':
+                    self._crawl_sitemap(frontier, site, url, depth)
+                    continue
+
+                if depth == 0:
+                    self.session.headers.update(self.get_random_headers())
+                page, _ = self._fetch_with_host_limit(url, raise_for_status=depth == 0)
+                frontier.record_results(site, page['emails'], page['social_media'])
+
+                structured = page.get('structured') or {}
+                if structured.get('emails') and structured.get('social_media'):
+                    self._count('structured_requests_avoided', min(len(page['contact_urls']), self.max_contact_pages))
+                    finished = True
+                elif self.has_enough_contact(site.emails, site.social_media.values()):
+                    finished = True
+                else:
+                    for contact_url in page['contact_urls']:
+                        frontier.push(site, contact_url, self.score_contact_link(contact_url, ''), depth + 1)
+                    if depth == 0 and not site.emails:
+                        frontier.push(site, urljoin(url, '/sitemap.xml'), SITEMAP_PRIORITY, depth + 1, kind='sitemap')
+            except Exception as e:
+                if depth == 0:
+                    # Sin home no hay sitio: se da por terminado con error
+                    failure_class, _ = self._record_failure(e)
+                    logger.error(f"❌ {site.name}: Error ({failure_class}) - {e}")
+                    site.error = str(e)
+                    finished = True
+                else:
+                    logger.debug(f"⚠️ {site.name}: Error en {url} - {e}")
+            finally:
+                frontier.task_done(site, finished=finished)
+
+    def _crawl_with_frontier(self, urls, names, feed, time_budget):
+        """
+        Scrapea los sitios del feed con un frontier de prioridades global y deadline.
+        Generador: entrega (sitio, posiciones, resultado) en el thread que lo consume.
+        """
+        frontier = CrawlFrontier(page_budget=self.site_page_budget, max_depth=self.max_crawl_depth,
+                                 time_budget=time_budget, url_key=canonicalize_url)
+        frontier.sites_open = True
+        added = 0
+
+        def add_ready_sites():
+            nonlocal added
+            while (group := feed.get_nowait()) is not None:
+                key, positions = group
+                first = positions[0]
+                frontier.add_site(key, self._ensure_scheme(urls[first]), names[first], payload=positions)
+                added += 1
+            if feed.exhausted:
+                frontier.close_sites()
+
+        reported = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            workers = [executor.submit(self._crawl_worker, frontier) for _ in range(self.max_workers)]
+            while True:
+                add_ready_sites()
+                if feed.cancelled:
+                    frontier.expire()
+                if feed.exhausted and reported >= added:
+                    break
+                try:
+                    site = frontier.completed.get(timeout=FEED_POLL_SECONDS)
+                except queue.Empty:
+                    if all(w.done() for w in workers):
+                        break
+                    continue
+                reported += 1
+                yield site.key, site.payload, self._frontier_site_result(site)
+
+        while True:
+            try:
+                site = frontier.completed.get_nowait()
+            except queue.Empty:
+                break
+            yield site.key, site.payload, self._frontier_site_result(site)
+
+        # Sitios que el deadline dejó con páginas sin descargar (o que llegaron después): se entregan con lo que haya
+        while True:
+            add_ready_sites()
+            for site in frontier.drain_unfinished():
+                self._count('frontier_deadline_sites')
+                yield site.key, site.payload, self._frontier_site_result(site, deadline_reached=True)
+            if feed.exhausted:
+                break
+            feed.wait()
+
+    def _frontier_site_result(self, site, deadline_reached=False):
+        result = site.to_result(deadline_reached=deadline_reached)
+        self._count('frontier_emails', len(result['emails']))
+        if result['emails'] or result['social_media']:
+            logger.info(f"✅ {site.name}: {len(result['emails'])} emails, {len(result['social_media'])} redes.")
+        return result
+
+    def _scrape_sites(self, urls, names, feed):
+        """
+        Scrapea los sitios del feed uno por tarea con scrape_single_website, tomando los
+        nuevos a medida que llegan. Las fallas transitorias van a una cola de reintentos con
+        backoff exponencial que solo ocupa workers cuando no queda trabajo nuevo.
+        Generador: entrega (sitio, posiciones, resultado) en el thread que lo consume.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Etapa de descarga con ventana acotada: nunca hay más de 2x workers sitios encolados
+            window = self.max_workers * 2
+            future_to_group = {}
+            # Heap de reintentos: (listo_en, secuencia, dominio, posiciones, intento)
+            retry_heap = []
+            retry_seq = 0
+
+            def submit_next():
+                group = feed.get_nowait()
+                if group is not None:
+                    submit(*group, 0)
+                    return True
+                # Sin trabajo nuevo: se toma un reintento cuyo backoff ya venció
+                if retry_heap and retry_heap[0][0] <= time.time():
+                    _, _, domain, positions, attempt = heapq.heappop(retry_heap)
+                    self._count('retry_attempts')
+                    submit(domain, positions, attempt)
+                    return True
+                return False
+
+            def submit(domain, positions, attempt):
+                first = positions[0]
+                future = executor.submit(self.scrape_single_website, urls[first], names[first])
+                future_to_group[future] = (domain, positions, attempt)
+
+            while len(future_to_group) < window and submit_next():
+                pass
+
+            while future_to_group or retry_heap or not feed.exhausted:
+                if feed.cancelled:
+                    retry_heap.clear()
+                if not future_to_group:
+                    # Nada en curso: esperar al próximo backoff o a que lleguen sitios nuevos
+                    timeout = max(0, retry_heap[0][0] - time.time()) if retry_heap else None
+                    if feed.exhausted:
+                        if timeout:
+                            time.sleep(timeout)
+                    else:
+                        feed.wait(timeout)
+                    while len(future_to_group) < window and submit_next():
+                        pass
+                    continue
+
+                timeout = max(0, retry_heap[0][0] - time.time()) if retry_heap else None
+                if not feed.exhausted:
+                    # Revisar seguido si llegaron sitios para ocupar la ventana
+                    timeout = FEED_POLL_SECONDS if timeout is None else min(timeout, FEED_POLL_SECONDS)
+                done, _ = wait(future_to_group, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    domain, positions, attempt = future_to_group.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"Error procesando el futuro para el dominio {domain}: {e}")
+                        result = {'emails': [], 'social_media': [], 'meta': {'error': str(e)}}
+
+                    meta = result['meta']
+                    if meta.get('transient') and attempt < self.max_retries:
+                        retry_seq += 1
+                        delay = self._retry_delay(attempt + 1)
+                        heapq.heappush(retry_heap, (time.time() + delay, retry_seq, domain, positions, attempt + 1))
+                        logger.info(f"♻️ {domain}: falla transitoria ({meta['error_class']}), reintento {attempt + 1} en {delay:.1f}s")
+                        continue
+                    if attempt:
+                        self._count('retry_exhausted' if 'error' in meta else 'retry_recovered')
+                    yield domain, positions, result
+
+                while len(future_to_group) < window and submit_next():
+                    pass
+
+    def run_scraping_process_from_dataframe(self, df, progress_callback=None, time_budget=None):
+        """
+        Procesa web scraping directamente desde un DataFrame.
+        Con time_budget (segundos) se usa el crawler con frontier de prioridades: recorre
+        todos los sitios a la vez priorizando las páginas con más chance de dar emails y
+        corta al vencer el presupuesto, devolviendo lo encontrado hasta ese momento.
+        """
         logger.info("--- INICIANDO PROCESO DE WEB SCRAPING ---")
         
         if df is None or df.empty:
@@ -169,39 +1092,347 @@ class WebsiteScraper:
 
         # Determinar qué columnas están disponibles (flexibilidad entre formatos)
         website_col = 'websiteUri' if 'websiteUri' in df.columns else 'website'
-        name_col = 'displayName.text' if 'displayName.text' in df.columns else 'name'
-        
         if website_col not in df.columns:
             logger.error(f"No se encontró columna de sitio web (buscando: {website_col})")
             return df
         
-        real_websites = df[df[website_col].apply(self.is_real_website)].copy()
-        total_sites = len(real_websites)
-        logger.info(f"Se encontraron {total_sites} sitios web reales para scrapear.")
+        # Una corrida de un solo lote, scrapeada en este thread (el progreso llega al llamador)
+        stream = ScrapeStream(self, time_budget=time_budget, progress_callback=progress_callback)
+        stream.add(df)
+        logger.info(f"Se encontraron {stream.total_sites} sitios web reales para scrapear.")
+        stream.close()
+        stream.run()
+        return df
 
-        df['scraped_emails'] = ''
-        df['social_media_links'] = ''
+    def start_stream(self, time_budget=None):
+        """
+        Inicia una corrida alimentada por lotes (ver ScrapeStream) que scrapea en un thread
+        aparte mientras se le agregan DataFrames. El time_budget es de toda la corrida.
+        """
+        logger.info("--- INICIANDO PROCESO DE WEB SCRAPING (por lotes) ---")
+        stream = ScrapeStream(self, time_budget=time_budget)
+        stream.start()
+        return stream
 
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_idx = {executor.submit(self.scrape_single_website, row[website_col], row[name_col]): idx for idx, row in real_websites.iterrows()}
-            
-            processed_count = 0
-            for future in as_completed(future_to_idx):
-                idx = future_to_idx[future]
-                try:
-                    result = future.result()
-                    df.at[idx, 'scraped_emails'] = '; '.join(result['emails'])
-                    df.at[idx, 'social_media_links'] = '; '.join(result['social_media'])
-                except Exception as e:
-                    logger.error(f"Error procesando el futuro para el índice {idx}: {e}")
-                
-                processed_count += 1
-                if progress_callback:
-                    # Notificar progreso al orquestador
-                    progress_callback(processed_count, total_sites, df.loc[idx, website_col])
-        
-        logger.info("🎯 Proceso de scraping finalizado.")
-        return df
+    def _reset_run_stats(self):
+        """Los contadores reflejan solo la corrida actual"""
+        with self._stats_lock:
+            self.stats.clear()
+        self._site_latencies = []
+
+    def _handle_site_result(self, scraped_emails, social_media_links, key, positions, result):
+        """Reparte el resultado de un sitio a las filas con la misma URL y lo guarda en la cache"""
+        # Repartir el resultado a todas las filas del sitio (listas por posición)
+        emails, social = '; '.join(result['emails']), '; '.join(result['social_media'])
+        for pos in positions:
+            scraped_emails[pos] = emails
+            social_media_links[pos] = social
+        self._count('dedup_rows', len(positions) - 1)
+        if 'elapsed' in result['meta']:
+            self._site_latencies.append(result['meta']['elapsed'])
+        # Solo se cachean descargas exitosas y completas (no las cortadas por el deadline)
+        meta = result['meta']
+        if self.cache and 'error' not in meta and not meta.get('deadline_reached'):
+            self.cache.set(key, result)
+
+    def _log_run_summary(self, total_sites, unique_sites, wall_seconds):
+        """Resume en el log los contadores de la corrida"""
+        stats = self.get_stats()
+        wall_seconds = max(wall_seconds, 1e-9)
+        logger.info(
+            f"⏱️ Etapas: descarga {stats.get('fetch_pages', 0)} páginas "
+            f"({stats.get('fetch_pages', 0) / wall_seconds:.1f}/s, {stats.get('fetch_bytes', 0) / 1024:.0f} KB, "
+            f"{stats.get('fetch_seconds', 0):.1f}s en red) | parseo {stats.get('parse_pages', 0)} páginas "
+            f"({stats.get('parse_pages', 0) / wall_seconds:.1f}/s, {stats.get('parse_cpu_seconds', 0):.1f}s CPU, "
+            f"{self.parse_workers or 'sin'} procesos)"
+        )
+        latencies = sorted(self._site_latencies)
+        p50 = latencies[len(latencies) // 2] if latencies else 0
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0
+        logger.info(
+            f"🌐 HTTP ({self.http_client}, Accept-Encoding: {self.session.headers.get('Accept-Encoding')}): "
+            f"{stats.get('connections_opened', 0)} conexiones para {stats.get('fetch_pages', 0)} requests, "
+            f"{stats.get('fetch_wire_bytes', 0) / 1024:.0f} KB en la red ({stats.get('fetch_bytes', 0) / 1024:.0f} KB "
+            f"descomprimidos), {stats.get('http2_responses', 0)} respuestas HTTP/2, "
+            f"latencia por sitio p50 {p50:.2f}s / p95 {p95:.2f}s"
+        )
+        logger.info(
+            f"🧬 Páginas duplicadas: {stats.get('canonical_duplicates_skipped', 0)} URLs equivalentes sin descargar, "
+            f"{stats.get('content_hash_reuse', 0)} páginas con contenido ya visto sin parsear"
+        )
+        logger.info(
+            f"🔗 Dedup por sitio: {unique_sites} sitios únicos para {total_sites} filas, "
+            f"{stats.get('dedup_rows', 0)} filas resueltas sin descargar de nuevo"
+        )
+        logger.info(
+            f"🔤 Charset: header={stats.get('charset_header', 0)}, meta={stats.get('charset_meta', 0)}, "
+            f"detector={stats.get('charset_detector', 0)}, fallback={stats.get('charset_fallback', 0)}, "
+            f"decodificación completa={stats.get('charset_full_decode', 0)}"
+        )
+        if self.cache and total_sites:
+            hits = stats.get('cache_hits', 0)
+            logger.info(
+                f"💾 Cache de scraping: {hits}/{total_sites} aciertos ({hits / total_sites:.0%}), "
+                f"~{stats.get('cache_time_saved', 0):.1f}s ahorrados"
+            )
+            logger.info(
+                f"🔁 Revalidación: {stats.get('http_not_modified', 0)} páginas 304, "
+                f"{stats.get('content_unchanged', 0)} sin cambios por hash"
+            )
+        logger.info(f"⏩ Páginas de contacto evitadas por salida temprana: {stats.get('contact_pages_skipped', 0)}")
+        logger.info(
+            f"🧩 Datos estructurados: {stats.get('structured_data_sites', 0)} sitios con email en JSON-LD/microdata, "
+            f"{stats.get('structured_requests_avoided', 0)} requests de contacto evitados"
+        )
+        if stats.get('frontier_emails') is not None or stats.get('frontier_deadline_sites'):
+            requests_done = max(stats.get('fetch_pages', 0), 1)
+            logger.info(
+                f"🧭 Frontier: {stats.get('frontier_emails', 0)} emails en {stats.get('fetch_pages', 0)} requests "
+                f"({stats.get('frontier_emails', 0) / requests_done:.2f} emails/request), "
+                f"{stats.get('frontier_deadline_sites', 0)} sitios cortados por el deadline"
+            )
+        failures = {key[len('failure_'):]: value for key, value in stats.items() if key.startswith('failure_')}
+        if failures:
+            logger.info(
+                "🧯 Fallas por clase: " + ", ".join(f"{name}={count}" for name, count in sorted(failures.items()))
+            )
+        if stats.get('retry_attempts'):
+            logger.info(
+                f"♻️ Reintentos: {stats.get('retry_attempts', 0)} intentos, {stats.get('retry_recovered', 0)} sitios "
+                f"recuperados, {stats.get('retry_exhausted', 0)} siguieron fallando"
+            )
+        logger.info(
+            f"🔌 Fail-fast: {stats.get('dns_failfast', 0)} por DNS, {stats.get('breaker_failfast', 0)} por circuit breaker "
+            f"({self.breaker.open_count()} hosts con circuito abierto)"
+        )
+
+class ScrapeStream:
+    """
+    Corrida de scraping alimentada por lotes. Los DataFrames se agregan con add() mientras
+    se scrapea: sus sitios entran a la misma cola que los anteriores y comparten workers,
+    dedup por sitio, cache y deadline. Cada DataFrame sale por completed() apenas terminan
+    todos sus sitios, con scraped_emails y social_media_links asignadas. El resumen de
+    contadores se loguea una vez, al terminar la corrida.
+    """
+
+    def __init__(self, scraper, time_budget=None, progress_callback=None):
+        self.scraper = scraper
+        self.time_budget = time_budget
+        self.progress_callback = progress_callback
+        # Filas de todos los lotes, por posición global
+        self.urls = []
+        self.names = []
+        self.scraped_emails = []
+        self.social_media_links = []
+        self.total_sites = 0
+        self.processed_sites = 0
+        self.feed = SiteFeed()
+        # Sitio -> posiciones y resultado (None mientras se scrapea)
+        self._groups = {}
+        # Lote de cada posición y lotes sin entregar (por id)
+        self._frame_of = []
+        self._open_frames = {}
+        self._completed = queue.Queue()
+        self._lock = threading.Lock()
+        self._engine_finished = False
+        # Pre-resoluciones DNS en curso: el feed se cierra recién cuando terminan todas
+        self._pending_feeds = 0
+        self._close_requested = False
+        self._thread = None
+        self._started = time.time()
+        scraper._reset_run_stats()
+
+    def start(self):
+        """Corre el scraping en un thread aparte (run() sin bloquear al llamador)"""
+        self._thread = threading.Thread(target=self.run, name='scrape-stream', daemon=True)
+        self._thread.start()
+
+    def join(self, timeout=None):
+        """Espera a que termine el thread de start() (y con él el resumen de la corrida)"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def closed(self):
+        """No se aceptan más lotes (aunque el feed espere las últimas pre-resoluciones DNS)"""
+        return self._close_requested or self.feed.closed
+
+    @property
+    def done(self):
+        """Cerrada y con todos los lotes entregados"""
+        with self._lock:
+            return self.feed.closed and not self._open_frames and self._completed.empty()
+
+    def add(self, df):
+        """
+        Agrega un DataFrame a la corrida sin esperar a que se scrapee. La cache se consulta
+        fuera del lock y la pre-resolución DNS corre en el executor de páginas, así el lock
+        solo cubre el agrupado en memoria y el llamador no espera a la red.
+        """
+        website_col = 'websiteUri' if 'websiteUri' in df.columns else 'website'
+        name_col = 'displayName.text' if 'displayName.text' in df.columns else 'name'
+        urls = df[website_col].tolist() if website_col in df.columns else [None] * len(df)
+        names = df[name_col].tolist() if name_col in df.columns else urls
+        scraper = self.scraper
+
+        # Agrupar filas por sitio (host + ruta), también entre lotes: las sucursales que comparten
+        # la misma URL se scrapean una vez, pero las páginas de distintos negocios en un host
+        # compartido no se mezclan. Si la URL no tiene un host reconocible se agrupa por el texto original
+        keys = [(site_key(url) if normalize_domain(url) else str(url).strip())
+                if scraper.is_real_website(url) else None for url in urls]
+
+        # Consultar la cache antes de encolar trabajo, solo para los sitios que la corrida no conoce
+        with self._lock:
+            unknown = {key for key in keys if key is not None and key not in self._groups}
+        cached_results = {}
+        if scraper.cache:
+            for key in unknown:
+                cached = scraper.cache.get(key)
+                if cached is not None:
+                    cached_results[key] = cached
+
+        new_groups = []
+        resolved = []
+        with self._lock:
+            start = len(self.urls)
+            frame = {'df': df, 'start': start, 'end': start + len(urls), 'waiting': set()}
+            self.urls.extend(urls)
+            self.names.extend(names)
+            self.scraped_emails.extend([''] * len(urls))
+            self.social_media_links.extend([''] * len(urls))
+            self._frame_of.extend([frame] * len(urls))
+            self._open_frames[id(frame)] = frame
+
+            for pos, key in enumerate(keys, start):
+                if key is None:
+                    continue
+                self.total_sites += 1
+                group = self._groups.get(key)
+                if group is None:
+                    group = self._groups[key] = {'positions': [], 'result': None, 'cached': False}
+                    cached = cached_results.get(key)
+                    if cached is not None:
+                        group['result'], group['cached'] = cached, True
+                        scraper._count('cache_time_saved', cached['meta'].get('elapsed', 0))
+                    elif not self._engine_finished:
+                        new_groups.append((key, group['positions']))
+                group['positions'].append(pos)
+
+                if group['result'] is not None:
+                    # Sitio en cache o ya scrapeado en un lote anterior
+                    self._apply(group['result'], pos)
+                    scraper._count('cache_hits' if group['cached'] else 'dedup_rows')
+                    resolved.append(pos)
+                elif not self._engine_finished:
+                    frame['waiting'].add(key)
+            self.processed_sites += len(resolved)
+            if not frame['waiting']:
+                self._finish_frame(frame)
+            if new_groups:
+                self._pending_feeds += 1
+
+        if resolved:
+            self._report_progress(resolved[-1])
+        if new_groups:
+            scraper._page_executor.submit(self._resolve_and_feed, new_groups)
+
+    def _resolve_and_feed(self, new_groups):
+        """Pre-resuelve en lote los hosts nuevos y recién entonces los encola (corre en el executor de páginas)"""
+        scraper = self.scraper
+        try:
+            # Los hosts que no existen fallarán sin esperar timeouts
+            hosts = [urlparse(scraper._ensure_scheme(self.urls[positions[0]])).hostname for _, positions in new_groups]
+            dead_hosts = scraper.resolver.resolve_many(hosts)
+            if dead_hosts:
+                logger.info(f"🪦 {dead_hosts} dominios no resuelven (NXDOMAIN), se omitirán sin conectar")
+        except Exception as e:
+            logger.warning(f"⚠️ Error pre-resolviendo DNS: {e}")
+        finally:
+            for key, positions in new_groups:
+                self.feed.put(key, positions)
+            with self._lock:
+                self._pending_feeds -= 1
+                close_feed = self._close_requested and self._pending_feeds == 0
+            if close_feed:
+                self.feed.close()
+
+    def close(self):
+        """No se agregan más lotes: la corrida termina cuando se scrapean los sitios pendientes"""
+        with self._lock:
+            self._close_requested = True
+            close_feed = self._pending_feeds == 0
+        if close_feed:
+            self.feed.close()
+
+    def cancel(self):
+        """Corta la corrida: los sitios que no empezaron se descartan (sus lotes salen sin scrapear)"""
+        self.feed.cancel()
+
+    def completed(self, timeout=0):
+        """Lotes terminados, en el orden en que terminaron (espera hasta timeout segundos al primero)"""
+        try:
+            yield self._completed.get(timeout=timeout) if timeout else self._completed.get_nowait()
+        except queue.Empty:
+            return
+        while True:
+            try:
+                yield self._completed.get_nowait()
+            except queue.Empty:
+                return
+
+    def run(self):
+        """Scrapea los sitios que van llegando hasta que la corrida se cierra y termina (bloquea)"""
+        scraper = self.scraper
+        try:
+            if self.time_budget is not None:
+                results = scraper._crawl_with_frontier(self.urls, self.names, self.feed, self.time_budget)
+            else:
+                results = scraper._scrape_sites(self.urls, self.names, self.feed)
+            for key, positions, result in results:
+                self._site_done(key, result)
+        except Exception as e:
+            logger.error(f"🚨 Error en la corrida de scraping: {e}", exc_info=True)
+            self.feed.cancel()
+        finally:
+            with self._lock:
+                self._engine_finished = True
+                # Lotes con sitios que no se llegaron a scrapear (error o cancelación): salen con lo que haya
+                for frame in list(self._open_frames.values()):
+                    self._finish_frame(frame)
+            scraper._log_run_summary(self.total_sites, len(self._groups), time.time() - self._started)
+            logger.info("🎯 Proceso de scraping finalizado.")
+
+    def _site_done(self, key, result):
+        with self._lock:
+            group = self._groups[key]
+            group['result'] = result
+            positions = list(group['positions'])
+            self.scraper._handle_site_result(self.scraped_emails, self.social_media_links, key, positions, result)
+            self.processed_sites += len(positions)
+            frames = {id(self._frame_of[pos]): self._frame_of[pos] for pos in positions}
+            for frame in frames.values():
+                frame['waiting'].discard(key)
+                if not frame['waiting']:
+                    self._finish_frame(frame)
+        self._report_progress(positions[0])
+
+    def _apply(self, result, pos):
+        self.scraped_emails[pos] = '; '.join(result['emails'])
+        self.social_media_links[pos] = '; '.join(result['social_media'])
+
+    def _finish_frame(self, frame):
+        """Asigna las columnas del lote (una asignación por columna) y lo entrega"""
+        if self._open_frames.pop(id(frame), None) is None:
+            return
+        df, start, end = frame.pop('df'), frame['start'], frame['end']
+        df['scraped_emails'] = self.scraped_emails[start:end]
+        df['social_media_links'] = self.social_media_links[start:end]
+        self._completed.put(df)
+
+    def _report_progress(self, pos):
+        if self.progress_callback:
+            # Notificar progreso al orquestador
+            self.progress_callback(self.processed_sites, self.total_sites, self.urls[pos])
 
 def save_to_csv(df, filename="scraped_output.csv"):
     if df is None:
@@ -214,9 +1445,9 @@ def main():
     """
     Función principal para ejecutar este módulo de forma independiente.
     """
-    scraper = WebsiteScraper()
-    enriched_df = scraper.run_scraping_process()
+    with WebsiteScraper() as scraper:
+        enriched_df = scraper.run_scraping_process()
     save_to_csv(enriched_df)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main() 